@@ -1,29 +1,27 @@
 # Copyright (c) 0235 Inc.
 # This file is licensed under the karakuri_agent Personal Use & No Warranty License.
 # Please see the LICENSE file in the project root.
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from starlette.requests import ClientDisconnect
 from starlette.responses import FileResponse
 from app.core.chat.chat_service import ChatService
-from app.core.chat.line_chat_client import LineChatClient
-from app.core.llm_service import LLMService
+from app.core.chat.line_client_registry import LineClientRegistry
+from app.core.job_queue import JobQueue
 from app.core.memory.memory_service import MemoryService
-from app.core.tts_service import TTSService
-from app.core.stt_service import STTService
+from app.core.tasks.job_worker import LINE_EVENTS_JOB
 from app.dependencies import (
-    get_line_chat_client,
-    get_llm_service,
-    get_memory_service,
-    get_stt_service,
-    get_tts_service,
     get_chat_service,
+    get_job_queue,
+    get_line_client_registry,
+    get_memory_service,
 )
-from app.schemas.user import UserConfig
 from pathlib import Path
-from typing import Dict
-from app.schemas.agent import AgentConfig
+from typing import Dict, List, Tuple
 from app.core.agent_manager import AgentManager, get_agent_manager
 from app.core.config import get_settings
+from app.utils.audio import get_base_url
+from app.utils.metrics import get_metrics
+from linebot.v3.webhooks.models import Event  # type: ignore
 import logging
 
 
@@ -33,59 +31,18 @@ settings = get_settings()
 UPLOAD_DIR = settings.line_audio_files_dir
 MAX_FILES = settings.line_max_audio_files
 user_image_cache: Dict[str, bytes] = {}
-
-
-async def process_line_events_background(
-    body: str,
-    signature: str,
-    agent_config: AgentConfig,
-    user_config: UserConfig,
-    request: Request,
-    llm_service: LLMService,
-    tts_service: TTSService,
-    #  TODO use chat_service?
-    line_chat_client: LineChatClient,
-):
-    try:
-        line_chat_client.create(agent_config)
-        events = line_chat_client.parse_line_events(
-            body, signature, agent_config.line_channel_secret
-        )
-        messages = await line_chat_client.process_message(events)
-
-        scheme = request.headers.get("X-Forwarded-Proto", "http")
-        server_host = request.headers.get("X-Forwarded-Host", request.base_url.hostname)
-        base_url = f"{scheme}://{server_host}"
-        await line_chat_client.process_and_send_messages(
-            "chat-line",
-            messages,
-            agent_config,
-            user_config,
-            llm_service,
-            tts_service,
-            base_url,
-            True,
-        )
-    except Exception as e:
-        logger.exception(
-            f"Error in process_line_events_background: {str(e)}", exc_info=True
-        )
-    finally:
-        await line_chat_client.close()
+_metrics = get_metrics()
 
 
 @router.post("/callback/{agent_id}/{user_id}")
 async def handle_line_callback(
-    background_tasks: BackgroundTasks,
     request: Request,
     agent_id: str,
     user_id: str,
-    llm_service: LLMService = Depends(get_llm_service),
-    tts_service: TTSService = Depends(get_tts_service),
-    stt_service: STTService = Depends(get_stt_service),
     memory_service: MemoryService = Depends(get_memory_service),
-    line_chat_client: LineChatClient = Depends(get_line_chat_client),
+    line_client_registry: LineClientRegistry = Depends(get_line_client_registry),
     chat_service: ChatService = Depends(get_chat_service),
+    job_queue: JobQueue = Depends(get_job_queue),
     agent_manager: AgentManager = Depends(get_agent_manager),
 ):
     signature, body = await extract_line_request_data(request)
@@ -102,52 +59,63 @@ async def handle_line_callback(
             status_code=404, detail=f"User with user_id '{user_id}' not found."
         )
 
-    # Verify signature before returning OK
-    line_chat_client.parse_line_events(
+    line_chat_client = line_client_registry.get(agent_config)
+    events = line_chat_client.parse_line_events(
         body, signature, agent_config.line_channel_secret
     )
-
-    is_chat_available = await chat_service.is_chat_available(agent_id)
-    if not is_chat_available:
+    events, claimed_ids = await drop_duplicate_events(events, chat_service)
+    # Verified events are handed to the job workers, so the webhook returns
+    # without waiting for the LLM and the work survives a process restart.
+    if events:
         try:
-            scheme = request.headers.get("X-Forwarded-Proto", "http")
-            server_host = request.headers.get(
-                "X-Forwarded-Host", request.base_url.hostname
+            await job_queue.enqueue(
+                LINE_EVENTS_JOB,
+                {
+                    "agent_id": agent_id,
+                    "user_id": user_id,
+                    "base_url": get_base_url(request),
+                    "events": [event.to_dict() for event in events],
+                },
             )
-            line_chat_client.create(agent_config)
-            events = line_chat_client.parse_line_events(
-                body, signature, agent_config.line_channel_secret
-            )
-            messages = await line_chat_client.process_message(events)
-            if messages:
-                await chat_service.update_pending_messages(
-                    agent_id,
-                    "chat-line",
-                    user_id,
-                    f"{scheme}://{server_host}",
-                    messages,
-                )
-                logger.info(
-                    f"Saved {len(messages)} messages to chat service for agent {agent_id}, user {user_id}"
-                )
-        except Exception as e:
-            logger.error(f"Error saving message to chat service: {e}")
-        finally:
-            await line_chat_client.close()
-        return "OK"
+        except Exception:
+            # Let a redelivery of these events through again.
+            await chat_service.release_webhook_events(claimed_ids)
+            raise
+    return "OK"
 
-    background_tasks.add_task(
-        process_line_events_background,
-        body,
-        signature,
-        agent_config,
-        user_config,
-        request,
-        llm_service,
-        tts_service,
-        line_chat_client,
+
+async def drop_duplicate_events(
+    events: List[Event], chat_service: ChatService
+) -> Tuple[List[Event], List[str]]:
+    """
+    Drop events that were already accepted, keyed on webhookEventId.
+
+    LINE redelivers a webhook when the response is slow, so the same event
+    can arrive more than once. Returns the new events and their claimed ids.
+    """
+    event_ids = [event.webhook_event_id for event in events]
+    claimed = await chat_service.claim_webhook_events(
+        [event_id for event_id in event_ids if event_id]
     )
-    return "OK"
+    claimed_iter = iter(claimed)
+    new_events: List[Event] = []
+    claimed_ids: List[str] = []
+    for event, event_id in zip(events, event_ids):
+        if not event_id:
+            new_events.append(event)
+        elif next(claimed_iter):
+            new_events.append(event)
+            claimed_ids.append(event_id)
+        else:
+            is_redelivery = (
+                event.delivery_context is not None
+                and event.delivery_context.is_redelivery
+            )
+            logger.info(
+                f"Skipping duplicate LINE event {event_id} (redelivery: {is_redelivery})"
+            )
+            _metrics.increment("line.duplicate_events")
+    return new_events, claimed_ids
 
 
 async def extract_line_request_data(request: Request):
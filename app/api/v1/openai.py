@@ -3,7 +3,6 @@
 # Please see the LICENSE file in the project root.
 from typing import cast
 import base64
-import httpx
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from fastapi.responses import StreamingResponse
@@ -14,7 +13,8 @@ from litellm import (
     ModelResponse,  # type: ignore
 )
 from app.core.memory.memory_service import MemoryService
-from app.dependencies import get_llm_service, get_memory_service
+from app.core.image_fetcher import ImageFetcher
+from app.dependencies import get_image_fetcher, get_llm_service, get_memory_service
 from app.core.llm_service import LLMService
 from app.core.agent_manager import AgentManager, get_agent_manager
 import logging
@@ -34,6 +34,7 @@ async def openai_chat_completions(
     llm_service: LLMService = Depends(get_llm_service),
     memory_service: MemoryService = Depends(get_memory_service),
     agent_manager: AgentManager = Depends(get_agent_manager),
+    image_fetcher: ImageFetcher = Depends(get_image_fetcher),
 ):
     agent_id, user_id = request["model"].split("/")
     try:
@@ -50,7 +51,7 @@ async def openai_chat_completions(
     try:
         stream = request.get("stream")
         message, image_data = await get_content_and_image_from_message(
-            request["messages"][-1]
+            request["messages"][-1], image_fetcher
         )
 
         llm_response = await llm_service.generate_response(
@@ -78,7 +79,9 @@ async def openai_chat_completions(
         )
 
 
-async def get_content_and_image_from_message(message: AllMessageValues):
+async def get_content_and_image_from_message(
+    message: AllMessageValues, image_fetcher: ImageFetcher
+):
     """
     Extract text content and image binary data from a message.
     Returns a tuple of (text_content: str, image_data: Optional[bytes])
@@ -126,10 +129,7 @@ async def get_content_and_image_from_message(message: AllMessageValues):
                     )
             else:
                 try:
-                    async with httpx.AsyncClient() as client:
-                        response = await client.get(url)
-                        response.raise_for_status()
-                        image_data = response.content
+                    image_data = await image_fetcher.fetch(url)
                 except Exception as e:
                     raise HTTPException(
                         status_code=400,
@@ -56,14 +56,16 @@ async def get_user(
     """Get user information."""
     try:
         user_config = await memory_service.get_user(agent_id, user_id)
-        return UserResponse(
-            id=user_config.id,
-            last_name=user_config.last_name,
-            first_name=user_config.first_name,
-        )
     except Exception as e:
         logger.error(f"Failed to get user: {e}")
         raise HTTPException(status_code=404, detail="User not found")
+    if user_config is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return UserResponse(
+        id=user_config.id,
+        last_name=user_config.last_name,
+        first_name=user_config.first_name,
+    )
 
 
 @router.get("", response_model=list[UserResponse])
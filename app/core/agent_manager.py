@@ -88,6 +88,18 @@ class AgentManager:
                 zep_url=self.settings.get_agent_env(i, "ZEP_URL")
                 or "https://api.getzep.com",
                 zep_api_secret=zep_api_secret,
+                memory_prefetch=self.settings.get_agent_env(
+                    i, "MEMORY_PREFETCH"
+                ).lower()
+                == "true",
+                structured_output=self.settings.get_agent_env(
+                    i, "STRUCTURED_OUTPUT"
+                ).lower()
+                == "true",
+                prompt_token_budget=int(
+                    self.settings.get_agent_env(i, "PROMPT_TOKEN_BUDGET")
+                    or self.settings.llm_prompt_token_budget
+                ),
             )
 
             i += 1
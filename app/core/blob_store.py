@@ -0,0 +1,86 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_BLOB_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobStore:
+    """
+    Content-addressed file store for message attachments.
+
+    Blobs are named by the SHA-256 of their content, so storing the same
+    data twice keeps one file. Writes go to a temporary file that is renamed
+    into place, so readers never see partial blobs. Blobs not written for
+    ttl seconds are removed by cleanup.
+    """
+
+    def __init__(self, directory: str, ttl: int):
+        self._directory = Path(directory)
+        self._ttl = ttl
+
+    async def put(self, data: bytes) -> str:
+        blob_id = hashlib.sha256(data).hexdigest()
+        await asyncio.to_thread(self._write, blob_id, data)
+        return blob_id
+
+    async def get(self, blob_id: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read, blob_id)
+
+    async def cleanup(self) -> int:
+        return await asyncio.to_thread(self._remove_expired)
+
+    def _path(self, blob_id: str) -> Path:
+        if not _BLOB_ID_PATTERN.match(blob_id):
+            raise ValueError(f"Invalid blob id: {blob_id}")
+        return self._directory / blob_id[:2] / blob_id
+
+    def _write(self, blob_id: str, data: bytes):
+        path = self._path(blob_id)
+        if path.exists():
+            # Refresh the expiry of content that is still referenced.
+            os.utime(path)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+    def _read(self, blob_id: str) -> Optional[bytes]:
+        try:
+            return self._path(blob_id).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _remove_expired(self) -> int:
+        if not self._directory.exists():
+            return 0
+        expires_before = time.time() - self._ttl
+        removed = 0
+        for path in self._directory.glob("*/*"):
+            try:
+                if path.stat().st_mtime < expires_before:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.error(f"Error deleting blob {path}: {e}")
+        return removed
@@ -3,11 +3,82 @@
 # Please see the LICENSE file in the project root.
 
 from abc import ABC, abstractmethod
-from typing import Any
+import logging
+import time
+from typing import Any, Awaitable, Callable, List, NamedTuple, Optional, Tuple, cast
 
+from app.core.config import get_settings
+from app.core.date_util import DateUtil
+from app.schemas.llm import LLMResponse
 from app.schemas.user import UserConfig
 from app.schemas.agent import AgentConfig
-from app.schemas.chat_message import ChatMessage, MessageType
+from app.schemas.chat_message import ChatMessage, MessageContent, MessageType
+from app.utils.audio import calculate_audio_duration, upload_to_storage
+from app.utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class Turn(NamedTuple):
+    message: ChatMessage
+    # Number of input messages consumed by this and all earlier turns.
+    consumed: int
+
+
+def coalesce_messages(
+    messages: List[ChatMessage], window: Optional[float] = None
+) -> List[Turn]:
+    """
+    Merge bursts of messages from the same source into single turns.
+
+    Consecutive messages from one source are merged while each arrives
+    within window seconds of the previous one; with no window, all of them
+    are. A turn carries the joined texts, the latest image and the latest
+    reply token. An image without text is attached to the next text of the
+    same source, as users tend to send the picture before the question.
+    """
+    turns: List[Turn] = []
+    texts: List[str] = []
+    image: Optional[bytes] = None
+    last: Optional[ChatMessage] = None
+
+    def flush(consumed: int):
+        nonlocal image
+        if last is not None and texts:
+            content = MessageContent(
+                type=MessageType.TEXT, text="\n".join(texts), image=image
+            )
+            turns.append(Turn(last.model_copy(update={"content": content}), consumed))
+            texts.clear()
+            image = None
+
+    for index, message in enumerate(messages):
+        if message.content.type == MessageType.IMAGE:
+            if not message.content.image:
+                continue
+        elif message.content.type != MessageType.TEXT or not message.content.text:
+            continue
+
+        if last is not None and (
+            message.id != last.id
+            or (
+                window is not None
+                and (message.timestamp - last.timestamp).total_seconds() > window
+            )
+        ):
+            flush(index)
+            if message.id != last.id:
+                image = None
+
+        if message.content.type == MessageType.IMAGE:
+            image = message.content.image
+        elif message.content.text:
+            texts.append(message.content.text)
+        last = message
+
+    flush(len(messages))
+    return turns
 
 
 class ChatClient(ABC):
@@ -29,10 +100,18 @@ class ChatClient(ABC):
     ):
         pass
 
+    @abstractmethod
+    async def reply_text(self, token: str, message: str):
+        pass
+
     @abstractmethod
     async def push_message(self, id: str, message: str, audio_url: str, duration: int):
         pass
 
+    @abstractmethod
+    async def push_audio(self, id: str, audio_url: str, duration: int):
+        pass
+
     async def process_and_send_messages(
         self,
         message_type: str,
@@ -43,62 +122,141 @@ class ChatClient(ABC):
         tts_service: Any,
         base_url: str,
         use_reply: bool,
+        coalesce_window: Optional[float] = None,
     ):
-        from typing import cast
-        from app.schemas.llm import LLMResponse
-        from app.utils.audio import calculate_audio_duration, upload_to_storage
-        from app.core.config import get_settings
+        """
+        Reply to messages, one agent turn per burst.
+
+        Bursts are merged by coalesce_messages; with no coalesce_window the
+        whole batch from a source becomes one turn.
+        """
+        turns = coalesce_messages(messages, coalesce_window)
+        get_metrics().increment("chat.coalesced_messages", len(messages) - len(turns))
+        for turn in turns:
+            agent_message = await self.generate_reply(
+                message_type, turn.message, agent_config, user_config, llm_service
+            )
+            await self.send_response(
+                turn.message,
+                agent_message,
+                agent_config,
+                tts_service,
+                base_url,
+                use_reply,
+            )
 
-        settings = get_settings()
+    async def generate_reply(
+        self,
+        message_type: str,
+        message: ChatMessage,
+        agent_config: AgentConfig,
+        user_config: UserConfig,
+        llm_service: Any,
+    ) -> str:
+        llm_response = cast(
+            LLMResponse,
+            await llm_service.generate_response(
+                message_type,
+                message.content.text,
+                agent_config,
+                user_config,
+                image=message.content.image,
+            ),
+        )
+        return llm_response.agent_message
 
-        for message in messages:
-            text_message = None
-            cached_image_bytes = None
+    async def send_response(
+        self,
+        message: ChatMessage,
+        agent_message: str,
+        agent_config: AgentConfig,
+        tts_service: Any,
+        base_url: str,
+        use_reply: bool,
+        text_sent: bool = False,
+        on_text_sent: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        """
+        Send a response within the lifetime of the message's reply token.
 
-            if message.content.type == MessageType.IMAGE:
-                if message.content.image:
-                    cached_image_bytes = message.content.image
-                continue
-            elif message.content.type == MessageType.TEXT and message.content.text:
-                text_message = message.content.text
-            else:
-                continue
+        When speech synthesis is expected to outlast the token, the text is
+        replied right away and the audio follows by push. A token that has
+        expired, or a reply that fails, falls back to pushing the response.
 
-            llm_response = cast(
-                LLMResponse,
-                await llm_service.generate_response(
-                    message_type,
-                    text_message,
-                    agent_config,
-                    user_config,
-                    image=cached_image_bytes,
-                ),
+        on_text_sent is awaited once the text has gone out on its own, so
+        that a caller resuming after a failure can pass text_sent and only
+        the audio is sent.
+        """
+        metrics = get_metrics()
+        audio: Optional[Tuple[str, int]] = None
+        if text_sent:
+            audio_url, duration = await self._synthesize_speech(
+                agent_message, agent_config, tts_service, base_url
             )
+            await self.push_audio(message.id, audio_url, duration)
+            metrics.increment("chat.send_path.resume_push_audio")
+            return
+        if use_reply:
+            time_left = self._reply_time_left(message)
+            speech_estimate = metrics.summarize("chat.speech_seconds").get("p95", 0.0)
+            if 0 < time_left <= speech_estimate:
+                if await self._try_reply(
+                    self.reply_text(message.reply_token, agent_message)
+                ):
+                    if on_text_sent is not None:
+                        await on_text_sent()
+                    audio_url, duration = await self._synthesize_speech(
+                        agent_message, agent_config, tts_service, base_url
+                    )
+                    await self.push_audio(message.id, audio_url, duration)
+                    metrics.increment("chat.send_path.reply_text_push_audio")
+                    return
+            elif time_left > 0:
+                audio = await self._synthesize_speech(
+                    agent_message, agent_config, tts_service, base_url
+                )
+                if self._reply_time_left(message) > 0 and await self._try_reply(
+                    self.reply_message(message.reply_token, agent_message, *audio)
+                ):
+                    metrics.increment("chat.send_path.reply")
+                    return
 
-            audio_data = await tts_service.generate_speech(
-                llm_response.agent_message, agent_config
+        if audio is None:
+            audio = await self._synthesize_speech(
+                agent_message, agent_config, tts_service, base_url
             )
+        await self.push_message(message.id, agent_message, *audio)
+        metrics.increment(
+            "chat.send_path.push_fallback" if use_reply else "chat.send_path.push"
+        )
 
-            audio_url = await upload_to_storage(
-                base_url,
-                audio_data,
-                "line",
-                settings.line_audio_files_dir,
-                settings.line_max_audio_files,
-            )
-            duration = calculate_audio_duration(audio_data)
-
-            if use_reply:
-                await self.reply_message(
-                    message.reply_token,
-                    llm_response.agent_message,
-                    audio_url,
-                    duration,
-                )
-            else:
-                await self.push_message(
-                    message.id,
-                    llm_response.agent_message,
-                    audio_url,
-                    duration,
-                )
+    def _reply_time_left(self, message: ChatMessage) -> float:
+        age = (DateUtil.now() - message.timestamp).total_seconds()
+        return settings.line_reply_token_deadline - age
+
+    async def _try_reply(self, reply: Awaitable[None]) -> bool:
+        try:
+            await reply
+            return True
+        except Exception as e:
+            logger.warning(f"Reply failed, falling back to push: {e}")
+            return False
+
+    async def _synthesize_speech(
+        self,
+        agent_message: str,
+        agent_config: AgentConfig,
+        tts_service: Any,
+        base_url: str,
+    ) -> Tuple[str, int]:
+        started_at = time.monotonic()
+        audio_data = await tts_service.generate_speech(agent_message, agent_config)
+        audio_url = await upload_to_storage(
+            base_url,
+            audio_data,
+            "line",
+            settings.line_audio_files_dir,
+            settings.line_max_audio_files,
+        )
+        get_metrics().observe("chat.speech_seconds", time.monotonic() - started_at)
+        return audio_url, calculate_audio_duration(audio_data)
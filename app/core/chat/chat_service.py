@@ -3,7 +3,8 @@
 # Please see the LICENSE file in the project root.
 
 import logging
-from typing import List
+from typing import List, Optional
+from app.core.blob_store import BlobStore
 from app.core.config import get_settings
 from app.core.valkey_client import ValkeyClient
 from app.schemas.chat_message import ChatMessage
@@ -19,6 +20,9 @@ class ChatServiceError(Exception):
 
 
 class ChatService:
+    def __init__(self, blob_store: BlobStore):
+        self._blob_store = blob_store
+
     async def update_pending_messages(
         self,
         agent_id: str,
@@ -30,6 +34,7 @@ class ChatService:
         session_key = f"chat:{agent_id}:{user_id}"
         try:
             session_id = await _valkey_client.get_session_id(session_key)
+            messages = [await self._offload_image(message) for message in messages]
             await _valkey_client.update_pending_messages(
                 session_id, message_type, base_url, messages
             )
@@ -47,7 +52,13 @@ class ChatService:
         session_key = f"chat:{agent_id}:{user_id}"
         try:
             session_id = await _valkey_client.get_session_id(session_key)
-            return await _valkey_client.get_pending_messages(session_id)
+            pending_messages = await _valkey_client.get_pending_messages(session_id)
+            if pending_messages is not None:
+                pending_messages.chat_messages = [
+                    await self._load_image(message)
+                    for message in pending_messages.chat_messages
+                ]
+            return pending_messages
         except Exception as e:
             error_msg = (
                 f"Failed to get pending messages for agent {agent_id}, user {user_id}"
@@ -65,6 +76,112 @@ class ChatService:
             logger.error(f"{error_msg}: {str(e)}")
             raise ChatServiceError(error_msg) from e
 
+    async def ack_pending_messages(self, agent_id: str, user_id: str, count: int):
+        """Remove the first count pending messages once they have been answered."""
+        session_key = f"chat:{agent_id}:{user_id}"
+        try:
+            session_id = await _valkey_client.get_session_id(session_key)
+            await _valkey_client.ack_pending_messages(session_id, count)
+        except Exception as e:
+            error_msg = f"Failed to acknowledge pending messages for agent {agent_id}, user {user_id}"
+            logger.error(f"{error_msg}: {str(e)}")
+            raise ChatServiceError(error_msg) from e
+
+    async def buffer_burst(
+        self,
+        agent_id: str,
+        user_id: str,
+        job_id: str,
+        messages: List[ChatMessage],
+        ttl: int,
+    ) -> Optional[str]:
+        """
+        Add a job's messages to the user's current burst.
+
+        Returns None once buffered, or the id of the job that already claimed
+        these messages when the job runs again.
+        """
+        session_key = f"chat:{agent_id}:{user_id}"
+        try:
+            session_id = await _valkey_client.get_session_id(session_key)
+            messages = [await self._offload_image(message) for message in messages]
+            return await _valkey_client.buffer_chat_burst(
+                session_id, job_id, messages, ttl
+            )
+        except Exception as e:
+            error_msg = (
+                f"Failed to buffer messages for agent {agent_id}, user {user_id}"
+            )
+            logger.error(f"{error_msg}: {str(e)}")
+            raise ChatServiceError(error_msg) from e
+
+    async def claim_burst(
+        self, agent_id: str, user_id: str, job_id: str, ttl: int
+    ) -> bool:
+        """Take the buffered burst if no later job has added to it."""
+        session_key = f"chat:{agent_id}:{user_id}"
+        try:
+            session_id = await _valkey_client.get_session_id(session_key)
+            return await _valkey_client.claim_chat_burst(session_id, job_id, ttl)
+        except Exception as e:
+            error_msg = f"Failed to claim messages for agent {agent_id}, user {user_id}"
+            logger.error(f"{error_msg}: {str(e)}")
+            raise ChatServiceError(error_msg) from e
+
+    async def get_burst(
+        self, agent_id: str, user_id: str, job_id: str
+    ) -> List[ChatMessage]:
+        """Messages of the burst claimed by job_id, images stay in the blob store."""
+        session_key = f"chat:{agent_id}:{user_id}"
+        try:
+            session_id = await _valkey_client.get_session_id(session_key)
+            return await _valkey_client.get_chat_burst_batch(session_id, job_id)
+        except Exception as e:
+            error_msg = f"Failed to get messages for agent {agent_id}, user {user_id}"
+            logger.error(f"{error_msg}: {str(e)}")
+            raise ChatServiceError(error_msg) from e
+
+    async def load_images(self, messages: List[ChatMessage]) -> List[ChatMessage]:
+        return [await self._load_image(message) for message in messages]
+
+    async def _offload_image(self, message: ChatMessage) -> ChatMessage:
+        """Move image bytes to the blob store, keeping only their id in the message."""
+        image = message.content.image
+        if image is None:
+            return message
+        image_id = await self._blob_store.put(image)
+        content = message.content.model_copy(
+            update={"image": None, "image_id": image_id}
+        )
+        return message.model_copy(update={"content": content})
+
+    async def _load_image(self, message: ChatMessage) -> ChatMessage:
+        image_id = message.content.image_id
+        if image_id is None or message.content.image is not None:
+            return message
+        image = await self._blob_store.get(image_id)
+        if image is None:
+            logger.warning(f"Image {image_id} for a pending message has expired")
+        content = message.content.model_copy(update={"image": image})
+        return message.model_copy(update={"content": content})
+
+    async def claim_webhook_events(self, event_ids: List[str]) -> List[bool]:
+        """Mark webhook events as seen; False for events that already were."""
+        try:
+            return await _valkey_client.claim_webhook_events(
+                event_ids, settings.line_event_dedup_ttl
+            )
+        except Exception as e:
+            error_msg = "Failed to claim webhook events"
+            logger.error(f"{error_msg}: {str(e)}")
+            raise ChatServiceError(error_msg) from e
+
+    async def release_webhook_events(self, event_ids: List[str]):
+        try:
+            await _valkey_client.release_webhook_events(event_ids)
+        except Exception as e:
+            logger.error(f"Failed to release webhook events: {str(e)}")
+
     async def is_chat_available(self, agent_id: str) -> bool:
         try:
             status = await _valkey_client.get_current_status(agent_id)
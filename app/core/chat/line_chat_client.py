@@ -3,8 +3,10 @@
 # Please see the LICENSE file in the project root.
 
 import aiohttp
+import logging
+from functools import lru_cache
 from fastapi import HTTPException
-from typing import cast
+from typing import Optional, cast
 from linebot import AsyncLineBotApi  # type: ignore
 from linebot.aiohttp_async_http_client import AiohttpAsyncHttpClient  # type: ignore
 from linebot.v3.messaging.async_api_client import AsyncApiClient  # type: ignore
@@ -12,7 +14,6 @@ from linebot.v3.messaging import AsyncMessagingApi  # type: ignore
 from linebot.v3.webhook import WebhookParser  # type: ignore
 from linebot.v3.webhooks.models import Event  # type: ignore
 from linebot.v3.messaging.models import (  # type: ignore
-    PushMessageRequest,
     ReplyMessageRequest,
     TextMessage,
     AudioMessage,
@@ -28,9 +29,21 @@ from linebot.v3.webhooks import (  # type: ignore
     Source,
 )
 from app.core.chat.chat_client import ChatClient
+from app.core.chat.line_outbound_sender import LineOutboundSender
 from app.schemas.agent import AgentConfig
 from app.schemas.chat_message import ChatMessage, MessageContent, MessageType
+from app.core.config import get_settings
 from app.core.date_util import DateUtil
+from app.utils.stream import PayloadTooLargeError, read_stream
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+_IMAGE_CHUNK_SIZE = 64 * 1024
+
+
+@lru_cache()
+def _get_webhook_parser(line_channel_secret: str) -> WebhookParser:
+    return WebhookParser(line_channel_secret)
 
 
 class LineChatClient(ChatClient):
@@ -38,14 +51,21 @@ class LineChatClient(ChatClient):
     line_bot_api: AsyncLineBotApi
     aio_session: aiohttp.ClientSession
     async_client: AsyncApiClient | None
+    outbound_sender: LineOutboundSender
 
     def create(self, agent_config: AgentConfig):
-        self.aio_session = aiohttp.ClientSession()
+        self.aio_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=settings.line_max_connections)
+        )
         configuration = Configuration(
             access_token=agent_config.line_channel_access_token
         )
+        configuration.connection_pool_maxsize = settings.line_max_connections
         self.async_client = AsyncApiClient(configuration)
         self.line_messaging_api = AsyncMessagingApi(self.async_client)
+        self.outbound_sender = LineOutboundSender(
+            self.line_messaging_api, push_rate=settings.line_push_rate_limit
+        )
 
         aio_client = AiohttpAsyncHttpClient(self.aio_session)
         self.line_bot_api = AsyncLineBotApi(
@@ -56,7 +76,7 @@ class LineChatClient(ChatClient):
     def parse_line_events(
         self, body: str, signature: str, line_channel_secret: str
     ) -> list[Event]:
-        line_parser = WebhookParser(line_channel_secret)
+        line_parser = _get_webhook_parser(line_channel_secret)
 
         try:
             events: list[Event] = cast(list[Event], line_parser.parse(body, signature))  # type: ignore
@@ -88,6 +108,8 @@ class LineChatClient(ChatClient):
                 continue
             if isinstance(event.message, ImageMessageContent):
                 image = await self._process_image_message(event)
+                if image is None:
+                    continue
                 content = MessageContent(
                     type=MessageType.IMAGE,
                     image=image,
@@ -101,19 +123,24 @@ class LineChatClient(ChatClient):
                 reply_token=token,
                 content=content,
                 id=id,
-                timestamp=DateUtil.now(),
+                timestamp=DateUtil.from_timestamp(event.timestamp / 1000),
             )
             result.append(message)
 
         return result
 
-    async def _process_image_message(self, event: MessageEvent) -> bytes:
+    async def _process_image_message(self, event: MessageEvent) -> Optional[bytes]:
         message_content = await self.line_bot_api.get_message_content(event.message.id)  # type: ignore
-        image_bytes: bytes = b""
-        async for chunk in message_content.iter_content():  # type: ignore
-            assert isinstance(chunk, bytes)
-            image_bytes += chunk
-        return image_bytes  # type: ignore
+        content_length = message_content.response.headers.get("content-length")  # type: ignore
+        try:
+            return await read_stream(
+                message_content.iter_content(chunk_size=_IMAGE_CHUNK_SIZE),  # type: ignore
+                settings.line_image_max_bytes,
+                int(content_length) if content_length else None,  # type: ignore
+            )
+        except PayloadTooLargeError as e:
+            logger.warning(f"Skipping LINE image {event.message.id}: {e}")  # type: ignore
+            return None
 
     async def reply_message(
         self, token: str, message: str, audio_url: str, duration: int
@@ -131,20 +158,37 @@ class LineChatClient(ChatClient):
             )
         )
 
-    async def push_message(self, id: str, message: str, audio_url: str, duration: int):
-        await self.line_messaging_api.push_message(  # type: ignore
-            PushMessageRequest(
-                to=id,
-                messages=[
-                    TextMessage(text=message),  # type: ignore
-                    AudioMessage(
-                        original_content_url=audio_url,  # type: ignore
-                        duration=duration,
-                    ),
-                ],
+    async def reply_text(self, token: str, message: str):
+        await self.line_messaging_api.reply_message(  # type: ignore
+            ReplyMessageRequest(
+                reply_token=token,  # type: ignore
+                messages=[TextMessage(text=message)],  # type: ignore
             )
         )
 
+    async def push_message(self, id: str, message: str, audio_url: str, duration: int):
+        await self.outbound_sender.push(
+            id,
+            [
+                TextMessage(text=message),  # type: ignore
+                AudioMessage(
+                    original_content_url=audio_url,  # type: ignore
+                    duration=duration,
+                ),
+            ],
+        )
+
+    async def push_audio(self, id: str, audio_url: str, duration: int):
+        await self.outbound_sender.push(
+            id,
+            [
+                AudioMessage(
+                    original_content_url=audio_url,  # type: ignore
+                    duration=duration,
+                )
+            ],
+        )
+
     async def close(self):
         await self.aio_session.close()
         if self.async_client is not None:
@@ -0,0 +1,46 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+import logging
+from typing import Dict, List
+
+from app.core.chat.line_chat_client import LineChatClient
+from app.schemas.agent import AgentConfig
+
+logger = logging.getLogger(__name__)
+
+
+class LineClientRegistry:
+    """
+    Long-lived LINE API clients, one per agent.
+
+    Clients are created once, normally at startup, and shared by webhook
+    handlers and background senders. Their HTTP sessions are pooled and stay
+    open until close is called on shutdown.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, LineChatClient] = {}
+
+    def create_clients(self, agent_configs: List[AgentConfig]):
+        for agent_config in agent_configs:
+            if agent_config.line_channel_access_token:
+                self.get(agent_config)
+
+    def get(self, agent_config: AgentConfig) -> LineChatClient:
+        client = self._clients.get(agent_config.id)
+        if client is None:
+            client = LineChatClient()
+            client.create(agent_config)
+            self._clients[agent_config.id] = client
+        return client
+
+    async def close(self):
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.error(f"Error closing LINE client: {e}")
@@ -0,0 +1,40 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+"""
+Rate-limited outbound messaging for one LINE channel.
+"""
+
+import logging
+from typing import List
+
+from linebot.v3.messaging import AsyncMessagingApi  # type: ignore
+from linebot.v3.messaging.models import Message, PushMessageRequest  # type: ignore
+
+from app.utils.metrics import get_metrics
+from app.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class LineOutboundSender:
+    """
+    Sends push messages for one LINE channel within its rate limit.
+
+    Pushes draw from a token bucket, so a large fan-out such as a pending
+    message flush is spread out instead of being rejected with 429s.
+    """
+
+    def __init__(self, messaging_api: AsyncMessagingApi, push_rate: float):
+        self._messaging_api = messaging_api
+        self._push_bucket = TokenBucket(push_rate, push_rate)
+        self._metrics = get_metrics()
+
+    async def push(self, to: str, messages: List[Message]):
+        waited = await self._push_bucket.acquire()
+        self._metrics.observe("line_outbound.rate_limit_wait_seconds", waited)
+        await self._messaging_api.push_message(  # type: ignore
+            PushMessageRequest(to=to, messages=messages)  # type: ignore
+        )
+        self._metrics.increment("line_outbound.push_requests")
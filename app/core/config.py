@@ -18,6 +18,21 @@ class Settings:
         self.line_audio_files_dir = str(
             os.getenv("LINE_AUDIO_FILES_DIR", "line_audio_files")
         )
+        self.line_image_max_bytes = int(os.getenv("LINE_IMAGE_MAX_BYTES", "10485760"))
+        self.line_max_connections = int(os.getenv("LINE_MAX_CONNECTIONS", "20"))
+        self.line_event_dedup_ttl = int(os.getenv("LINE_EVENT_DEDUP_TTL", "86400"))
+        self.line_reply_token_deadline = float(
+            os.getenv("LINE_REPLY_TOKEN_DEADLINE", "50")
+        )
+        self.line_push_rate_limit = float(os.getenv("LINE_PUSH_RATE_LIMIT", "1000"))
+        self.chat_message_coalesce_window = float(
+            os.getenv("CHAT_MESSAGE_COALESCE_WINDOW", "3")
+        )
+        self.blob_store_dir = str(os.getenv("BLOB_STORE_DIR", "blob_store"))
+        self.blob_store_ttl = int(os.getenv("BLOB_STORE_TTL", "604800"))
+        self.blob_store_cleanup_interval = int(
+            os.getenv("BLOB_STORE_CLEANUP_INTERVAL", "3600")
+        )
         self.talk_max_audio_files = int(os.getenv("TALK_MAX_AUDIO_FILES", "5"))
         self.talk_audio_files_dir = str(
             os.getenv("TALK_AUDIO_FILES_DIR", "talk_audio_files")
@@ -33,6 +48,105 @@ class Settings:
         )
         self.valkey_url = str(os.getenv("VALKEY_URL", "redis://karakuri-valkey"))
         self.valkey_password = str(os.getenv("VALKEY_PASSWORD", "Valkey_P@ssw0rd123"))
+        self.pending_message_max_concurrency = int(
+            os.getenv("PENDING_MESSAGE_MAX_CONCURRENCY", "16")
+        )
+        self.pending_message_max_concurrency_per_agent = int(
+            os.getenv("PENDING_MESSAGE_MAX_CONCURRENCY_PER_AGENT", "4")
+        )
+        self.pending_message_max_retries = int(
+            os.getenv("PENDING_MESSAGE_MAX_RETRIES", "3")
+        )
+        self.pending_message_retry_base_delay = float(
+            os.getenv("PENDING_MESSAGE_RETRY_BASE_DELAY", "2")
+        )
+        self.status_scheduler_max_wait = float(
+            os.getenv("STATUS_SCHEDULER_MAX_WAIT", "60")
+        )
+        self.zep_max_connections = int(os.getenv("ZEP_MAX_CONNECTIONS", "20"))
+        self.zep_max_keepalive_connections = int(
+            os.getenv("ZEP_MAX_KEEPALIVE_CONNECTIONS", "10")
+        )
+        self.zep_timeout = float(os.getenv("ZEP_TIMEOUT", "30"))
+        self.user_cache_ttl = float(os.getenv("USER_CACHE_TTL", "300"))
+        self.user_cache_negative_ttl = float(os.getenv("USER_CACHE_NEGATIVE_TTL", "30"))
+        self.user_cache_max_size = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+        self.memory_queue_flush_delay = float(
+            os.getenv("MEMORY_QUEUE_FLUSH_DELAY", "1")
+        )
+        self.memory_queue_poll_interval = float(
+            os.getenv("MEMORY_QUEUE_POLL_INTERVAL", "5")
+        )
+        self.memory_queue_batch_size = int(os.getenv("MEMORY_QUEUE_BATCH_SIZE", "10"))
+        self.memory_queue_batch_sessions = int(
+            os.getenv("MEMORY_QUEUE_BATCH_SESSIONS", "20")
+        )
+        self.memory_queue_retry_base_delay = float(
+            os.getenv("MEMORY_QUEUE_RETRY_BASE_DELAY", "5")
+        )
+        self.memory_queue_max_attempts = int(
+            os.getenv("MEMORY_QUEUE_MAX_ATTEMPTS", "8")
+        )
+        self.memory_queue_drain_timeout = float(
+            os.getenv("MEMORY_QUEUE_DRAIN_TIMEOUT", "10")
+        )
+        self.memory_window_size = int(os.getenv("MEMORY_WINDOW_SIZE", "30"))
+        self.memory_context_refresh_interval = int(
+            os.getenv("MEMORY_CONTEXT_REFRESH_INTERVAL", "60")
+        )
+        self.tool_cache_ttl = float(os.getenv("TOOL_CACHE_TTL", "60"))
+        self.tool_cache_max_size = int(os.getenv("TOOL_CACHE_MAX_SIZE", "1000"))
+        self.llm_tool_call_timeout = float(os.getenv("LLM_TOOL_CALL_TIMEOUT", "10"))
+        self.llm_prompt_token_budget = int(
+            os.getenv("LLM_PROMPT_TOKEN_BUDGET", "16000")
+        )
+        self.llm_tool_output_max_tokens = int(
+            os.getenv("LLM_TOOL_OUTPUT_MAX_TOKENS", "500")
+        )
+        self.emotion_batch_window_ms = float(os.getenv("EMOTION_BATCH_WINDOW_MS", "5"))
+        self.emotion_batch_max_size = int(os.getenv("EMOTION_BATCH_MAX_SIZE", "16"))
+        self.image_max_edge = int(os.getenv("IMAGE_MAX_EDGE", "1568"))
+        self.image_jpeg_quality = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+        self.image_worker_threads = int(os.getenv("IMAGE_WORKER_THREADS", "2"))
+        self.image_description_cache_ttl = int(
+            os.getenv("IMAGE_DESCRIPTION_CACHE_TTL", "604800")
+        )
+        self.image_description_cache_max_size = int(
+            os.getenv("IMAGE_DESCRIPTION_CACHE_MAX_SIZE", "1000")
+        )
+        self.image_fetch_max_bytes = int(os.getenv("IMAGE_FETCH_MAX_BYTES", "10485760"))
+        self.image_fetch_timeout = float(os.getenv("IMAGE_FETCH_TIMEOUT", "10"))
+        self.image_fetch_max_connections = int(
+            os.getenv("IMAGE_FETCH_MAX_CONNECTIONS", "20")
+        )
+        self.image_fetch_max_per_host = int(os.getenv("IMAGE_FETCH_MAX_PER_HOST", "4"))
+        self.image_fetch_cache_ttl = float(os.getenv("IMAGE_FETCH_CACHE_TTL", "300"))
+        self.image_fetch_cache_max_size = int(
+            os.getenv("IMAGE_FETCH_CACHE_MAX_SIZE", "100")
+        )
+        self.image_fetch_cache_max_bytes = int(
+            os.getenv("IMAGE_FETCH_CACHE_MAX_BYTES", "104857600")
+        )
+        self.image_fetch_revalidate_max_bytes = int(
+            os.getenv("IMAGE_FETCH_REVALIDATE_MAX_BYTES", "52428800")
+        )
+        self.job_queue_concurrency = int(os.getenv("JOB_QUEUE_CONCURRENCY", "8"))
+        self.job_queue_max_retries = int(os.getenv("JOB_QUEUE_MAX_RETRIES", "3"))
+        self.job_queue_retry_base_delay = float(
+            os.getenv("JOB_QUEUE_RETRY_BASE_DELAY", "2")
+        )
+        self.job_queue_visibility_timeout = float(
+            os.getenv("JOB_QUEUE_VISIBILITY_TIMEOUT", "600")
+        )
+        self.job_queue_max_deliveries = int(os.getenv("JOB_QUEUE_MAX_DELIVERIES", "3"))
+        self.job_queue_block_timeout = float(os.getenv("JOB_QUEUE_BLOCK_TIMEOUT", "5"))
+        self.job_queue_max_length = int(os.getenv("JOB_QUEUE_MAX_LENGTH", "100000"))
+        self.job_queue_shutdown_timeout = float(
+            os.getenv("JOB_QUEUE_SHUTDOWN_TIMEOUT", "20")
+        )
+        self.job_worker_in_process = (
+            os.getenv("JOB_WORKER_IN_PROCESS", "true").lower() == "true"
+        )
 
     def get_agent_env(self, agent_id: int, key: str) -> str:
         return os.getenv(f"AGENT_{agent_id}_{key}") or ""
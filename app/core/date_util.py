@@ -21,3 +21,10 @@ class DateUtil:
         Returns the current datetime with timezone awareness.
         """
         return datetime.now(cls.DEFAULT_TIMEZONE)
+
+    @classmethod
+    def from_timestamp(cls, timestamp: float) -> datetime:
+        """
+        Returns the datetime of a Unix timestamp in seconds with timezone awareness.
+        """
+        return datetime.fromtimestamp(timestamp, cls.DEFAULT_TIMEZONE)
@@ -0,0 +1,160 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Tuple
+
+import httpx
+
+from app.core.exceptions import UserError
+from app.utils.cache import AsyncTTLCache
+from app.utils.metrics import get_metrics
+from app.utils.stream import PayloadTooLargeError, read_stream
+
+logger = logging.getLogger(__name__)
+
+
+class ImageFetcher:
+    """
+    Downloads remote images over one pooled HTTP client.
+
+    Bodies are streamed and abandoned once they exceed max_bytes, and
+    responses that are not images are rejected. At most max_per_host
+    downloads run against one host at a time. Images are cached by URL for
+    cache_ttl seconds, up to cache_max_bytes in total; once an entry
+    expires, a URL that returned an ETag is revalidated with If-None-Match
+    instead of being downloaded again. The
+    bodies kept for revalidation are limited to revalidate_max_bytes in
+    total, least recently used first out.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        timeout: float,
+        max_connections: int,
+        max_per_host: int,
+        cache_ttl: float,
+        cache_max_size: int,
+        cache_max_bytes: int,
+        revalidate_max_bytes: int,
+    ):
+        self._max_bytes = max_bytes
+        self._max_per_host = max_per_host
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections),
+            timeout=httpx.Timeout(timeout),
+            follow_redirects=True,
+        )
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._host_users: Dict[str, int] = {}
+        self._cache: AsyncTTLCache[str, bytes] = AsyncTTLCache(
+            ttl=cache_ttl,
+            max_size=cache_max_size,
+            weigher=len,
+            max_weight=cache_max_bytes,
+        )
+        self._etags: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._etag_max_size = cache_max_size
+        self._etag_max_bytes = revalidate_max_bytes
+        self._etag_bytes = 0
+        self._metrics = get_metrics()
+        self._metrics.register_collector("image_fetch_cache", self.get_cache_metrics)
+
+    async def fetch(self, url: str) -> bytes:
+        try:
+            scheme = httpx.URL(url).scheme
+        except httpx.InvalidURL as e:
+            raise UserError(f"Invalid image URL: {e}")
+        if scheme not in ("http", "https"):
+            raise UserError(f"Unsupported image URL scheme: {scheme}")
+        return await self._cache.get_or_load(url, lambda: self._download(url))
+
+    @asynccontextmanager
+    async def _host_slot(self, host: str) -> AsyncIterator[None]:
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._max_per_host)
+            self._host_semaphores[host] = semaphore
+        self._host_users[host] = self._host_users.get(host, 0) + 1
+        try:
+            async with semaphore:
+                yield
+        finally:
+            # Hosts seen once must not keep a semaphore forever.
+            self._host_users[host] -= 1
+            if self._host_users[host] == 0:
+                del self._host_users[host]
+                del self._host_semaphores[host]
+
+    async def _download(self, url: str) -> bytes:
+        headers: Dict[str, str] = {}
+        cached = self._etags.get(url)
+        if cached is not None:
+            headers["If-None-Match"] = cached[0]
+
+        try:
+            async with self._host_slot(httpx.URL(url).host):
+                async with self._client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304 and cached is not None:
+                        if url in self._etags:
+                            self._etags.move_to_end(url)
+                        self._metrics.increment("image_fetch.revalidated")
+                        return cached[1]
+                    response.raise_for_status()
+
+                    content_type = response.headers.get("content-type", "")
+                    if not content_type.lower().startswith("image/"):
+                        raise UserError(
+                            f"URL did not return an image (content type '{content_type}')"
+                        )
+                    content_length = response.headers.get("content-length")
+                    data = await read_stream(
+                        response.aiter_bytes(),
+                        self._max_bytes,
+                        int(content_length)
+                        if content_length and content_length.isdigit()
+                        else None,
+                    )
+                    etag = response.headers.get("etag")
+        except PayloadTooLargeError as e:
+            raise UserError(f"Image is too large: {e}")
+        except httpx.HTTPError as e:
+            raise UserError(f"Failed to fetch image: {e}")
+
+        self._metrics.increment("image_fetch.downloads")
+        self._metrics.observe("image_fetch.bytes", len(data))
+        self._forget_etag(url)
+        if etag and len(data) <= self._etag_max_bytes:
+            self._etags[url] = (etag, data)
+            self._etag_bytes += len(data)
+            while (
+                len(self._etags) > self._etag_max_size
+                or self._etag_bytes > self._etag_max_bytes
+            ):
+                _, (_, evicted) = self._etags.popitem(last=False)
+                self._etag_bytes -= len(evicted)
+        return data
+
+    def _forget_etag(self, url: str):
+        cached = self._etags.pop(url, None)
+        if cached is not None:
+            self._etag_bytes -= len(cached[1])
+
+    async def get_cache_metrics(self) -> Dict[str, Any]:
+        return {
+            "hits": self._cache.hits,
+            "misses": self._cache.misses,
+            "coalesced": self._cache.coalesced,
+            "hit_rate": self._cache.hit_rate,
+            "bytes": self._cache.weight,
+            "revalidate_entries": len(self._etags),
+            "revalidate_bytes": self._etag_bytes,
+        }
+
+    async def close(self):
+        await self._client.aclose()
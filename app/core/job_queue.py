@@ -0,0 +1,264 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from app.core.config import get_settings
+from app.core.valkey_client import ValkeyClient
+from app.utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+_valkey_client = ValkeyClient(settings.valkey_url, settings.valkey_password)
+
+_JOB_GROUP = "workers"
+
+
+class JobProgress:
+    """
+    Steps a job has completed, kept in Valkey across retries and redeliveries.
+
+    Handlers with side effects that must not repeat, such as sending a
+    message, record each step once it is done and skip recorded steps when
+    the job runs again. Progress is deleted when the job is acknowledged or
+    dead-lettered.
+    """
+
+    def __init__(self, queue: str, job_id: str, steps: Dict[str, str], ttl: int):
+        self._queue = queue
+        self._job_id = job_id
+        self._steps = steps
+        self._ttl = ttl
+
+    @property
+    def job_id(self) -> str:
+        return self._job_id
+
+    @property
+    def ttl(self) -> int:
+        return self._ttl
+
+    def get(self, step: str) -> Optional[str]:
+        return self._steps.get(step)
+
+    async def set(self, step: str, value: str = "1"):
+        await _valkey_client.set_job_progress(
+            self._queue, self._job_id, step, value, self._ttl
+        )
+        self._steps[step] = value
+
+
+JobHandler = Callable[[Dict[str, Any], JobProgress], Awaitable[None]]
+
+
+class JobQueue:
+    """
+    Durable job queue backed by a Valkey stream.
+
+    Jobs are read through a consumer group, so each job goes to one worker
+    and stays pending until it is acknowledged. A failing handler is retried
+    with exponential backoff; a job that still fails, or whose worker died
+    more than max_deliveries times, is moved to a dead-letter stream. Jobs
+    left pending longer than visibility_timeout are reclaimed by another
+    worker. Since a job can therefore run more than once, handlers get a
+    JobProgress to make their side effects idempotent.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        concurrency: int,
+        max_retries: int,
+        retry_base_delay: float,
+        visibility_timeout: float,
+        max_deliveries: int,
+        block_timeout: float,
+        max_length: int,
+        shutdown_timeout: float,
+    ):
+        self._name = name
+        self._concurrency = concurrency
+        self._max_retries = max_retries
+        self._retry_base_delay = retry_base_delay
+        self._visibility_timeout = visibility_timeout
+        self._max_deliveries = max_deliveries
+        self._block_timeout = block_timeout
+        self._max_length = max_length
+        self._shutdown_timeout = shutdown_timeout
+        self._handlers: Dict[str, JobHandler] = {}
+        self._stopping = asyncio.Event()
+        self._metrics = get_metrics()
+        self._metrics.register_collector("job_queue", self.get_job_queue_metrics)
+
+    def register(self, job_type: str, handler: JobHandler):
+        self._handlers[job_type] = handler
+
+    async def enqueue(self, job_type: str, payload: Dict[str, Any]) -> str:
+        job_id = await _valkey_client.add_job(
+            self._name,
+            {
+                "type": job_type,
+                "payload": json.dumps(payload),
+                "enqueued_at": str(time.time()),
+            },
+            self._max_length,
+        )
+        self._metrics.increment("job_queue.enqueued")
+        return job_id
+
+    def stop(self):
+        """Make run return after its current read, once in-flight jobs finish."""
+        self._stopping.set()
+
+    async def run(self, consumer: str):
+        """Process jobs until stopped or cancelled, then let in-flight jobs finish."""
+        await _valkey_client.create_job_group(self._name, _JOB_GROUP)
+        logger.info(f"Job worker {consumer} started on queue {self._name}")
+        tasks: Set[asyncio.Task] = set()
+        next_claim_at = 0.0
+        try:
+            while not self._stopping.is_set():
+                try:
+                    available = self._concurrency - len(tasks)
+                    if available <= 0:
+                        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                        continue
+
+                    jobs: List[Tuple[str, Dict[str, str], int]] = []
+                    if time.monotonic() >= next_claim_at:
+                        jobs = await self._claim_stale_jobs(consumer, available)
+                        next_claim_at = time.monotonic() + self._visibility_timeout / 2
+                    if not jobs:
+                        new_jobs = await _valkey_client.read_jobs(
+                            self._name,
+                            _JOB_GROUP,
+                            consumer,
+                            available,
+                            int(self._block_timeout * 1000),
+                        )
+                        jobs = [(job_id, fields, 1) for job_id, fields in new_jobs]
+
+                    for job_id, fields, deliveries in jobs:
+                        task = asyncio.create_task(
+                            self._process(job_id, fields, deliveries)
+                        )
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                except Exception as e:
+                    logger.error(f"Error in job worker {consumer}: {e}", exc_info=True)
+                    await asyncio.sleep(self._block_timeout)
+        finally:
+            await self._shutdown(tasks)
+
+    async def _shutdown(self, tasks: Set[asyncio.Task]):
+        if not tasks:
+            return
+        logger.info(f"Waiting for {len(tasks)} in-flight jobs")
+        _, pending = await asyncio.wait(set(tasks), timeout=self._shutdown_timeout)
+        # Unfinished jobs stay pending in the stream and are reclaimed later.
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if pending:
+            logger.warning(f"Cancelled {len(pending)} jobs at shutdown")
+
+    async def _claim_stale_jobs(
+        self, consumer: str, count: int
+    ) -> List[Tuple[str, Dict[str, str], int]]:
+        claimed = await _valkey_client.claim_stale_jobs(
+            self._name,
+            _JOB_GROUP,
+            consumer,
+            int(self._visibility_timeout * 1000),
+            count,
+        )
+        jobs: List[Tuple[str, Dict[str, str], int]] = []
+        for job_id, fields, deliveries in claimed:
+            self._metrics.increment("job_queue.reclaimed")
+            if deliveries > self._max_deliveries:
+                await self._dead_letter(
+                    job_id, fields, f"Exceeded {self._max_deliveries} deliveries"
+                )
+            else:
+                jobs.append((job_id, fields, deliveries))
+        return jobs
+
+    async def _process(self, job_id: str, fields: Dict[str, str], deliveries: int):
+        try:
+            job_type = fields.get("type", "")
+            handler = self._handlers.get(job_type)
+            if handler is None:
+                await self._dead_letter(job_id, fields, f"Unknown job type: {job_type}")
+                return
+            try:
+                payload = json.loads(fields.get("payload", ""))
+            except json.JSONDecodeError as e:
+                await self._dead_letter(job_id, fields, f"Invalid payload: {e}")
+                return
+
+            # Progress outlives every delivery the job can still get.
+            progress = JobProgress(
+                self._name,
+                job_id,
+                await _valkey_client.get_job_progress(self._name, job_id),
+                int(self._visibility_timeout * (self._max_deliveries + 1)),
+            )
+            started_at = time.monotonic()
+            attempt = 0
+            while True:
+                try:
+                    await handler(payload, progress)
+                    break
+                except Exception as e:
+                    if attempt >= self._max_retries:
+                        logger.error(
+                            f"Job {job_id} ({job_type}) failed after {attempt + 1} attempts: {e}",
+                            exc_info=True,
+                        )
+                        await self._dead_letter(job_id, fields, str(e))
+                        return
+                    delay = self._retry_base_delay * (2**attempt)
+                    attempt += 1
+                    self._metrics.increment("job_queue.retries")
+                    logger.warning(
+                        f"Retrying job {job_id} ({job_type}) in {delay:.1f}s "
+                        f"(attempt {attempt}/{self._max_retries}): {e}"
+                    )
+                    await asyncio.sleep(delay)
+
+            await _valkey_client.ack_job(self._name, _JOB_GROUP, job_id)
+            self._metrics.increment("job_queue.processed")
+            self._metrics.observe(
+                "job_queue.duration_seconds", time.monotonic() - started_at
+            )
+            enqueued_at = fields.get("enqueued_at")
+            if enqueued_at:
+                self._metrics.observe(
+                    "job_queue.latency_seconds", time.time() - float(enqueued_at)
+                )
+        except Exception as e:
+            # The job stays pending and is reclaimed after the visibility timeout.
+            logger.error(f"Error finishing job {job_id}: {e}", exc_info=True)
+
+    async def _dead_letter(self, job_id: str, fields: Dict[str, str], error: str):
+        logger.error(f"Moving job {job_id} to the dead-letter stream: {error}")
+        await _valkey_client.dead_letter_job(
+            self._name,
+            _JOB_GROUP,
+            job_id,
+            {**fields, "job_id": job_id, "error": error, "failed_at": str(time.time())},
+            self._max_length,
+        )
+        self._metrics.increment("job_queue.dead_lettered")
+
+    async def get_job_queue_metrics(self) -> Dict[str, Any]:
+        stats = await _valkey_client.get_job_queue_stats(self._name, _JOB_GROUP)
+        return {
+            **stats,
+            "latency_seconds": self._metrics.summarize("job_queue.latency_seconds"),
+            "duration_seconds": self._metrics.summarize("job_queue.duration_seconds"),
+        }
@@ -0,0 +1,5 @@
+from app.core.llm.context_assembler import ContextAssembler
+from app.core.llm.emotion_batcher import EmotionBatcher
+from app.core.llm.prompt_builder import PromptBuilder
+
+__all__ = ["ContextAssembler", "EmotionBatcher", "PromptBuilder"]
@@ -0,0 +1,157 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+"""
+Token-budgeted assembly of the messages sent to the LLM.
+"""
+
+import logging
+from typing import Any, List, Optional, Sequence, Tuple, cast
+
+from litellm import (
+    AllMessageValues,
+    ChatCompletionSystemMessage,
+    ChatCompletionToolMessage,
+)
+from litellm.utils import token_counter
+
+from app.schemas.llm import ToolDefinition
+from app.utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+_TRUNCATED_MARKER = "\n[truncated]"
+
+
+class ContextAssembler:
+    """
+    Fits conversation history into a prompt token budget.
+
+    Every message from the latest user message onward is always kept. The
+    prompt is reduced until it fits: first tool outputs longer than
+    tool_output_max_tokens are truncated, older ones before those of the
+    current turn, then the oldest turns are dropped whole, so that a tool
+    result never loses the assistant message that requested it.
+    Token counts are estimates from litellm's tokenizer for the model.
+    """
+
+    def __init__(self, tool_output_max_tokens: int):
+        self._tool_output_max_tokens = tool_output_max_tokens
+        self._metrics = get_metrics()
+
+    def assemble(
+        self,
+        model: str,
+        system_message: ChatCompletionSystemMessage,
+        history: List[AllMessageValues],
+        budget: int,
+        tools: Optional[List[ToolDefinition]] = None,
+    ) -> List[AllMessageValues]:
+        """Return the messages to send, trimmed to fit the budget."""
+        current_turn_index = next(
+            (
+                i
+                for i, msg in reversed(list(enumerate(history)))
+                if msg["role"] == "user"
+            ),
+            0,
+        )
+        current_turn = history[current_turn_index:]
+        older = history[:current_turn_index]
+        older_tokens = [self._count(model, [message]) for message in older]
+        fixed_tokens = self._count(model, [system_message, *current_turn], tools)
+        original_tokens = fixed_tokens + sum(older_tokens)
+        total_tokens = original_tokens
+
+        total_tokens, truncated = self._truncate_tool_outputs(
+            model, older, older_tokens, total_tokens, budget
+        )
+        if total_tokens > budget:
+            current_tokens = [self._count(model, [message]) for message in current_turn]
+            total_tokens, truncated_current = self._truncate_tool_outputs(
+                model, current_turn, current_tokens, total_tokens, budget
+            )
+            truncated += truncated_current
+
+        dropped = 0
+        while total_tokens > budget and older:
+            turn_end = next(
+                (i for i in range(1, len(older)) if older[i]["role"] == "user"),
+                len(older),
+            )
+            total_tokens -= sum(older_tokens[:turn_end])
+            del older[:turn_end]
+            del older_tokens[:turn_end]
+            dropped += turn_end
+
+        self._metrics.observe("llm.estimated_prompt_tokens", total_tokens)
+        if truncated or dropped:
+            self._metrics.increment("llm.context_truncated_tool_outputs", truncated)
+            self._metrics.increment("llm.context_dropped_messages", dropped)
+            logger.info(
+                f"Assembled prompt for {model}: {original_tokens} -> {total_tokens} tokens "
+                f"(budget {budget}, truncated {truncated} tool outputs, dropped {dropped} messages)"
+            )
+        if total_tokens > budget:
+            logger.warning(
+                f"Current turn alone exceeds the prompt budget for {model}: {total_tokens} > {budget} tokens"
+            )
+        return [system_message, *older, *current_turn]
+
+    def _truncate_tool_outputs(
+        self,
+        model: str,
+        messages: List[AllMessageValues],
+        message_tokens: List[int],
+        total_tokens: int,
+        budget: int,
+    ) -> Tuple[int, int]:
+        """Truncate tool outputs in place, in order, until the total fits.
+
+        Returns the new total and the number of outputs truncated.
+        """
+        truncated = 0
+        for i, message in enumerate(messages):
+            if total_tokens <= budget:
+                break
+            if message["role"] != "tool":
+                continue
+            truncated_message = self._truncate_tool_output(model, message)
+            if truncated_message is None:
+                continue
+            tokens = self._count(model, [truncated_message])
+            total_tokens -= message_tokens[i] - tokens
+            messages[i] = truncated_message
+            message_tokens[i] = tokens
+            truncated += 1
+        return total_tokens, truncated
+
+    def _truncate_tool_output(
+        self, model: str, message: AllMessageValues
+    ) -> Optional[ChatCompletionToolMessage]:
+        content = message.get("content")
+        if not isinstance(content, str):
+            return None
+        tokens = token_counter(model=model, text=content)
+        if tokens <= self._tool_output_max_tokens:
+            return None
+        keep = len(content) * self._tool_output_max_tokens // tokens
+        return ChatCompletionToolMessage(
+            role="tool",
+            content=content[:keep] + _TRUNCATED_MARKER,
+            tool_call_id=cast(ChatCompletionToolMessage, message)["tool_call_id"],
+        )
+
+    def _count(
+        self,
+        model: str,
+        messages: Sequence[Any],
+        tools: Optional[List[ToolDefinition]] = None,
+    ) -> int:
+        return token_counter(
+            model=model,
+            messages=list(messages),
+            tools=cast(Any, tools),
+            use_default_image_token_count=True,
+        )
@@ -0,0 +1,127 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+"""
+Micro-batching of emotion classification requests.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.schemas.agent import AgentConfig
+from app.utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+ClassifyOne = Callable[[AgentConfig, str], Awaitable[str]]
+ClassifyMany = Callable[[AgentConfig, List[str]], Awaitable[List[Optional[str]]]]
+BatchKey = Tuple[str, str, str]
+
+
+class _Batch:
+    def __init__(self, agent_config: AgentConfig):
+        self.agent_config = agent_config
+        self.items: List[Tuple[str, "asyncio.Future[str]"]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class EmotionBatcher:
+    """
+    Groups concurrent emotion classifications for one model into one request.
+
+    The first job for a model opens a batch that is sent after window
+    seconds, or as soon as it holds max_batch_size jobs. Jobs that the batch
+    request cannot classify, because it failed or returned an invalid entry,
+    are retried one by one with classify_one.
+    """
+
+    def __init__(
+        self,
+        classify_one: ClassifyOne,
+        classify_many: ClassifyMany,
+        window: float,
+        max_batch_size: int,
+    ):
+        self._classify_one = classify_one
+        self._classify_many = classify_many
+        self._window = window
+        self._max_batch_size = max_batch_size
+        self._batches: Dict[BatchKey, _Batch] = {}
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self._metrics = get_metrics()
+
+    async def classify(self, agent_config: AgentConfig, text: str) -> str:
+        key = (
+            agent_config.emotion_generate_llm_base_url,
+            agent_config.emotion_generate_llm_api_key,
+            agent_config.emotion_generate_llm_model,
+        )
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = _Batch(agent_config)
+            batch.timer = loop.call_later(self._window, self._flush, key)
+            self._batches[key] = batch
+        future: "asyncio.Future[str]" = loop.create_future()
+        batch.items.append((text, future))
+        if len(batch.items) >= self._max_batch_size:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: BatchKey):
+        batch = self._batches.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: _Batch):
+        items = [(text, future) for text, future in batch.items if not future.done()]
+        if not items:
+            return
+        self._metrics.observe("emotion_batch.size", len(items))
+        results: List[Optional[str]] = [None] * len(items)
+        if len(items) > 1:
+            try:
+                results = await self._classify_many(
+                    batch.agent_config, [text for text, _ in items]
+                )
+                self._metrics.increment("emotion_batch.batch_requests")
+            except Exception as e:
+                self._metrics.increment("emotion_batch.batch_failures")
+                logger.error(f"Error classifying emotion batch: {e}")
+                results = [None] * len(items)
+
+        retries = [
+            (text, future)
+            for (text, future), result in zip(items, results)
+            if result is None
+        ]
+        if len(items) > 1 and retries:
+            self._metrics.increment("emotion_batch.fallbacks", len(retries))
+        for (_, future), result in zip(items, results):
+            if result is not None and not future.done():
+                future.set_result(result)
+        await asyncio.gather(
+            *(
+                self._classify_single(batch.agent_config, text, future)
+                for text, future in retries
+            )
+        )
+
+    async def _classify_single(
+        self, agent_config: AgentConfig, text: str, future: "asyncio.Future[str]"
+    ):
+        try:
+            result = await self._classify_one(agent_config, text)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
@@ -0,0 +1,131 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+"""
+Layout of the system prompt for provider prompt caching.
+"""
+
+import logging
+from typing import Dict, Tuple
+
+from litellm import ChatCompletionSystemMessage
+from litellm.litellm_core_utils.get_llm_provider_logic import get_llm_provider
+from litellm.utils import supports_prompt_caching
+
+from app.core.date_util import DateUtil
+from app.schemas.agent import AgentConfig
+from app.schemas.emotion import Emotion
+from app.schemas.user import UserConfig
+
+logger = logging.getLogger(__name__)
+
+# Providers that only cache prompts up to an explicit cache_control marker.
+# Others, such as OpenAI, cache stable prefixes automatically.
+_CACHE_CONTROL_PROVIDERS = {"anthropic"}
+
+_TOOL_GUIDE = """You have access to the following tools to help you better understand and assist the user:
+
+1. search_facts: Use this tool to search for relevant facts about the user. This helps you understand the user's history and preferences.
+- When you need to recall specific information about the user
+- When you want to verify something the user mentioned before
+- When you need context about past interactions
+
+2. search_nodes: Use this tool to search through the user's memory nodes. This helps you understand the context of conversations.
+- When you need to understand the flow of previous conversations
+- When you want to connect current topics with past discussions
+- When you need detailed context about specific topics
+
+Guidelines for using tools:
+- Always search for relevant information before making assumptions about the user
+- Use both tools when you need comprehensive context
+- When searching, use specific and relevant keywords
+- The search results will be in JSON format - parse them carefully to extract useful information
+
+Remember to use these tools proactively to provide more personalized and contextually relevant responses."""
+
+
+def _create_structured_output_guide() -> str:
+    return f"""Respond ONLY with a JSON object in the following format, without any additional explanation:
+{{
+    "message": Your reply to the user,
+    "emotion": The emotion of your reply, one of these emotions: {", ".join(Emotion.to_request_values())}
+}}"""
+
+
+class PromptBuilder:
+    """
+    Builds system messages with stable content first and volatile content last.
+
+    The static message holds the agent persona, the tool guide and, for
+    agents with structured output, the JSON response format. It is built
+    once per agent and sent first, so that it forms an identical prefix on
+    every request. Per-turn content such as the date and memory context is
+    appended after it as the tail of the same system message, since most
+    providers accept a system message only at the start of the conversation.
+    """
+
+    def __init__(self):
+        self._static_messages: Dict[Tuple[str, bool], ChatCompletionSystemMessage] = {}
+
+    def get_static_system_message(
+        self, agent_config: AgentConfig
+    ) -> ChatCompletionSystemMessage:
+        key = (agent_config.id, agent_config.structured_output)
+        message = self._static_messages.get(key)
+        if message is None:
+            message = self._create_static_system_message(agent_config)
+            self._static_messages[key] = message
+        return message
+
+    def build_system_message(
+        self,
+        agent_config: AgentConfig,
+        user_config: UserConfig,
+        context: str,
+        prefetched_memory: str,
+    ) -> ChatCompletionSystemMessage:
+        """Return the static system message followed by the per-turn context."""
+        static_content = self.get_static_system_message(agent_config)["content"]
+        sections = [
+            f"User name: {user_config.first_name} {user_config.last_name}",
+            f"current date time: {DateUtil.now()}",
+            context,
+            prefetched_memory,
+        ]
+        volatile = "\n\n".join(section for section in sections if section)
+        if isinstance(static_content, str):
+            return ChatCompletionSystemMessage(
+                role="system", content=f"{static_content}\n\n{volatile}"
+            )
+        # The context goes into its own part after the cache_control marker.
+        return ChatCompletionSystemMessage(
+            role="system",
+            content=[*static_content, {"type": "text", "text": volatile}],
+        )
+
+    def _create_static_system_message(
+        self, agent_config: AgentConfig
+    ) -> ChatCompletionSystemMessage:
+        sections = [agent_config.llm_system_prompt, _TOOL_GUIDE]
+        if agent_config.structured_output:
+            sections.append(_create_structured_output_guide())
+        text = "\n\n".join(section for section in sections if section)
+        if not self._uses_cache_control(agent_config.message_generate_llm_model):
+            return ChatCompletionSystemMessage(role="system", content=text)
+        return ChatCompletionSystemMessage(
+            role="system",
+            content=[
+                {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+            ],
+        )
+
+    def _uses_cache_control(self, model: str) -> bool:
+        try:
+            _, provider, _, _ = get_llm_provider(model)
+            return provider in _CACHE_CONTROL_PROVIDERS and supports_prompt_caching(
+                model
+            )
+        except Exception as e:
+            logger.debug(f"Prompt caching support unknown for {model}: {e}")
+            return False
@@ -1,11 +1,14 @@
 # Copyright (c) 0235 Inc.
 # This file is licensed under the karakuri_agent Personal Use & No Warranty License.
 # Please see the LICENSE file in the project root.
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union, cast
 import asyncio
-from typing import List, Optional, Union, cast
 import base64
+import hashlib
 import logging
 import json
+import time
 from litellm.files.main import ModelResponse
 from litellm import (
     acompletion,
@@ -24,26 +27,66 @@ from litellm import (
     CustomStreamWrapper,
 )
 from jsonschema import ValidationError
-from app.core.date_util import DateUtil
 from app.schemas.agent import AgentConfig
 from app.schemas.emotion import Emotion
 from app.schemas.llm import LLMResponse
 from app.core.config import get_settings
-from app.core.memory.memory_service import MemoryService, conversation_history_lock
+from app.core.llm.context_assembler import ContextAssembler
+from app.core.llm.emotion_batcher import EmotionBatcher
+from app.core.llm.prompt_builder import PromptBuilder
+from app.core.memory.memory_service import MemoryService, get_conversation_lock
 from app.core.status_service import StatusService
+from app.core.valkey_client import ValkeyClient
 from app.schemas.user import UserConfig
 from app.core.exceptions import LLMError, UserError
+from app.utils.cache import AsyncTTLCache
+from app.utils.image import normalize_image
 from app.utils.logging import error_handler
+from app.utils.metrics import get_metrics
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 CHECK_SUPPORT_VISION_MODEL = settings.check_support_vision_model
+_valkey_client = ValkeyClient(settings.valkey_url, settings.valkey_password)
+_PREFETCH_SECTIONS = (
+    ("search_facts", "Facts about the user related to the current message:"),
+    ("search_nodes", "Memory related to the current message:"),
+)
+
+
+@lru_cache(maxsize=None)
+def _supports_vision(model: str) -> bool:
+    return utils.supports_vision(model=model)
 
 
 class LLMService:
     def __init__(self, memory_service: MemoryService, status_service: StatusService):
         self.memory_service = memory_service
         self.status_service = status_service
+        self._prompt_builder = PromptBuilder()
+        self._context_assembler = ContextAssembler(
+            tool_output_max_tokens=settings.llm_tool_output_max_tokens
+        )
+        self._emotion_batcher = (
+            EmotionBatcher(
+                classify_one=self._classify_emotion,
+                classify_many=self._classify_emotions,
+                window=settings.emotion_batch_window_ms / 1000,
+                max_batch_size=settings.emotion_batch_max_size,
+            )
+            if settings.emotion_batch_window_ms > 0
+            else None
+        )
+        self._image_descriptions: AsyncTTLCache[Tuple[str, str], str] = AsyncTTLCache(
+            ttl=settings.image_description_cache_ttl,
+            max_size=settings.image_description_cache_max_size,
+        )
+        self._metrics = get_metrics()
+        self._metrics.register_collector("llm_turns", self.get_turn_metrics)
+        self._metrics.register_collector("prompt_cache", self.get_prompt_cache_metrics)
+        self._metrics.register_collector(
+            "image_description_cache", self.get_image_description_cache_metrics
+        )
 
     def create_emotion_analysis_prompt(self, text: str) -> str:
         emotions = Emotion.to_request_values()
@@ -57,6 +100,18 @@ Required JSON format:
     "emotion": One of these emotions: {", ".join(emotions)}
 }}"""
 
+    def create_batch_emotion_analysis_prompt(self, texts: List[str]) -> str:
+        emotions = Emotion.to_request_values()
+        return f"""analyze the emotion of each of the following texts.
+        Respond ONLY in the specified JSON format without any additional explanation.
+
+Input texts (JSON array): {json.dumps(texts, ensure_ascii=False)}
+
+Required JSON format:
+{{
+    "emotions": An array with one emotion per input text, in the same order. Each one of these emotions: {", ".join(emotions)}
+}}"""
+
     @error_handler
     async def generate_response(
         self,
@@ -68,41 +123,27 @@ Required JSON format:
         openai_request: bool = False,
     ) -> Union[Union[ModelResponse, CustomStreamWrapper], LLMResponse]:
         try:
-            async with conversation_history_lock:
+            async with get_conversation_lock(
+                agent_config.id, user_config.id, message_type
+            ):
+                turn_started_at = time.perf_counter()
+                prefetch = (
+                    asyncio.ensure_future(
+                        self._prefetch_memory(agent_config.id, user_config.id, message)
+                    )
+                    if agent_config.memory_prefetch
+                    else None
+                )
                 session_memory = await self.memory_service.get_session_memory(
                     agent_config.id, user_config.id, message_type
                 )
+                prefetched_memory = await prefetch if prefetch else ""
                 conversation_history = session_memory.messages
-                systemMessage = ChatCompletionSystemMessage(
-                    role="system",
-                    content="\n\n".join(
-                        [
-                            agent_config.llm_system_prompt,
-                            f"User name: {user_config.first_name} {user_config.last_name}",
-                            f"current date time: {DateUtil.now()}",
-                            session_memory.context,
-                            """
-                            You have access to the following tools to help you better understand and assist the user:
-
-                            1. search_facts: Use this tool to search for relevant facts about the user. This helps you understand the user's history and preferences.
-                            - When you need to recall specific information about the user
-                            - When you want to verify something the user mentioned before
-                            - When you need context about past interactions
-
-                            2. search_nodes: Use this tool to search through the user's memory nodes. This helps you understand the context of conversations.
-                            - When you need to understand the flow of previous conversations
-                            - When you want to connect current topics with past discussions
-                            - When you need detailed context about specific topics
-
-                            Guidelines for using tools:
-                            - Always search for relevant information before making assumptions about the user
-                            - Use both tools when you need comprehensive context
-                            - When searching, use specific and relevant keywords
-                            - The search results will be in JSON format - parse them carefully to extract useful information
-
-                            Remember to use these tools proactively to provide more personalized and contextually relevant responses.""",
-                        ]
-                    ),
+                systemMessage = self._prompt_builder.build_system_message(
+                    agent_config,
+                    user_config,
+                    session_memory.context,
+                    prefetched_memory,
                 )
                 if message_type == "talk":
                     await self.status_service.start_conversation(
@@ -113,12 +154,10 @@ Required JSON format:
                     )
 
                 if image:
-                    image_data_b64 = base64.b64encode(image).decode("utf-8")
-                    data_url = f"data:image/jpeg;base64,{image_data_b64}"
-
-                    if not CHECK_SUPPORT_VISION_MODEL or utils.supports_vision(
-                        model=agent_config.message_generate_llm_model
+                    if not CHECK_SUPPORT_VISION_MODEL or _supports_vision(
+                        agent_config.message_generate_llm_model
                     ):
+                        data_url = await self._create_image_data_url(image)
                         conversation_history.append(
                             ChatCompletionUserMessage(
                                 role="user",
@@ -134,8 +173,8 @@ Required JSON format:
                             )
                         )
                     else:
-                        image_description = await self.convert_images_to_text(
-                            data_url, agent_config
+                        image_description = await self.describe_image(
+                            image, agent_config
                         )
                         conversation_history.append(
                             ChatCompletionUserMessage(
@@ -151,14 +190,29 @@ Required JSON format:
                         )
                     )
 
+                turn_start_index = len(conversation_history)
                 response = await self._process_llm_response(
                     agent_config,
                     user_config.id,
                     systemMessage,
                     conversation_history,
                 )
+                self._record_turn(
+                    agent_config.memory_prefetch,
+                    time.perf_counter() - turn_started_at,
+                    any(
+                        msg["role"] == "tool"
+                        for msg in conversation_history[turn_start_index:]
+                    ),
+                )
 
                 agent_message = self.get_message_content(response)
+                emotion = None
+                if agent_config.structured_output:
+                    agent_message, emotion = self._parse_structured_response(
+                        agent_message
+                    )
+                    self._set_message_content(response, agent_message)
                 conversation_history.append(
                     ChatCompletionAssistantMessage(
                         role="assistant",
@@ -166,24 +220,26 @@ Required JSON format:
                     )
                 )
 
-                emotion = await self.generate_emotion_response(
-                    user_message=message,
-                    agent_message=agent_message,
-                    agent_config=agent_config,
-                )
+                if emotion is None:
+                    emotion = await self.generate_emotion_response(
+                        user_message=message,
+                        agent_message=agent_message,
+                        agent_config=agent_config,
+                    )
 
                 llm_response = LLMResponse(
                     user_message=message, agent_message=agent_message, emotion=emotion
                 )
 
-                asyncio.create_task(
-                    self.memory_service.update_session_memory(
+                try:
+                    await self.memory_service.update_session_memory(
                         agent_config.id,
                         user_config.id,
                         message_type,
                         conversation_history,
                     )
-                )
+                except Exception as e:
+                    logger.error(f"Failed to update session memory: {e}")
             if openai_request:
                 return response
             else:
@@ -214,51 +270,73 @@ Required JSON format:
         max_tool_calls: int = 5,
     ) -> Union[ModelResponse, CustomStreamWrapper]:
         try:
-            if max_tool_calls <= 0:
-                logger.warning("Maximum number of tool executions reached")
-                raise Exception("Maximum number of tool executions reached")
-
-            response = await acompletion(
-                base_url=agent_config.message_generate_llm_base_url,
-                api_key=agent_config.message_generate_llm_api_key,
-                model=agent_config.message_generate_llm_model,
-                messages=[systemMessage] + conversation_history[:],
-                tools=self.memory_service.get_support_tools(agent_config.id),
-                tool_choice="auto",
-            )
+            tools = self.memory_service.get_support_tools(agent_config.id)
+            for iteration in range(max_tool_calls):
+                messages = self._context_assembler.assemble(
+                    agent_config.message_generate_llm_model,
+                    systemMessage,
+                    conversation_history,
+                    agent_config.prompt_token_budget,
+                    tools,
+                )
+                completion_started_at = time.perf_counter()
+                response = await acompletion(
+                    base_url=agent_config.message_generate_llm_base_url,
+                    api_key=agent_config.message_generate_llm_api_key,
+                    model=agent_config.message_generate_llm_model,
+                    messages=messages,
+                    tools=tools,
+                    tool_choice="auto",
+                    response_format=(
+                        {"type": "json_object"}
+                        if agent_config.structured_output
+                        else None
+                    ),
+                )
+                completion_seconds = time.perf_counter() - completion_started_at
+
+                if not (
+                    isinstance(response, ModelResponse)
+                    and isinstance(response.choices[0], Choices)
+                    and response.choices[0].message.tool_calls
+                ):
+                    self._record_iteration(
+                        agent_config.id, iteration, response, completion_seconds, 0.0, 0
+                    )
+                    return response
 
-            if (
-                isinstance(response, ModelResponse)
-                and isinstance(response.choices[0], Choices)
-                and response.choices[0].message.tool_calls
-            ):
                 tool_calls = response.choices[0].message.tool_calls
                 conversation_history.append(
                     cast(ChatCompletionFunctionMessage, response.choices[0].message)
                 )
-                for tool_call in tool_calls:
-                    tool_results = await self._handle_tool_call(
-                        tool_call, agent_config.id, user_id
+                tools_started_at = time.perf_counter()
+                tool_results = await asyncio.gather(
+                    *(
+                        self._run_tool_call(tool_call, agent_config.id, user_id)
+                        for tool_call in tool_calls
                     )
-                    logger.info(f"tool_results: {tool_results}")
-
+                )
+                tools_seconds = time.perf_counter() - tools_started_at
+                for tool_call, tool_result in zip(tool_calls, tool_results):
+                    logger.info(f"tool_results: {tool_result}")
                     conversation_history.append(
                         ChatCompletionToolMessage(
                             role="tool",
-                            content=tool_results,
+                            content=tool_result,
                             tool_call_id=tool_call.id,
                         )
                     )
-
-                return await self._process_llm_response(
-                    agent_config,
-                    user_id,
-                    systemMessage,
-                    conversation_history,
-                    max_tool_calls - 1,
+                self._record_iteration(
+                    agent_config.id,
+                    iteration,
+                    response,
+                    completion_seconds,
+                    tools_seconds,
+                    len(tool_calls),
                 )
 
-            return response
+            logger.warning("Maximum number of tool executions reached")
+            raise Exception("Maximum number of tool executions reached")
 
         except Exception as e:
             raise LLMError(
@@ -270,6 +348,153 @@ Required JSON format:
                 },
             ) from e
 
+    async def _prefetch_memory(self, agent_id: str, user_id: str, message: str) -> str:
+        """Search memory for the incoming message ahead of the first LLM call.
+
+        The results are given to the model as context, which usually saves the
+        tool-call round trip. Failed or slow searches are left out; the tools
+        stay available for anything the prefetch did not cover.
+        """
+        support_tools = {
+            tool["function"]["name"]
+            for tool in self.memory_service.get_support_tools(agent_id)
+        }
+        sections = [
+            (tool_name, title)
+            for tool_name, title in _PREFETCH_SECTIONS
+            if tool_name in support_tools
+        ]
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(
+                    self.memory_service.tool_call(
+                        agent_id, user_id, tool_name, message
+                    ),
+                    settings.llm_tool_call_timeout,
+                )
+                for tool_name, _ in sections
+            ),
+            return_exceptions=True,
+        )
+        prefetched = []
+        for (tool_name, title), result in zip(sections, results):
+            if isinstance(result, BaseException):
+                self._metrics.increment("llm.prefetch_failures")
+                logger.warning(f"Memory prefetch {tool_name} failed: {result!r}")
+            elif result:
+                prefetched.append(f"{title}\n{result}")
+        return "\n\n".join(prefetched)
+
+    def _record_turn(self, prefetch: bool, seconds: float, used_tools: bool):
+        mode = "prefetch" if prefetch else "no_prefetch"
+        self._metrics.observe(f"llm.turn_seconds.{mode}", seconds)
+        self._metrics.increment(f"llm.turns.{mode}")
+        if used_tools:
+            self._metrics.increment(f"llm.turns_with_tool_calls.{mode}")
+
+    async def get_turn_metrics(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        for mode in ("prefetch", "no_prefetch"):
+            turns = self._metrics.counter(f"llm.turns.{mode}")
+            result[mode] = {
+                "turns": turns,
+                "tool_call_rate": (
+                    self._metrics.counter(f"llm.turns_with_tool_calls.{mode}") / turns
+                    if turns
+                    else 0.0
+                ),
+                "latency_seconds": self._metrics.summarize(f"llm.turn_seconds.{mode}"),
+            }
+        prefetch_latency = result["prefetch"]["latency_seconds"]
+        no_prefetch_latency = result["no_prefetch"]["latency_seconds"]
+        if prefetch_latency["count"] and no_prefetch_latency["count"]:
+            result["saved_seconds"] = {
+                "p50": no_prefetch_latency["p50"] - prefetch_latency["p50"],
+                "p95": no_prefetch_latency["p95"] - prefetch_latency["p95"],
+            }
+        return result
+
+    def _record_iteration(
+        self,
+        agent_id: str,
+        iteration: int,
+        response: Union[ModelResponse, CustomStreamWrapper],
+        completion_seconds: float,
+        tools_seconds: float,
+        tool_call_count: int,
+    ):
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        cached_tokens = self._get_cached_tokens(usage)
+        if prompt_tokens is not None:
+            self._metrics.observe("llm.prompt_tokens", prompt_tokens)
+            self._metrics.increment("llm.prompt_tokens_total", prompt_tokens)
+            self._metrics.increment("llm.cached_prompt_tokens_total", cached_tokens)
+        self._metrics.observe("llm.completion_seconds", completion_seconds)
+        if tool_call_count:
+            self._metrics.observe("llm.tool_calls_seconds", tools_seconds)
+            self._metrics.increment("llm.tool_calls", tool_call_count)
+        logger.info(
+            f"LLM iteration {iteration} for agent {agent_id}: {prompt_tokens} prompt tokens "
+            f"({cached_tokens} cached), "
+            f"completion {completion_seconds:.3f}s, {tool_call_count} tool calls {tools_seconds:.3f}s"
+        )
+
+    def _get_cached_tokens(self, usage: Any) -> int:
+        # OpenAI style usage reports prompt_tokens_details.cached_tokens,
+        # Anthropic style usage reports cache_read_input_tokens.
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or getattr(
+            usage, "cache_read_input_tokens", None
+        )
+        return cached_tokens or 0
+
+    async def get_prompt_cache_metrics(self) -> Dict[str, Any]:
+        prompt_tokens = self._metrics.counter("llm.prompt_tokens_total")
+        cached_tokens = self._metrics.counter("llm.cached_prompt_tokens_total")
+        return {
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "hit_rate": cached_tokens / prompt_tokens if prompt_tokens else 0.0,
+        }
+
+    def _parse_structured_response(self, content: str) -> Tuple[str, Optional[str]]:
+        """Split a structured reply into its message and emotion.
+
+        Returns the emotion as None when it is missing or invalid, so that the
+        caller falls back to the emotion classifier. Content that is not a
+        valid structured reply is used as the message as is.
+        """
+        try:
+            parsed = json.loads(content)
+        except json.JSONDecodeError as e:
+            self._metrics.increment("llm.structured_output_failures")
+            logger.warning(f"Error parsing structured response: {str(e)}")
+            return content, None
+
+        message = parsed.get("message") if isinstance(parsed, dict) else None
+        if not isinstance(message, str) or not message.strip():
+            self._metrics.increment("llm.structured_output_failures")
+            logger.warning("Structured response has no message")
+            return content, None
+
+        emotion = parsed.get("emotion")
+        if emotion not in Emotion.to_request_values():
+            self._metrics.increment("llm.structured_output_emotion_fallbacks")
+            logger.warning(f"Invalid emotion value in structured response: {emotion}")
+            return message, None
+
+        self._metrics.increment("llm.structured_output_successes")
+        return message, emotion
+
+    def _set_message_content(
+        self, response: Union[ModelResponse, CustomStreamWrapper], content: str
+    ):
+        if isinstance(response, ModelResponse) and isinstance(
+            response.choices[0], Choices
+        ):
+            response.choices[0].message.content = content
+
     def get_message_content(
         self, response: Union[ModelResponse, CustomStreamWrapper]
     ) -> str:
@@ -294,6 +519,56 @@ Required JSON format:
 
         return content
 
+    async def _create_image_data_url(self, image: bytes) -> str:
+        normalized = await normalize_image(image)
+        image_data_b64 = base64.b64encode(normalized.data).decode("utf-8")
+        return f"data:{normalized.mime_type};base64,{image_data_b64}"
+
+    async def describe_image(self, image: bytes, agent_config: AgentConfig) -> str:
+        """Return a text description of an image, reusing earlier descriptions.
+
+        Descriptions are cached by vision model and image content hash, in
+        process and in Valkey, so resent images skip the vision LLM call.
+        """
+        model = agent_config.vision_generate_llm_model
+        image_hash = hashlib.sha256(image).hexdigest()
+        return await self._image_descriptions.get_or_load(
+            (model, image_hash),
+            lambda: self._load_image_description(image, image_hash, agent_config),
+        )
+
+    async def _load_image_description(
+        self, image: bytes, image_hash: str, agent_config: AgentConfig
+    ) -> str:
+        model = agent_config.vision_generate_llm_model
+        try:
+            description = await _valkey_client.get_image_description(model, image_hash)
+        except Exception as e:
+            logger.error(f"Failed to read cached image description: {e}")
+            description = None
+        if description:
+            self._metrics.increment("image_description_cache.valkey_hits")
+            return description
+
+        data_url = await self._create_image_data_url(image)
+        description = await self.convert_images_to_text(data_url, agent_config)
+        try:
+            await _valkey_client.set_image_description(
+                model, image_hash, description, settings.image_description_cache_ttl
+            )
+        except Exception as e:
+            logger.error(f"Failed to cache image description: {e}")
+        return description
+
+    async def get_image_description_cache_metrics(self) -> Dict[str, Any]:
+        return {
+            "hits": self._image_descriptions.hits,
+            "misses": self._image_descriptions.misses,
+            "coalesced": self._image_descriptions.coalesced,
+            "hit_rate": self._image_descriptions.hit_rate,
+            "valkey_hits": self._metrics.counter("image_description_cache.valkey_hits"),
+        }
+
     async def convert_images_to_text(
         self, data_url: str, agent_config: AgentConfig
     ) -> str:
@@ -330,7 +605,59 @@ Required JSON format:
         agent_message: str,
         agent_config: AgentConfig,
     ) -> str:
-        emotion_prompt = self.create_emotion_analysis_prompt(agent_message)
+        if self._emotion_batcher is not None:
+            return await self._emotion_batcher.classify(agent_config, agent_message)
+        return await self._classify_emotion(agent_config, agent_message)
+
+    async def _classify_emotion(self, agent_config: AgentConfig, text: str) -> str:
+        content = await self._request_emotion_analysis(
+            agent_config, self.create_emotion_analysis_prompt(text)
+        )
+        try:
+            parsed_response = json.loads(content)
+            if (
+                not isinstance(parsed_response, dict)
+                or "emotion" not in parsed_response
+            ):
+                raise ValueError("Invalid JSON structure")
+
+            if parsed_response["emotion"] not in Emotion.to_request_values():
+                raise ValueError(f"Invalid emotion value: {parsed_response['emotion']}")
+            return parsed_response["emotion"]
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.error(f"Error parsing emotion response: {str(e)}")
+            return Emotion.NEUTRAL.value
+
+    async def _classify_emotions(
+        self, agent_config: AgentConfig, texts: List[str]
+    ) -> List[Optional[str]]:
+        """Classify several texts in one request.
+
+        Entries that are missing or invalid in the response are returned as
+        None, for the caller to classify individually.
+        """
+        content = await self._request_emotion_analysis(
+            agent_config, self.create_batch_emotion_analysis_prompt(texts)
+        )
+        try:
+            parsed_response = json.loads(content)
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parsing batch emotion response: {str(e)}")
+            return [None] * len(texts)
+        emotions = (
+            parsed_response.get("emotions")
+            if isinstance(parsed_response, dict)
+            else None
+        )
+        if not isinstance(emotions, list) or len(emotions) != len(texts):
+            logger.error("Invalid batch emotion response structure")
+            return [None] * len(texts)
+        valid_emotions = Emotion.to_request_values()
+        return [emotion if emotion in valid_emotions else None for emotion in emotions]
+
+    async def _request_emotion_analysis(
+        self, agent_config: AgentConfig, prompt: str
+    ) -> str:
         emotion_messages: List[AllMessageValues] = [
             ChatCompletionSystemMessage(
                 role="system",
@@ -338,7 +665,7 @@ Required JSON format:
             ),
             ChatCompletionUserMessage(
                 role="user",
-                content=emotion_prompt,
+                content=prompt,
             ),
         ]
         emotion_response = await acompletion(
@@ -348,21 +675,32 @@ Required JSON format:
             messages=emotion_messages,
             response_format={"type": "json_object"},
         )
+        return self.get_message_content(emotion_response)
 
-        try:
-            parsed_response = json.loads(self.get_message_content(emotion_response))
-            if (
-                not isinstance(parsed_response, dict)
-                or "emotion" not in parsed_response
-            ):
-                raise ValueError("Invalid JSON structure")
+    async def _run_tool_call(
+        self, tool_call: ChatCompletionMessageToolCall, agent_id: str, user_id: str
+    ) -> str:
+        """Run one tool call, turning failures into a result the model can read.
 
-            if parsed_response["emotion"] not in Emotion.to_request_values():
-                raise ValueError(f"Invalid emotion value: {parsed_response['emotion']}")
-            return parsed_response["emotion"]
-        except (json.JSONDecodeError, ValueError) as e:
-            logger.error(f"Error parsing emotion response: {str(e)}")
-            return Emotion.NEUTRAL.value
+        Tool calls of one step run concurrently, so a slow or failing tool is
+        reported back to the model instead of failing the whole turn.
+        """
+        tool_name = tool_call.function.name
+        try:
+            return await asyncio.wait_for(
+                self._handle_tool_call(tool_call, agent_id, user_id),
+                settings.llm_tool_call_timeout,
+            )
+        except asyncio.TimeoutError:
+            self._metrics.increment("llm.tool_call_timeouts")
+            logger.warning(
+                f"Tool call {tool_name} timed out after {settings.llm_tool_call_timeout}s"
+            )
+            return f"Error: {tool_name} timed out"
+        except Exception as e:
+            self._metrics.increment("llm.tool_call_failures")
+            logger.error(f"Tool call {tool_name} failed: {e}")
+            return f"Error: {tool_name} failed"
 
     async def _handle_tool_call(
         self, tool_call: ChatCompletionMessageToolCall, agent_id: str, user_id: str
@@ -4,7 +4,10 @@
 
 import logging
 import asyncio
-from typing import List
+import json
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.core.date_util import DateUtil
 from app.schemas.llm import ToolDefinition
@@ -12,16 +15,73 @@ from app.schemas.memory import KarakuriMemory, AllMessageValues
 from app.core.valkey_client import ValkeyClient
 from app.core.agent_manager import get_agent_manager
 from app.core.config import get_settings
-from app.core.memory.zep_client import ZepClient, create_zep_client
+from app.core.memory.zep_client import (
+    ZepClient,
+    ZepClientRegistry,
+    get_message_text,
+)
 from app.schemas.user import UserConfig
+from app.utils.cache import AsyncTTLCache
+from app.utils.metrics import get_metrics
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 _valkey_client = ValkeyClient(settings.valkey_url, settings.valkey_password)
-conversation_history_lock = asyncio.Lock()
+_conversation_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+    weakref.WeakValueDictionary()
+)
+_MEMORY_QUEUE_LOCK_TTL = max(60, int(settings.zep_timeout * 4))
+_MEMORY_QUEUE_MAX_RETRY_DELAY = 300.0
+_MEMORY_DEAD_LETTER_MAX_LENGTH = 10000
+_CACHED_TOOLS = ("search_facts", "search_nodes")
+
+# Agent id, user id, memory version of the user and normalized query.
+ToolCacheKey = Tuple[str, str, str, str]
+
+
+def get_conversation_lock(
+    agent_id: str, user_id: str, message_type: str
+) -> asyncio.Lock:
+    """Return the lock guarding one conversation's history.
+
+    Locks are scoped per agent, user and message type so that unrelated
+    conversations can be processed concurrently.
+    """
+    key = f"{agent_id}_{user_id}_{message_type}"
+    lock = _conversation_locks.get(key)
+    if lock is None:
+        lock = asyncio.Lock()
+        _conversation_locks[key] = lock
+    return lock
 
 
 class MemoryService:
+    def __init__(self):
+        self._zep_clients = ZepClientRegistry(
+            max_connections=settings.zep_max_connections,
+            max_keepalive_connections=settings.zep_max_keepalive_connections,
+            timeout=settings.zep_timeout,
+        )
+        self._support_tools: Dict[str, List[ToolDefinition]] = {}
+        # Keyed by agent id, user id and user version, see get_user.
+        self._user_cache: AsyncTTLCache[Tuple[str, str, str], Optional[UserConfig]] = (
+            AsyncTTLCache(
+                ttl=settings.user_cache_ttl,
+                max_size=settings.user_cache_max_size,
+                negative_ttl=settings.user_cache_negative_ttl,
+            )
+        )
+        self._tool_caches: Dict[str, AsyncTTLCache[ToolCacheKey, str]] = {
+            tool_name: AsyncTTLCache(
+                ttl=settings.tool_cache_ttl, max_size=settings.tool_cache_max_size
+            )
+            for tool_name in _CACHED_TOOLS
+        }
+        self._memory_queued = asyncio.Event()
+        self._metrics = get_metrics()
+        self._metrics.register_collector("memory_queue", self.get_memory_queue_metrics)
+        self._metrics.register_collector("tool_cache", self.get_tool_cache_metrics)
+
     async def get_session_memory(
         self,
         agent_id: str,
@@ -39,54 +99,286 @@ class MemoryService:
         message_type: str,
         conversation_history: List[AllMessageValues],
     ):
-        async with conversation_history_lock:
-            zep_client = self._create_zep_client(agent_id)
-            messages = conversation_history[
-                next(
-                    (
-                        i
-                        for i, msg in reversed(list(enumerate(conversation_history)))
-                        if msg["role"] == "user"
-                    ),
-                    0,
-                ) :
-            ]
-
-            session_key = self._create_session_key(agent_id, user_id, message_type)
-            session_id = await _valkey_client.get_session_id(session_key)
-            await zep_client.add_memory(
-                session_id=session_id,
-                user_id=user_id,
-                messages=messages,
-            )
-            memory = await zep_client.get_memory(
-                session_id=session_id,
-                lastn=30,
+        """Record the latest turn of a conversation.
+
+        The turn is appended to the session's local memory window right away,
+        so the next turn sees it without a Zep round trip, and is queued for
+        writing to Zep by flush_memory_queue.
+        """
+        last_user_index = next(
+            (
+                i
+                for i, msg in reversed(list(enumerate(conversation_history)))
+                if msg["role"] == "user"
+            ),
+            0,
+        )
+        messages = [
+            {"role": msg["role"], "content": get_message_text(msg)}
+            for msg in conversation_history[last_user_index:]
+        ]
+        window_messages = [
+            message
+            for message in messages
+            if message["role"] in ("user", "assistant") and message["content"]
+        ]
+
+        session_key = self._create_session_key(agent_id, user_id, message_type)
+        session_id = await _valkey_client.get_session_id(session_key)
+        await _valkey_client.append_memory_window(
+            session_id, window_messages, settings.memory_window_size
+        )
+
+        now = time.time()
+        entry = json.dumps(
+            {
+                "agent_id": agent_id,
+                "user_id": user_id,
+                "messages": messages,
+                "enqueued_at": now,
+            }
+        )
+        # The flush delay lets consecutive turns of one session share a write.
+        await _valkey_client.enqueue_memory(
+            session_id, entry, now + settings.memory_queue_flush_delay
+        )
+        self._metrics.increment("memory_queue.enqueued_messages", len(messages))
+        self._memory_queued.set()
+
+    async def flush_memory_queue(self, drain: bool = False) -> int:
+        """Write due queued turns to Zep and return the number of sessions flushed.
+
+        With drain=True, sessions are flushed regardless of their due time.
+        """
+        now = float("inf") if drain else time.time()
+        session_ids = await _valkey_client.get_due_memory_sessions(
+            now, settings.memory_queue_batch_sessions
+        )
+        results = await asyncio.gather(
+            *(self._flush_session(session_id) for session_id in session_ids)
+        )
+        return sum(1 for flushed in results if flushed)
+
+    async def wait_for_memory_queue(self, max_wait: float):
+        self._memory_queued.clear()
+        next_due = await _valkey_client.get_next_memory_due()
+        timeout = max_wait
+        if next_due is not None:
+            # Due sessions locked by another worker must not cause a busy loop.
+            timeout = min(max_wait, max(0.1, next_due - time.time()))
+        try:
+            await asyncio.wait_for(self._memory_queued.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def drain_memory_queue(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                flushed = await asyncio.wait_for(
+                    self.flush_memory_queue(drain=True), remaining
+                )
+            except asyncio.TimeoutError:
+                break
+            if not flushed:
+                break
+
+    async def _flush_session(self, session_id: str) -> bool:
+        lock_token = await _valkey_client.acquire_memory_queue_lock(
+            session_id, _MEMORY_QUEUE_LOCK_TTL
+        )
+        if lock_token is None:
+            return False
+        try:
+            raw_entries = await _valkey_client.get_queued_memory(
+                session_id, settings.memory_queue_batch_size
             )
-            await _valkey_client.update_memory(session_id, memory)
-            await _valkey_client.update_facts(agent_id, user_id, memory.facts or "")
+            entries: List[Dict[str, Any]] = []
+            for raw_entry in raw_entries:
+                try:
+                    entries.append(json.loads(raw_entry))
+                except json.JSONDecodeError as e:
+                    logger.error(f"Dropping malformed memory queue entry: {e}")
+            if not entries:
+                await _valkey_client.ack_queued_memory(session_id, len(raw_entries))
+                return False
+
+            agent_id = entries[0]["agent_id"]
+            user_id = entries[0]["user_id"]
+            messages = [message for entry in entries for message in entry["messages"]]
+            try:
+                await self._write_session_memory(
+                    agent_id, user_id, session_id, messages
+                )
+            except Exception as e:
+                self._metrics.increment("memory_queue.failures")
+                failures = await _valkey_client.record_memory_flush_failure(session_id)
+                if failures >= settings.memory_queue_max_attempts:
+                    # A batch Zep keeps rejecting must not block the session.
+                    await _valkey_client.dead_letter_queued_memory(
+                        session_id,
+                        len(raw_entries),
+                        [
+                            json.dumps(
+                                {
+                                    "session_id": session_id,
+                                    "entry": raw_entry,
+                                    "error": str(e),
+                                    "failed_at": time.time(),
+                                }
+                            )
+                            for raw_entry in raw_entries
+                        ],
+                        _MEMORY_DEAD_LETTER_MAX_LENGTH,
+                    )
+                    self._metrics.increment(
+                        "memory_queue.dead_lettered", len(raw_entries)
+                    )
+                    logger.error(
+                        f"Moved {len(raw_entries)} memory entries of session {session_id} "
+                        f"to the dead-letter list after {failures} attempts: {e}"
+                    )
+                    return False
+                delay = min(
+                    settings.memory_queue_retry_base_delay * (2 ** (failures - 1)),
+                    _MEMORY_QUEUE_MAX_RETRY_DELAY,
+                )
+                await _valkey_client.reschedule_memory_session(
+                    session_id, time.time() + delay
+                )
+                logger.error(
+                    f"Failed to write memory for session {session_id}, retrying in {delay:.0f}s "
+                    f"(attempt {failures}/{settings.memory_queue_max_attempts}): {e}"
+                )
+                return False
+
+            await _valkey_client.ack_queued_memory(session_id, len(raw_entries))
+            await self._invalidate_tool_results(agent_id, user_id)
+            now = time.time()
+            for entry in entries:
+                self._metrics.observe(
+                    "memory_queue.lag_seconds", now - entry["enqueued_at"]
+                )
+            self._metrics.increment("memory_queue.flushed_batches")
+            self._metrics.increment("memory_queue.flushed_messages", len(messages))
+
+            try:
+                if await _valkey_client.claim_memory_refresh(
+                    session_id, settings.memory_context_refresh_interval
+                ):
+                    await self._refresh_memory_context(agent_id, user_id, session_id)
+            except Exception as e:
+                logger.error(f"Failed to refresh memory for session {session_id}: {e}")
+            return True
+        finally:
+            if not await _valkey_client.release_memory_queue_lock(
+                session_id, lock_token
+            ):
+                logger.warning(
+                    f"Memory queue lock of session {session_id} expired during a flush"
+                )
+
+    async def _write_session_memory(
+        self,
+        agent_id: str,
+        user_id: str,
+        session_id: str,
+        messages: List[AllMessageValues],
+    ):
+        zep_client = self._get_zep_client(agent_id)
+        if not await _valkey_client.is_zep_session_created(session_id):
+            await zep_client.add_session(user_id=user_id, session_id=session_id)
+            await _valkey_client.mark_zep_session_created(session_id)
+        await zep_client.add_memory(
+            session_id=session_id,
+            user_id=user_id,
+            messages=messages,
+        )
+
+    async def _refresh_memory_context(
+        self, agent_id: str, user_id: str, session_id: str
+    ):
+        # Only context and facts are taken from Zep; the message window is
+        # maintained locally by update_session_memory.
+        zep_client = self._get_zep_client(agent_id)
+        memory = await zep_client.get_memory(
+            session_id=session_id,
+            lastn=1,
+        )
+        await _valkey_client.update_memory(session_id, memory)
+        await _valkey_client.update_facts(agent_id, user_id, memory.facts or "")
+
+    async def get_memory_queue_metrics(self) -> Dict[str, Any]:
+        pending_sessions = await _valkey_client.count_memory_sessions()
+        next_due = await _valkey_client.get_next_memory_due()
+        return {
+            "pending_sessions": pending_sessions,
+            "oldest_due_lag_seconds": (
+                max(0.0, time.time() - next_due) if next_due is not None else 0.0
+            ),
+            "lag_seconds": self._metrics.summarize("memory_queue.lag_seconds"),
+            "dead_letters": await _valkey_client.count_memory_dead_letters(),
+        }
+
+    async def get_tool_cache_metrics(self) -> Dict[str, Any]:
+        return {
+            tool_name: {
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "coalesced": cache.coalesced,
+                "hit_rate": cache.hit_rate,
+            }
+            for tool_name, cache in self._tool_caches.items()
+        }
 
     async def tool_call(
         self, agent_id: str, user_id: str, method_name: str, query: str
     ) -> str:
+        """Run a memory search tool, reusing recent results for the same query.
+
+        Results are cached per agent, user and normalized query for
+        TOOL_CACHE_TTL seconds. The key also carries the user's memory version
+        from Valkey, which every process bumps once it writes new memory of
+        the user to Zep, so no process keeps serving results from before.
+        """
         if method_name == "search_facts":
-            return "\n".join(await self.search_facts(agent_id, user_id, query))
+            search = self.search_facts
         elif method_name == "search_nodes":
-            return "\n".join(await self.search_nodes(agent_id, user_id, query))
+            search = self.search_nodes
         else:
             raise ValueError(f"Unsupported tool called: {method_name}")
 
+        async def load() -> str:
+            return "\n".join(await search(agent_id, user_id, query))
+
+        version = await _valkey_client.get_cache_version("memory", agent_id, user_id)
+        key = (agent_id, user_id, version, self._normalize_query(query))
+        return await self._tool_caches[method_name].get_or_load(key, load)
+
+    def _normalize_query(self, query: Optional[str]) -> str:
+        return " ".join((query or "").split()).casefold()
+
+    async def _invalidate_tool_results(self, agent_id: str, user_id: str):
+        await _valkey_client.bump_cache_version("memory", agent_id, user_id)
+        for cache in self._tool_caches.values():
+            cache.invalidate_matching(
+                lambda key: key[0] == agent_id and key[1] == user_id
+            )
+
     async def search_facts(self, agent_id: str, user_id: str, query: str) -> list[str]:
-        zep_client = self._create_zep_client(agent_id)
+        zep_client = self._get_zep_client(agent_id)
         return await zep_client.search_facts(user_id, query)
 
     async def search_nodes(self, agent_id: str, user_id: str, query: str) -> list[str]:
-        zep_client = self._create_zep_client(agent_id)
+        zep_client = self._get_zep_client(agent_id)
         return await zep_client.search_nodes(user_id, query)
 
-    def _create_zep_client(self, agent_id: str) -> ZepClient:
+    def _get_zep_client(self, agent_id: str) -> ZepClient:
         agent_config = get_agent_manager().get_agent(agent_id)
-        return create_zep_client(
+        return self._zep_clients.get(
             base_url=agent_config.zep_url, api_key=agent_config.zep_api_secret
         )
 
@@ -98,23 +390,48 @@ class MemoryService:
     async def add_user(
         self, agent_id: str, user_id: str, last_name: str, first_name: str
     ):
-        zep_client = self._create_zep_client(agent_id)
+        zep_client = self._get_zep_client(agent_id)
         await zep_client.add_user(
             user_id=user_id, last_name=last_name, first_name=first_name
         )
+        await self._invalidate_user(agent_id, user_id)
 
     async def delete_user(self, agent_id: str, user_id: str):
-        zep_client = self._create_zep_client(agent_id)
+        zep_client = self._get_zep_client(agent_id)
         await zep_client.delete_user(user_id=user_id)
+        await self._invalidate_user(agent_id, user_id)
+
+    async def get_user(self, agent_id: str, user_id: str) -> Optional[UserConfig]:
+        """Look up a user, reusing the result for USER_CACHE_TTL seconds.
+
+        The key carries the user's version from Valkey, which add_user and
+        delete_user bump in whichever process runs them, so no process keeps
+        serving a user that was added or deleted since.
+        """
+        zep_client = self._get_zep_client(agent_id)
+        version = await _valkey_client.get_cache_version("user", agent_id, user_id)
+        return await self._user_cache.get_or_load(
+            (agent_id, user_id, version), lambda: zep_client.get_user(user_id=user_id)
+        )
 
-    async def get_user(self, agent_id: str, user_id: str) -> UserConfig:
-        zep_client = self._create_zep_client(agent_id)
-        return await zep_client.get_user(user_id=user_id)
+    async def _invalidate_user(self, agent_id: str, user_id: str):
+        await _valkey_client.bump_cache_version("user", agent_id, user_id)
+        self._user_cache.invalidate_matching(
+            lambda key: key[0] == agent_id and key[1] == user_id
+        )
+        await self._invalidate_tool_results(agent_id, user_id)
 
     async def list_users(self, agent_id: str) -> List[UserConfig]:
-        zep_client = self._create_zep_client(agent_id)
+        zep_client = self._get_zep_client(agent_id)
         return await zep_client.list_users()
 
     def get_support_tools(self, agent_id: str) -> List[ToolDefinition]:
-        zep_client = self._create_zep_client(agent_id)
-        return zep_client.get_support_tools()
+        support_tools = self._support_tools.get(agent_id)
+        if support_tools is None:
+            zep_client = self._get_zep_client(agent_id)
+            support_tools = zep_client.get_support_tools()
+            self._support_tools[agent_id] = support_tools
+        return support_tools
+
+    async def close(self):
+        await self._zep_clients.close()
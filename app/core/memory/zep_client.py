@@ -3,7 +3,8 @@
 # Please see the LICENSE file in the project root.
 
 from abc import ABC, abstractmethod
-from typing import Optional, Sequence, Union
+from typing import Dict, Optional, Sequence, Tuple, Union
+import httpx
 from fastapi import HTTPException
 from litellm import (
     ChatCompletionUserMessage,
@@ -71,7 +72,7 @@ class ZepClient(ABC):
         pass
 
     @abstractmethod
-    async def get_user(self, user_id: str) -> UserConfig:
+    async def get_user(self, user_id: str) -> Optional[UserConfig]:
         pass
 
     @abstractmethod
@@ -88,8 +89,19 @@ class ZepClient(ABC):
 
 
 class ZepPythonClient(ZepClient):
-    def __init__(self, base_url: str, api_key: str):
-        self.client = zep_python.client.AsyncZep(base_url=base_url, api_key=api_key)
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        httpx_client: Optional[httpx.AsyncClient] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.client = zep_python.client.AsyncZep(
+            base_url=base_url,
+            api_key=api_key,
+            httpx_client=httpx_client,
+            timeout=timeout,
+        )
 
     def get_support_tools(self) -> list[ToolDefinition]:
         return [tool_search_facts]
@@ -118,10 +130,6 @@ class ZepPythonClient(ZepClient):
     async def add_memory(
         self, user_id: str, session_id: str, messages: list[AllMessageValues]
     ):
-        await self.add_session(
-            session_id=session_id,
-            user_id=user_id,
-        )
         zep_messages = _create_zep_messeges(is_cloud=False, messages=messages)
         await self.client.memory.add(
             session_id=session_id,
@@ -136,8 +144,11 @@ class ZepPythonClient(ZepClient):
     async def delete_user(self, user_id: str):
         await self.client.user.delete(user_id=user_id)
 
-    async def get_user(self, user_id: str) -> UserConfig:
-        user = await self.client.user.get(user_id=user_id)
+    async def get_user(self, user_id: str) -> Optional[UserConfig]:
+        try:
+            user = await self.client.user.get(user_id=user_id)
+        except zep_python.NotFoundError:
+            return None
         if not user.user_id:
             raise HTTPException(
                 status_code=404, detail="User ID is required and cannot be empty"
@@ -179,8 +190,15 @@ class ZepPythonClient(ZepClient):
 
 
 class ZepCloudClient(ZepClient):
-    def __init__(self, api_key: str):
-        self.client = zep_cloud.client.AsyncZep(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        httpx_client: Optional[httpx.AsyncClient] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.client = zep_cloud.client.AsyncZep(
+            api_key=api_key, httpx_client=httpx_client, timeout=timeout
+        )
 
     def get_support_tools(self) -> list[ToolDefinition]:
         return [tool_search_facts, tool_search_nodes]
@@ -209,7 +227,6 @@ class ZepCloudClient(ZepClient):
     async def add_memory(
         self, user_id: str, session_id: str, messages: list[AllMessageValues]
     ):
-        await self.add_session(user_id=user_id, session_id=session_id)
         zep_messages = _create_zep_messeges(is_cloud=True, messages=messages)
         await self.client.memory.add(
             session_id=session_id,
@@ -224,8 +241,11 @@ class ZepCloudClient(ZepClient):
     async def delete_user(self, user_id: str):
         await self.client.user.delete(user_id=user_id)
 
-    async def get_user(self, user_id: str) -> UserConfig:
-        user = await self.client.user.get(user_id=user_id)
+    async def get_user(self, user_id: str) -> Optional[UserConfig]:
+        try:
+            user = await self.client.user.get(user_id=user_id)
+        except zep_cloud.NotFoundError:
+            return None
         if not user.user_id:
             raise HTTPException(
                 status_code=404, detail="User ID is required and cannot be empty"
@@ -267,11 +287,58 @@ class ZepCloudClient(ZepClient):
         return [node.summary for node in nodes.nodes]
 
 
-def create_zep_client(base_url: str, api_key: str) -> ZepClient:
+def create_zep_client(
+    base_url: str,
+    api_key: str,
+    httpx_client: Optional[httpx.AsyncClient] = None,
+    timeout: Optional[float] = None,
+) -> ZepClient:
     if base_url == "https://api.getzep.com":
-        return ZepCloudClient(api_key)
+        return ZepCloudClient(api_key, httpx_client=httpx_client, timeout=timeout)
     else:
-        return ZepPythonClient(base_url, api_key)
+        return ZepPythonClient(
+            base_url, api_key, httpx_client=httpx_client, timeout=timeout
+        )
+
+
+class ZepClientRegistry:
+    """Keeps one long-lived ZepClient per Zep endpoint and API secret.
+
+    Each client owns a pooled httpx.AsyncClient, so connections are reused
+    across requests instead of building a new HTTP stack per call.
+    """
+
+    def __init__(
+        self, max_connections: int, max_keepalive_connections: int, timeout: float
+    ):
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self._timeout = timeout
+        self._clients: Dict[Tuple[str, str], ZepClient] = {}
+        self._httpx_clients: list[httpx.AsyncClient] = []
+
+    def get(self, base_url: str, api_key: str) -> ZepClient:
+        key = (base_url, api_key)
+        client = self._clients.get(key)
+        if client is None:
+            httpx_client = httpx.AsyncClient(
+                limits=self._limits, timeout=httpx.Timeout(self._timeout)
+            )
+            client = create_zep_client(
+                base_url, api_key, httpx_client=httpx_client, timeout=self._timeout
+            )
+            self._httpx_clients.append(httpx_client)
+            self._clients[key] = client
+        return client
+
+    async def close(self):
+        httpx_clients = self._httpx_clients
+        self._clients = {}
+        self._httpx_clients = []
+        for httpx_client in httpx_clients:
+            await httpx_client.aclose()
 
 
 def _create_litellm_messages(
@@ -297,28 +364,25 @@ def _create_litellm_messages(
     return conversation_history
 
 
+def get_message_text(message: AllMessageValues) -> str:
+    content = message.get("content")
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    text_parts = []
+    for item in content:
+        if isinstance(item, dict) and item.get("type") == "text":
+            text_parts.append(item.get("text", ""))
+    return " ".join(text_parts) if text_parts else ""
+
+
 def _create_zep_messeges(
     is_cloud: bool, messages: list[AllMessageValues]
 ) -> Sequence[Union[zep_python.Message, zep_cloud.Message]]:
     zep_messages = []
-    last_user_index = -1
-    for i in range(len(messages) - 1, -1, -1):
-        if messages[i]["role"] == "user":
-            last_user_index = i
-            break
-    for msg in messages[last_user_index:]:
-        content = msg.get("content")
-        if content is None:
-            text_content = ""
-        elif isinstance(content, str):
-            text_content = content
-        else:
-            text_parts = []
-            for item in content:
-                if isinstance(item, dict) and item.get("type") == "text":
-                    text_parts.append(item.get("text", ""))
-            text_content = " ".join(text_parts) if text_parts else ""
-
+    for msg in messages:
+        text_content = get_message_text(msg)
         message = (
             zep_cloud.Message(role_type=msg["role"], content=text_content)
             if is_cloud
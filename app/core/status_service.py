@@ -1,7 +1,10 @@
 # Copyright (c) 0235 Inc.
 # This file is licensed under the karakuri_agent Personal Use & No Warranty License.
 # Please see the LICENSE file in the project root.
+import asyncio
 import logging
+import time
+from typing import List
 from app.core.config import get_settings
 from app.core.date_util import DateUtil
 from app.core.valkey_client import ValkeyClient
@@ -12,14 +15,20 @@ from app.schemas.status import (
     SleepingStatusData,
     TalkingStatusData,
 )
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 _valkey_client = ValkeyClient(settings.valkey_url, settings.valkey_password)
+CONVERSATION_TIMEOUT = timedelta(minutes=5)
+# How long to wait before checking again a timeout whose check failed.
+_CONVERSATION_TIMEOUT_RETRY_DELAY = 30.0
 
 
 class StatusService:
+    def __init__(self):
+        self._deadline_changed = asyncio.Event()
+
     async def update_current_status(self, agent_id: str, status: Status):
         await _valkey_client.update_current_status(agent_id, status)
 
@@ -32,6 +41,69 @@ class StatusService:
         status = create_talking_status(user_id, user_last_name, user_first_name)
         status.last_conversation_time = DateUtil.now()
         await self.update_current_status(agent_id, status)
+        await self._schedule_conversation_timeout(
+            agent_id, status.last_conversation_time
+        )
+
+    async def _schedule_conversation_timeout(
+        self, agent_id: str, last_conversation_time: datetime
+    ):
+        deadline = last_conversation_time + CONVERSATION_TIMEOUT
+        await _valkey_client.set_status_deadline(agent_id, deadline.timestamp())
+        self._deadline_changed.set()
+
+    async def schedule_conversation_timeouts(self, agent_ids: List[str]):
+        """Re-register deadlines for agents that are currently talking.
+
+        Used on startup so conversations that began before the deadline
+        scheduler existed, or whose deadline entry was lost, still time out.
+        """
+        for agent_id in agent_ids:
+            current_status = await self.get_current_status(agent_id)
+            if (
+                isinstance(current_status, TalkingStatusData)
+                and current_status.last_conversation_time
+            ):
+                await self._schedule_conversation_timeout(
+                    agent_id, current_status.last_conversation_time
+                )
+
+    async def wait_for_next_conversation_timeout(self, max_wait: float):
+        """Sleep until the earliest deadline, a local deadline update or max_wait.
+
+        Deadlines only ever move forward, so waking at the earliest known one is
+        exact even across workers; max_wait bounds how late a worker notices
+        deadlines registered elsewhere while the set was empty.
+        """
+        self._deadline_changed.clear()
+        next_deadline = await _valkey_client.get_next_status_deadline()
+        timeout = max_wait
+        if next_deadline is not None:
+            timeout = min(max_wait, max(0.0, next_deadline[1] - time.time()))
+        try:
+            await asyncio.wait_for(self._deadline_changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def process_due_conversation_timeouts(self):
+        now = time.time()
+        for agent_id in await _valkey_client.get_due_status_deadlines(now):
+            # Only the worker that removes the entry handles the transition.
+            if not await _valkey_client.claim_status_deadline(agent_id, now):
+                continue
+            try:
+                await self.check_conversation_timeout(agent_id)
+            except Exception as e:
+                # The claim removed the deadline, so put it back or the agent
+                # would stay talking until restarted.
+                await _valkey_client.set_status_deadline(
+                    agent_id, time.time() + _CONVERSATION_TIMEOUT_RETRY_DELAY
+                )
+                logger.error(
+                    f"Error checking conversation timeout for agent {agent_id}, "
+                    f"retrying in {_CONVERSATION_TIMEOUT_RETRY_DELAY:.0f}s: {e}",
+                    exc_info=True,
+                )
 
     async def check_conversation_timeout(self, agent_id: str):
         current_status = await self.get_current_status(agent_id)
@@ -40,8 +112,9 @@ class StatusService:
         if not current_status.last_conversation_time:
             return
 
-        if DateUtil.now() - current_status.last_conversation_time > timedelta(
-            minutes=5
+        if (
+            DateUtil.now() - current_status.last_conversation_time
+            >= CONVERSATION_TIMEOUT
         ):
             status = create_resting_status(
                 description="Taking a break after conversation",
@@ -49,6 +122,10 @@ class StatusService:
                 duration_minutes=30,
             )
             await self.update_current_status(agent_id, status)
+        else:
+            await self._schedule_conversation_timeout(
+                agent_id, current_status.last_conversation_time
+            )
 
 
 def create_active_status(
@@ -0,0 +1,23 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+import asyncio
+import logging
+from app.core.config import get_settings
+from app.dependencies import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+
+async def cleanup_blob_store():
+    blob_store = get_blob_store()
+    interval = get_settings().blob_store_cleanup_interval
+
+    while True:
+        try:
+            removed = await blob_store.cleanup()
+            if removed:
+                logger.info(f"Removed {removed} expired blobs")
+        except Exception as e:
+            logger.error(f"Error in cleanup_blob_store: {e}", exc_info=True)
+        await asyncio.sleep(interval)
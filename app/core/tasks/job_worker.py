@@ -0,0 +1,124 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+import asyncio
+import logging
+import os
+import socket
+from typing import Any, Dict
+from app.core.agent_manager import get_agent_manager
+from app.core.chat.chat_client import coalesce_messages
+from app.core.config import get_settings
+from app.core.job_queue import JobProgress
+from app.dependencies import (
+    get_chat_service,
+    get_job_queue,
+    get_line_client_registry,
+    get_llm_service,
+    get_memory_service,
+    get_tts_service,
+)
+from app.utils.metrics import get_metrics
+from linebot.v3.webhooks.models import Event  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+LINE_EVENTS_JOB = "line_events"
+
+
+async def process_line_events(payload: Dict[str, Any], progress: JobProgress):
+    """
+    Answer the LINE events of one webhook.
+
+    With a coalesce window, the messages are buffered per agent and user in
+    Valkey first. The job waits for the window, and if no later webhook of
+    the same user added to the burst by then, it answers the whole burst;
+    otherwise it leaves its messages to that later job.
+
+    Each step with an outbound effect is recorded in the job's progress: the
+    generated reply of every turn, a text sent ahead of its audio, finished
+    turns and saved pending messages. A retried or reclaimed job skips what
+    is recorded, so users never get a message twice and the LLM does not
+    run again for a turn it already answered.
+    """
+    agent_id = payload["agent_id"]
+    user_id = payload["user_id"]
+    agent_config = get_agent_manager().get_agent(agent_id)
+    user_config = await get_memory_service().get_user(agent_id, user_id)
+    if user_config is None:
+        logger.warning(f"Dropping LINE events for unknown user {user_id}")
+        return
+    if progress.get("pending"):
+        return
+
+    events = [Event.from_dict(event) for event in payload["events"]]
+    line_chat_client = get_line_client_registry().get(agent_config)
+    messages = await line_chat_client.process_message(events)
+    if not messages:
+        return
+
+    chat_service = get_chat_service()
+    window = get_settings().chat_message_coalesce_window
+    if window > 0:
+        owner = await chat_service.buffer_burst(
+            agent_id, user_id, progress.job_id, messages, progress.ttl
+        )
+        if owner is None:
+            await asyncio.sleep(window)
+            if not await chat_service.claim_burst(
+                agent_id, user_id, progress.job_id, progress.ttl
+            ):
+                logger.debug(f"Left messages of job {progress.job_id} to a later job")
+                return
+            owner = progress.job_id
+        if owner != progress.job_id:
+            return
+        # Images stay offloaded until the messages are answered now.
+        messages = await chat_service.get_burst(agent_id, user_id, progress.job_id)
+        if not messages:
+            return
+
+    if not progress.get("turn:0:done") and not await chat_service.is_chat_available(
+        agent_id
+    ):
+        await chat_service.update_pending_messages(
+            agent_id, "chat-line", user_id, payload["base_url"], messages
+        )
+        await progress.set("pending")
+        logger.info(
+            f"Saved {len(messages)} messages to chat service for agent {agent_id}, user {user_id}"
+        )
+        return
+
+    messages = await chat_service.load_images(messages)
+    turns = coalesce_messages(messages, window)
+    get_metrics().increment("chat.coalesced_messages", len(messages) - len(turns))
+    llm_service = get_llm_service()
+    tts_service = get_tts_service()
+    for index, turn in enumerate(turns):
+        step = f"turn:{index}"
+        if progress.get(f"{step}:done"):
+            continue
+        agent_message = progress.get(f"{step}:reply")
+        if agent_message is None:
+            agent_message = await line_chat_client.generate_reply(
+                "chat-line", turn.message, agent_config, user_config, llm_service
+            )
+            await progress.set(f"{step}:reply", agent_message)
+        await line_chat_client.send_response(
+            turn.message,
+            agent_message,
+            agent_config,
+            tts_service,
+            payload["base_url"],
+            True,
+            text_sent=progress.get(f"{step}:text") is not None,
+            on_text_sent=lambda step=step: progress.set(f"{step}:text"),
+        )
+        await progress.set(f"{step}:done")
+
+
+async def run_job_worker():
+    job_queue = get_job_queue()
+    job_queue.register(LINE_EVENTS_JOB, process_line_events)
+    await job_queue.run(f"{socket.gethostname()}-{os.getpid()}")
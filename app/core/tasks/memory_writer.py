@@ -0,0 +1,25 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+import asyncio
+import logging
+from app.core.config import get_settings
+from app.dependencies import get_memory_service
+
+logger = logging.getLogger(__name__)
+
+
+async def write_session_memories():
+    memory_service = get_memory_service()
+    settings = get_settings()
+
+    while True:
+        try:
+            flushed = await memory_service.flush_memory_queue()
+            if flushed < settings.memory_queue_batch_sessions:
+                await memory_service.wait_for_memory_queue(
+                    settings.memory_queue_poll_interval
+                )
+        except Exception as e:
+            logger.error(f"Error in write_session_memories: {e}", exc_info=True)
+            await asyncio.sleep(settings.memory_queue_poll_interval)
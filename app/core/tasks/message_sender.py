@@ -4,71 +4,209 @@
 
 import asyncio
 import logging
+from typing import Dict, Optional, Set
 from app.core.agent_manager import get_agent_manager
+from app.core.chat.chat_client import Turn, coalesce_messages
+from app.core.chat.chat_service import ChatService
+from app.core.chat.line_client_registry import LineClientRegistry
+from app.core.config import get_settings
+from app.core.llm_service import LLMService
+from app.core.tts_service import TTSService
 from app.dependencies import (
     get_chat_service,
-    get_line_chat_client,
+    get_line_client_registry,
     get_llm_service,
     get_memory_service,
     get_tts_service,
 )
+from app.schemas.agent import AgentConfig
+from app.schemas.pending_message import PendingMessageContext
+from app.schemas.user import UserConfig
 
 logger = logging.getLogger(__name__)
 
 
+class PendingMessageDispatcher:
+    """Flushes pending messages of many users concurrently.
+
+    Each user is handled by a single job so that their messages are sent in
+    order, while jobs for different users run in parallel within a per-agent
+    and a global concurrency limit. Failed sends are retried per turn with
+    exponential backoff; messages that still fail stay pending for the next
+    cycle.
+    """
+
+    def __init__(
+        self,
+        llm_service: LLMService,
+        tts_service: TTSService,
+        chat_service: ChatService,
+        line_client_registry: LineClientRegistry,
+        max_concurrency: int,
+        max_concurrency_per_agent: int,
+        max_retries: int,
+        retry_base_delay: float,
+    ):
+        self._llm_service = llm_service
+        self._tts_service = tts_service
+        self._chat_service = chat_service
+        self._line_client_registry = line_client_registry
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._max_concurrency_per_agent = max_concurrency_per_agent
+        self._agent_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._max_retries = max_retries
+        self._retry_base_delay = retry_base_delay
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self, agent_config: AgentConfig, user: UserConfig):
+        task = asyncio.create_task(self._run(agent_config, user))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def join(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def cancel(self):
+        for task in self._tasks:
+            task.cancel()
+        await self.join()
+
+    def _get_agent_semaphore(self, agent_id: str) -> asyncio.Semaphore:
+        semaphore = self._agent_semaphores.get(agent_id)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._max_concurrency_per_agent)
+            self._agent_semaphores[agent_id] = semaphore
+        return semaphore
+
+    async def _run(self, agent_config: AgentConfig, user: UserConfig):
+        # Take the agent slot first so that a busy agent cannot hold global
+        # slots while waiting for its own limit.
+        async with self._get_agent_semaphore(agent_config.id), self._semaphore:
+            try:
+                if not await self._chat_service.is_chat_available(agent_config.id):
+                    return
+
+                pending_message = await self._chat_service.get_pending_messages(
+                    agent_id=agent_config.id, user_id=user.id
+                )
+                if not pending_message:
+                    return
+
+                await self._send_pending(agent_config, user, pending_message)
+            except Exception as e:
+                logger.error(
+                    f"Error processing messages for agent {agent_config.id}, user {user.id}: {e}"
+                )
+
+    async def _send_pending(
+        self,
+        agent_config: AgentConfig,
+        user: UserConfig,
+        pending_message: PendingMessageContext,
+    ):
+        """
+        Answer a pending backlog turn by turn.
+
+        After each turn is sent, the messages it answered are removed from the
+        pending record. A failure then leaves only the unanswered messages for
+        the next cycle, and sent turns are never repeated.
+        """
+        messages = pending_message.chat_messages
+        acked = 0
+        for turn in coalesce_messages(messages):
+            await self._send_turn_with_retry(agent_config, user, pending_message, turn)
+            await self._chat_service.ack_pending_messages(
+                agent_config.id, user.id, turn.consumed - acked
+            )
+            acked = turn.consumed
+        # Drop trailing messages that did not make a turn, such as a lone image.
+        if acked < len(messages):
+            await self._chat_service.ack_pending_messages(
+                agent_config.id, user.id, len(messages) - acked
+            )
+
+    async def _send_turn_with_retry(
+        self,
+        agent_config: AgentConfig,
+        user: UserConfig,
+        pending_message: PendingMessageContext,
+        turn: Turn,
+    ):
+        line_chat_client = self._line_client_registry.get(agent_config)
+        # The reply is generated once, so a retry only repeats the send.
+        agent_message: Optional[str] = None
+        attempt = 0
+        while True:
+            try:
+                if agent_message is None:
+                    agent_message = await line_chat_client.generate_reply(
+                        pending_message.message_type,
+                        turn.message,
+                        agent_config,
+                        user,
+                        self._llm_service,
+                    )
+                await line_chat_client.send_response(
+                    turn.message,
+                    agent_message,
+                    agent_config,
+                    self._tts_service,
+                    pending_message.base_url,
+                    False,
+                )
+                return
+            except Exception as e:
+                if attempt >= self._max_retries:
+                    raise
+                delay = self._retry_base_delay * (2**attempt)
+                attempt += 1
+                logger.warning(
+                    f"Retrying pending messages for agent {agent_config.id}, user {user.id} "
+                    f"in {delay:.1f}s (attempt {attempt}/{self._max_retries}): {e}"
+                )
+                await asyncio.sleep(delay)
+
+
 async def send_pending_messages():
-    llm_service = get_llm_service()
-    tts_service = get_tts_service()
+    settings = get_settings()
     memory_service = get_memory_service()
     chat_service = get_chat_service()
-    line_chat_client = get_line_chat_client()
     agent_manager = get_agent_manager()
+    dispatcher = PendingMessageDispatcher(
+        llm_service=get_llm_service(),
+        tts_service=get_tts_service(),
+        chat_service=chat_service,
+        line_client_registry=get_line_client_registry(),
+        max_concurrency=settings.pending_message_max_concurrency,
+        max_concurrency_per_agent=settings.pending_message_max_concurrency_per_agent,
+        max_retries=settings.pending_message_max_retries,
+        retry_base_delay=settings.pending_message_retry_base_delay,
+    )
 
-    while True:
-        try:
-            for agent_id, _ in agent_manager.get_all_agents():
-                users = await memory_service.list_users(agent_id)
-                for user in users:
+    try:
+        while True:
+            try:
+                for agent_id, _ in agent_manager.get_all_agents():
                     try:
-                        agent_config = agent_manager.get_agent(agent_id)
-
                         if not await chat_service.is_chat_available(agent_id):
                             continue
 
-                        pending_message = await chat_service.get_pending_messages(
-                            agent_id=agent_id, user_id=user.id
-                        )
-                        if not pending_message:
-                            continue
-
-                        line_chat_client.create(agent_config)
-
-                        try:
-                            await line_chat_client.process_and_send_messages(
-                                pending_message.message_type,
-                                pending_message.chat_messages,
-                                agent_config,
-                                user,
-                                llm_service,
-                                tts_service,
-                                pending_message.base_url,
-                                False,
-                            )
-                            await chat_service.delete_pending_messages(
-                                agent_id=agent_id, user_id=user.id
-                            )
-
-                        finally:
-                            await line_chat_client.close()
-
+                        agent_config = agent_manager.get_agent(agent_id)
+                        users = await memory_service.list_users(agent_id)
+                        for user in users:
+                            dispatcher.submit(agent_config, user)
                     except Exception as e:
                         logger.error(
-                            f"Error processing messages for agent {agent_id}: {e}"
+                            f"Error dispatching messages for agent {agent_id}: {e}"
                         )
                         continue
 
-            await asyncio.sleep(60)
+                await dispatcher.join()
+                await asyncio.sleep(60)
 
-        except Exception as e:
-            logger.error(f"Error in send_pending_messages: {e}")
-            await asyncio.sleep(60)
+            except Exception as e:
+                logger.error(f"Error in send_pending_messages: {e}")
+                await asyncio.sleep(60)
+    finally:
+        await dispatcher.cancel()
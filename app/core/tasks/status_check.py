@@ -4,6 +4,7 @@
 import asyncio
 import logging
 from app.core.agent_manager import get_agent_manager
+from app.core.config import get_settings
 from app.dependencies import get_status_service
 
 logger = logging.getLogger(__name__)
@@ -12,19 +13,19 @@ logger = logging.getLogger(__name__)
 async def check_conversation_timeouts():
     status_service = get_status_service()
     agent_manager = get_agent_manager()
+    max_wait = get_settings().status_scheduler_max_wait
+
+    try:
+        await status_service.schedule_conversation_timeouts(
+            [agent_id for agent_id, _ in agent_manager.get_all_agents()]
+        )
+    except Exception as e:
+        logger.error(f"Error scheduling conversation timeouts: {e}", exc_info=True)
 
     while True:
         try:
-            for agent_id, _ in agent_manager.get_all_agents():
-                try:
-                    await status_service.check_conversation_timeout(agent_id)
-                except Exception as e:
-                    logger.error(
-                        f"Error checking conversation timeout for agent {agent_id}: {e}",
-                        exc_info=True,
-                    )
-                    continue
-            await asyncio.sleep(60)
+            await status_service.process_due_conversation_timeouts()
+            await status_service.wait_for_next_conversation_timeout(max_wait)
         except Exception as e:
             logger.error(f"Error in check_conversation_timeouts: {e}", exc_info=True)
-            await asyncio.sleep(60)
+            await asyncio.sleep(max_wait)
@@ -19,19 +19,124 @@ from app.schemas.status import (
     TalkingStatusData,
 )
 from app.schemas.chat_message import ChatMessage
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 
 logger = logging.getLogger(__name__)
 
+# Removes an agent's deadline only if it is still due, so that a deadline
+# extended by another worker in the meantime is not lost.
+_CLAIM_STATUS_DEADLINE_SCRIPT = """
+local deadline = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if deadline and tonumber(deadline) <= tonumber(ARGV[2]) then
+    redis.call('ZREM', KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+_ENQUEUE_MEMORY_SCRIPT = """
+redis.call('RPUSH', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('ZADD', KEYS[2], 'NX', ARGV[3], ARGV[4])
+return 1
+"""
+
+# Drops the flushed head of a session queue and forgets the session once its
+# queue is empty, without racing an enqueue that happens in between.
+_ACK_MEMORY_SCRIPT = """
+redis.call('LTRIM', KEYS[1], ARGV[1], -1)
+redis.call('HDEL', KEYS[3], ARGV[2])
+local remaining = redis.call('LLEN', KEYS[1])
+if remaining == 0 then
+    redis.call('ZREM', KEYS[2], ARGV[2])
+end
+return remaining
+"""
+
+# Moves the head of a session queue that keeps failing to the dead-letter
+# list, then drops it from the queue like _ACK_MEMORY_SCRIPT.
+_DEAD_LETTER_MEMORY_SCRIPT = """
+for i = 4, #ARGV do
+    redis.call('RPUSH', KEYS[4], ARGV[i])
+end
+redis.call('LTRIM', KEYS[4], -tonumber(ARGV[3]), -1)
+redis.call('LTRIM', KEYS[1], ARGV[1], -1)
+redis.call('HDEL', KEYS[3], ARGV[2])
+local remaining = redis.call('LLEN', KEYS[1])
+if remaining == 0 then
+    redis.call('ZREM', KEYS[2], ARGV[2])
+end
+return remaining
+"""
+
+# Releases a lock only if it still holds the caller's token, so a worker
+# whose lock expired cannot release the lock another worker took since.
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Adds one job's messages to a chat burst and makes that job the owner, the
+# one that answers the burst. A job whose messages an owner already claimed
+# gets that owner's id back instead, so a retried job never buffers twice.
+_BUFFER_CHAT_BURST_SCRIPT = """
+local owner = redis.call('HGET', KEYS[3], ARGV[1])
+if owner then
+    return owner
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[3])
+return false
+"""
+
+# Moves a burst to its owner's batch if the job is still the owner, and
+# remembers which owner took each job's messages.
+_CLAIM_CHAT_BURST_SCRIPT = """
+if redis.call('GET', KEYS[2]) ~= ARGV[1] or redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local job_ids = redis.call('HKEYS', KEYS[1])
+for _, job_id in ipairs(job_ids) do
+    redis.call('HSET', KEYS[3], job_id, ARGV[1])
+end
+redis.call('EXPIRE', KEYS[3], ARGV[2])
+redis.call('RENAME', KEYS[1], KEYS[4])
+redis.call('EXPIRE', KEYS[4], ARGV[2])
+redis.call('DEL', KEYS[2])
+return 1
+"""
+
 
 class ValkeyClient:
     VALKEY_KEYS = {
         "SESSION_ID": "karakuri_agent_session_id",
         "MEMORY": "karakuri_agent_memory",
+        "MEMORY_WINDOW": "karakuri_agent_memory_window",
+        "MEMORY_REFRESH": "karakuri_agent_memory_refresh",
         "CHAT_MESSAGES": "karakuri_agent_chat_messages",
         "FACTS": "karakuri_agent_facts",
         "STATUS": "karakuri_agent_status",
+        "STATUS_DEADLINES": "karakuri_agent_status_deadlines",
+        "MEMORY_QUEUE": "karakuri_agent_memory_queue",
+        "MEMORY_QUEUE_SESSIONS": "karakuri_agent_memory_queue_sessions",
+        "MEMORY_QUEUE_LOCK": "karakuri_agent_memory_queue_lock",
+        "MEMORY_QUEUE_FAILURES": "karakuri_agent_memory_queue_failures",
+        "MEMORY_DEAD_LETTER": "karakuri_agent_memory_dead",
+        "ZEP_SESSION": "karakuri_agent_zep_session",
+        "IMAGE_DESCRIPTION": "karakuri_agent_image_description",
+        "JOB_STREAM": "karakuri_agent_jobs",
+        "JOB_DEAD_LETTER": "karakuri_agent_jobs_dead",
+        "JOB_PROGRESS": "karakuri_agent_job_progress",
+        "WEBHOOK_EVENT": "karakuri_agent_webhook_event",
+        "CHAT_BURST": "karakuri_agent_chat_burst",
+        "CHAT_BURST_OWNER": "karakuri_agent_chat_burst_owner",
+        "CHAT_BURST_CLAIMED": "karakuri_agent_chat_burst_claimed",
+        "CHAT_BURST_BATCH": "karakuri_agent_chat_burst_batch",
+        "CACHE_VERSION": "karakuri_agent_cache_version",
     }
 
     def __init__(self, url: str, password: str):
@@ -39,22 +144,40 @@ class ValkeyClient:
             url, password=password, decode_responses=True
         )
         self._default_ttl = 60 * 60 * 24 * 7
+        self._claim_status_deadline_script = self._valkey_client.register_script(
+            _CLAIM_STATUS_DEADLINE_SCRIPT
+        )
+        self._enqueue_memory_script = self._valkey_client.register_script(
+            _ENQUEUE_MEMORY_SCRIPT
+        )
+        self._ack_memory_script = self._valkey_client.register_script(
+            _ACK_MEMORY_SCRIPT
+        )
+        self._dead_letter_memory_script = self._valkey_client.register_script(
+            _DEAD_LETTER_MEMORY_SCRIPT
+        )
+        self._release_lock_script = self._valkey_client.register_script(
+            _RELEASE_LOCK_SCRIPT
+        )
+        self._buffer_chat_burst_script = self._valkey_client.register_script(
+            _BUFFER_CHAT_BURST_SCRIPT
+        )
+        self._claim_chat_burst_script = self._valkey_client.register_script(
+            _CLAIM_CHAT_BURST_SCRIPT
+        )
 
     async def get_session_id(self, session_key: str) -> str:
-        session_id = await self._valkey_client.get(
-            f"{self.VALKEY_KEYS['SESSION_ID']}:{session_key}"
-        )  # type: ignore
-        if not session_id:
-            session_id = f"{session_key}_{uuid.uuid4().hex}"
-            await self._valkey_client.set(
-                f"{self.VALKEY_KEYS['SESSION_ID']}:{session_key}", session_id
-            )  # type: ignore
-            await self._valkey_client.expire(
-                f"{self.VALKEY_KEYS['SESSION_ID']}:{session_key}", self._default_ttl
-            )
-            return session_id
-        else:
+        key = f"{self.VALKEY_KEYS['SESSION_ID']}:{session_key}"
+        session_id = await self._valkey_client.get(key)  # type: ignore
+        if session_id:
             return str(session_id)
+        # Concurrent first calls must agree on one id, so only one SET wins.
+        session_id = f"{session_key}_{uuid.uuid4().hex}"
+        if await self._valkey_client.set(
+            key, session_id, nx=True, ex=self._default_ttl
+        ):
+            return session_id
+        return str(await self._valkey_client.get(key))  # type: ignore
 
     async def update_facts(self, agent_id: str, user_id: str, fact: str):
         await self._valkey_client.hset(
@@ -70,8 +193,10 @@ class ValkeyClient:
         )
 
     async def update_memory(self, session_id: str, memory: KarakuriMemory):
+        # Messages live in the memory window; only Zep-derived context is kept here.
+        context = memory.model_copy(update={"messages": []})
         await self._valkey_client.set(
-            f"{self.VALKEY_KEYS['MEMORY']}:{session_id}", memory.model_dump_json()
+            f"{self.VALKEY_KEYS['MEMORY']}:{session_id}", context.model_dump_json()
         )  # type: ignore
         await self._valkey_client.expire(
             f"{self.VALKEY_KEYS['MEMORY']}:{session_id}", self._default_ttl
@@ -80,14 +205,49 @@ class ValkeyClient:
     async def get_memory(
         self, session_id: str, agent_id: str, user_id: str
     ) -> KarakuriMemory:
-        memory_json = await self._valkey_client.get(
-            f"{self.VALKEY_KEYS['MEMORY']}:{session_id}"
-        )  # type: ignore
+        window_key = f"{self.VALKEY_KEYS['MEMORY_WINDOW']}:{session_id}"
+        async with self._valkey_client.pipeline(transaction=False) as pipe:
+            pipe.lrange(window_key, 0, -1)
+            pipe.get(f"{self.VALKEY_KEYS['MEMORY']}:{session_id}")
+            window, memory_json = await pipe.execute()
         if memory_json:
-            return KarakuriMemory.model_validate(json.loads(memory_json))
+            memory = KarakuriMemory.model_validate(json.loads(memory_json))
         else:
             facts = await self.get_facts(agent_id, user_id)
-            return KarakuriMemory(messages=[], facts=facts, context=facts)
+            memory = KarakuriMemory(messages=[], facts=facts, context=facts)
+
+        if window:
+            memory.messages = [json.loads(message) for message in window]
+        elif memory.messages:
+            # Memory cached before the window existed still carries its messages.
+            await self._valkey_client.rpush(
+                window_key, *[json.dumps(message) for message in memory.messages]
+            )  # type: ignore
+            await self._valkey_client.expire(window_key, self._default_ttl)
+        return memory
+
+    async def append_memory_window(
+        self, session_id: str, messages: List[dict], window_size: int
+    ):
+        if not messages:
+            return
+        window_key = f"{self.VALKEY_KEYS['MEMORY_WINDOW']}:{session_id}"
+        async with self._valkey_client.pipeline(transaction=True) as pipe:
+            pipe.rpush(window_key, *[json.dumps(message) for message in messages])
+            pipe.ltrim(window_key, -window_size, -1)
+            pipe.expire(window_key, self._default_ttl)
+            await pipe.execute()
+
+    async def claim_memory_refresh(self, session_id: str, interval: int) -> bool:
+        if interval <= 0:
+            return True
+        claimed = await self._valkey_client.set(
+            f"{self.VALKEY_KEYS['MEMORY_REFRESH']}:{session_id}",
+            "1",
+            nx=True,
+            ex=interval,
+        )
+        return bool(claimed)
 
     async def update_current_status(self, agent_id: str, status: Status):
         await self._valkey_client.set(
@@ -117,6 +277,351 @@ class ValkeyClient:
                 description="", started_at=DateUtil.now(), end_at=None, location=""
             )
 
+    async def set_status_deadline(self, agent_id: str, deadline: float):
+        await self._valkey_client.zadd(
+            self.VALKEY_KEYS["STATUS_DEADLINES"], {agent_id: deadline}
+        )
+
+    async def get_next_status_deadline(self) -> Optional[Tuple[str, float]]:
+        entries = await self._valkey_client.zrange(
+            self.VALKEY_KEYS["STATUS_DEADLINES"], 0, 0, withscores=True
+        )
+        if not entries:
+            return None
+        agent_id, deadline = entries[0]
+        return str(agent_id), float(deadline)
+
+    async def get_due_status_deadlines(self, now: float) -> List[str]:
+        agent_ids = await self._valkey_client.zrangebyscore(
+            self.VALKEY_KEYS["STATUS_DEADLINES"], "-inf", now
+        )
+        return [str(agent_id) for agent_id in agent_ids]
+
+    async def claim_status_deadline(self, agent_id: str, now: float) -> bool:
+        claimed = await self._claim_status_deadline_script(
+            keys=[self.VALKEY_KEYS["STATUS_DEADLINES"]], args=[agent_id, now]
+        )
+        return bool(claimed)
+
+    async def enqueue_memory(self, session_id: str, entry: str, due: float):
+        await self._enqueue_memory_script(
+            keys=[
+                f"{self.VALKEY_KEYS['MEMORY_QUEUE']}:{session_id}",
+                self.VALKEY_KEYS["MEMORY_QUEUE_SESSIONS"],
+            ],
+            args=[entry, self._default_ttl, due, session_id],
+        )
+
+    async def get_due_memory_sessions(self, now: float, limit: int) -> List[str]:
+        session_ids = await self._valkey_client.zrangebyscore(
+            self.VALKEY_KEYS["MEMORY_QUEUE_SESSIONS"], "-inf", now, start=0, num=limit
+        )
+        return [str(session_id) for session_id in session_ids]
+
+    async def get_next_memory_due(self) -> Optional[float]:
+        entries = await self._valkey_client.zrange(
+            self.VALKEY_KEYS["MEMORY_QUEUE_SESSIONS"], 0, 0, withscores=True
+        )
+        if not entries:
+            return None
+        return float(entries[0][1])
+
+    async def count_memory_sessions(self) -> int:
+        return await self._valkey_client.zcard(
+            self.VALKEY_KEYS["MEMORY_QUEUE_SESSIONS"]
+        )
+
+    async def get_queued_memory(self, session_id: str, limit: int) -> List[str]:
+        return await self._valkey_client.lrange(
+            f"{self.VALKEY_KEYS['MEMORY_QUEUE']}:{session_id}", 0, limit - 1
+        )  # type: ignore
+
+    async def ack_queued_memory(self, session_id: str, count: int) -> int:
+        remaining = await self._ack_memory_script(
+            keys=[
+                f"{self.VALKEY_KEYS['MEMORY_QUEUE']}:{session_id}",
+                self.VALKEY_KEYS["MEMORY_QUEUE_SESSIONS"],
+                self.VALKEY_KEYS["MEMORY_QUEUE_FAILURES"],
+            ],
+            args=[count, session_id],
+        )
+        return int(remaining)
+
+    async def record_memory_flush_failure(self, session_id: str) -> int:
+        """Count a failed flush of the session's queue head and return the total."""
+        return await self._valkey_client.hincrby(
+            self.VALKEY_KEYS["MEMORY_QUEUE_FAILURES"], session_id, 1
+        )  # type: ignore
+
+    async def dead_letter_queued_memory(
+        self, session_id: str, count: int, entries: List[str], max_length: int
+    ) -> int:
+        remaining = await self._dead_letter_memory_script(
+            keys=[
+                f"{self.VALKEY_KEYS['MEMORY_QUEUE']}:{session_id}",
+                self.VALKEY_KEYS["MEMORY_QUEUE_SESSIONS"],
+                self.VALKEY_KEYS["MEMORY_QUEUE_FAILURES"],
+                self.VALKEY_KEYS["MEMORY_DEAD_LETTER"],
+            ],
+            args=[count, session_id, max_length, *entries],
+        )
+        return int(remaining)
+
+    async def count_memory_dead_letters(self) -> int:
+        return await self._valkey_client.llen(self.VALKEY_KEYS["MEMORY_DEAD_LETTER"])  # type: ignore
+
+    async def reschedule_memory_session(self, session_id: str, due: float):
+        await self._valkey_client.zadd(
+            self.VALKEY_KEYS["MEMORY_QUEUE_SESSIONS"], {session_id: due}
+        )
+
+    async def acquire_memory_queue_lock(
+        self, session_id: str, ttl: int
+    ) -> Optional[str]:
+        """Take the session's flush lock and return its token, or None if held."""
+        token = uuid.uuid4().hex
+        acquired = await self._valkey_client.set(
+            f"{self.VALKEY_KEYS['MEMORY_QUEUE_LOCK']}:{session_id}",
+            token,
+            nx=True,
+            ex=ttl,
+        )
+        return token if acquired else None
+
+    async def release_memory_queue_lock(self, session_id: str, token: str) -> bool:
+        released = await self._release_lock_script(
+            keys=[f"{self.VALKEY_KEYS['MEMORY_QUEUE_LOCK']}:{session_id}"],
+            args=[token],
+        )
+        return bool(released)
+
+    async def is_zep_session_created(self, session_id: str) -> bool:
+        return bool(
+            await self._valkey_client.exists(
+                f"{self.VALKEY_KEYS['ZEP_SESSION']}:{session_id}"
+            )
+        )
+
+    async def mark_zep_session_created(self, session_id: str):
+        await self._valkey_client.set(
+            f"{self.VALKEY_KEYS['ZEP_SESSION']}:{session_id}",
+            "1",
+            ex=self._default_ttl,
+        )
+
+    async def get_cache_version(self, scope: str, agent_id: str, user_id: str) -> str:
+        version = await self._valkey_client.get(
+            f"{self.VALKEY_KEYS['CACHE_VERSION']}:{scope}:{agent_id}:{user_id}"
+        )
+        return version or "0"
+
+    async def bump_cache_version(self, scope: str, agent_id: str, user_id: str):
+        # A random version never repeats, so an entry cached under an old
+        # version cannot come back after the key expires and is bumped again.
+        await self._valkey_client.set(
+            f"{self.VALKEY_KEYS['CACHE_VERSION']}:{scope}:{agent_id}:{user_id}",
+            uuid.uuid4().hex,
+            ex=self._default_ttl,
+        )
+
+    async def get_image_description(self, model: str, image_hash: str) -> Optional[str]:
+        return await self._valkey_client.get(
+            f"{self.VALKEY_KEYS['IMAGE_DESCRIPTION']}:{model}:{image_hash}"
+        )  # type: ignore
+
+    async def set_image_description(
+        self, model: str, image_hash: str, description: str, ttl: int
+    ):
+        await self._valkey_client.set(
+            f"{self.VALKEY_KEYS['IMAGE_DESCRIPTION']}:{model}:{image_hash}",
+            description,
+            ex=ttl,
+        )
+
+    async def create_job_group(self, queue: str, group: str):
+        try:
+            await self._valkey_client.xgroup_create(
+                f"{self.VALKEY_KEYS['JOB_STREAM']}:{queue}",
+                group,
+                id="0",
+                mkstream=True,
+            )
+        except valkey.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def add_job(self, queue: str, fields: Dict[str, str], max_length: int) -> str:
+        return await self._valkey_client.xadd(
+            f"{self.VALKEY_KEYS['JOB_STREAM']}:{queue}",
+            fields,  # type: ignore
+            maxlen=max_length,
+            approximate=True,
+        )  # type: ignore
+
+    async def read_jobs(
+        self, queue: str, group: str, consumer: str, count: int, block_ms: int
+    ) -> List[Tuple[str, Dict[str, str]]]:
+        result = await self._valkey_client.xreadgroup(
+            group,
+            consumer,
+            {f"{self.VALKEY_KEYS['JOB_STREAM']}:{queue}": ">"},
+            count=count,
+            block=block_ms,
+        )
+        return [
+            (job_id, fields)
+            for _, entries in result or []
+            for job_id, fields in entries
+        ]
+
+    async def claim_stale_jobs(
+        self, queue: str, group: str, consumer: str, min_idle_ms: int, count: int
+    ) -> List[Tuple[str, Dict[str, str], int]]:
+        """Takes over jobs whose consumer went silent, with their delivery counts."""
+        stream = f"{self.VALKEY_KEYS['JOB_STREAM']}:{queue}"
+        result = await self._valkey_client.xautoclaim(
+            stream, group, consumer, min_idle_ms, count=count
+        )
+        claimed: List[Tuple[str, Dict[str, str], int]] = []
+        for job_id, fields in result[1]:
+            if fields is None:
+                continue
+            pending = await self._valkey_client.xpending_range(
+                stream, group, min=job_id, max=job_id, count=1
+            )
+            deliveries = int(pending[0]["times_delivered"]) if pending else 1
+            claimed.append((job_id, fields, deliveries))
+        return claimed
+
+    async def ack_job(self, queue: str, group: str, job_id: str):
+        stream = f"{self.VALKEY_KEYS['JOB_STREAM']}:{queue}"
+        async with self._valkey_client.pipeline(transaction=True) as pipe:
+            pipe.xack(stream, group, job_id)
+            pipe.xdel(stream, job_id)
+            pipe.delete(f"{self.VALKEY_KEYS['JOB_PROGRESS']}:{queue}:{job_id}")
+            await pipe.execute()
+
+    async def dead_letter_job(
+        self,
+        queue: str,
+        group: str,
+        job_id: str,
+        fields: Dict[str, str],
+        max_length: int,
+    ):
+        stream = f"{self.VALKEY_KEYS['JOB_STREAM']}:{queue}"
+        async with self._valkey_client.pipeline(transaction=True) as pipe:
+            pipe.xadd(
+                f"{self.VALKEY_KEYS['JOB_DEAD_LETTER']}:{queue}",
+                fields,  # type: ignore
+                maxlen=max_length,
+                approximate=True,
+            )
+            pipe.xack(stream, group, job_id)
+            pipe.xdel(stream, job_id)
+            pipe.delete(f"{self.VALKEY_KEYS['JOB_PROGRESS']}:{queue}:{job_id}")
+            await pipe.execute()
+
+    async def get_job_progress(self, queue: str, job_id: str) -> Dict[str, str]:
+        return await self._valkey_client.hgetall(
+            f"{self.VALKEY_KEYS['JOB_PROGRESS']}:{queue}:{job_id}"
+        )  # type: ignore
+
+    async def set_job_progress(
+        self, queue: str, job_id: str, step: str, value: str, ttl: int
+    ):
+        key = f"{self.VALKEY_KEYS['JOB_PROGRESS']}:{queue}:{job_id}"
+        async with self._valkey_client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, step, value)
+            pipe.expire(key, ttl)
+            await pipe.execute()
+
+    async def get_job_queue_stats(self, queue: str, group: str) -> Dict[str, int]:
+        stream = f"{self.VALKEY_KEYS['JOB_STREAM']}:{queue}"
+        async with self._valkey_client.pipeline(transaction=False) as pipe:
+            pipe.xlen(stream)
+            pipe.xpending(stream, group)
+            pipe.xlen(f"{self.VALKEY_KEYS['JOB_DEAD_LETTER']}:{queue}")
+            length, pending, dead_letters = await pipe.execute()
+        return {
+            "length": int(length),
+            "pending": int(pending["pending"]),
+            "dead_letters": int(dead_letters),
+        }
+
+    async def claim_webhook_events(self, event_ids: List[str], ttl: int) -> List[bool]:
+        async with self._valkey_client.pipeline(transaction=False) as pipe:
+            for event_id in event_ids:
+                pipe.set(
+                    f"{self.VALKEY_KEYS['WEBHOOK_EVENT']}:{event_id}",
+                    "1",
+                    nx=True,
+                    ex=ttl,
+                )
+            results = await pipe.execute()
+        return [bool(result) for result in results]
+
+    async def release_webhook_events(self, event_ids: List[str]):
+        if event_ids:
+            await self._valkey_client.delete(
+                *[
+                    f"{self.VALKEY_KEYS['WEBHOOK_EVENT']}:{event_id}"
+                    for event_id in event_ids
+                ]
+            )
+
+    async def buffer_chat_burst(
+        self, session_id: str, job_id: str, messages: List[ChatMessage], ttl: int
+    ) -> Optional[str]:
+        """
+        Buffer a job's messages and make it the burst owner.
+
+        Returns None once buffered, or the id of the owner that already
+        claimed this job's messages.
+        """
+        owner = await self._buffer_chat_burst_script(
+            keys=[
+                f"{self.VALKEY_KEYS['CHAT_BURST']}:{session_id}",
+                f"{self.VALKEY_KEYS['CHAT_BURST_OWNER']}:{session_id}",
+                f"{self.VALKEY_KEYS['CHAT_BURST_CLAIMED']}:{session_id}",
+            ],
+            args=[
+                job_id,
+                json.dumps([message.model_dump(mode="json") for message in messages]),
+                ttl,
+            ],
+        )
+        return str(owner) if owner else None
+
+    async def claim_chat_burst(self, session_id: str, job_id: str, ttl: int) -> bool:
+        claimed = await self._claim_chat_burst_script(
+            keys=[
+                f"{self.VALKEY_KEYS['CHAT_BURST']}:{session_id}",
+                f"{self.VALKEY_KEYS['CHAT_BURST_OWNER']}:{session_id}",
+                f"{self.VALKEY_KEYS['CHAT_BURST_CLAIMED']}:{session_id}",
+                f"{self.VALKEY_KEYS['CHAT_BURST_BATCH']}:{session_id}:{job_id}",
+            ],
+            args=[job_id, ttl],
+        )
+        return bool(claimed)
+
+    async def get_chat_burst_batch(
+        self, session_id: str, job_id: str
+    ) -> List[ChatMessage]:
+        batch = await self._valkey_client.hgetall(
+            f"{self.VALKEY_KEYS['CHAT_BURST_BATCH']}:{session_id}:{job_id}"
+        )  # type: ignore
+        # Stream ids order the jobs by arrival; timestamps order their messages.
+        messages = [
+            ChatMessage.model_validate(message)
+            for _, messages_json in sorted(
+                batch.items(),
+                key=lambda item: tuple(int(part) for part in item[0].split("-")),
+            )
+            for message in json.loads(messages_json)
+        ]
+        return sorted(messages, key=lambda message: message.timestamp)
+
     async def update_pending_messages(
         self,
         session_id: str,
@@ -124,21 +629,34 @@ class ValkeyClient:
         base_url: str,
         messages: List[ChatMessage],
     ):
-        pending_messages = await self.get_pending_messages(session_id)
-        cash_messages = pending_messages.chat_messages if pending_messages else []
-        cash_messages.extend(messages)
-        pending_messages = PendingMessageContext(
-            base_url=base_url,
-            message_type=message_type,
-            chat_messages=cash_messages,
-        )
-        await self._valkey_client.set(
-            f"{self.VALKEY_KEYS['CHAT_MESSAGES']}:{session_id}",
-            pending_messages.model_dump_json(),
-        )  # type: ignore
-        await self._valkey_client.expire(
-            f"{self.VALKEY_KEYS['CHAT_MESSAGES']}:{session_id}", self._default_ttl
-        )
+        """Append messages to the pending ones, without losing a concurrent ack."""
+        key = f"{self.VALKEY_KEYS['CHAT_MESSAGES']}:{session_id}"
+        async with self._valkey_client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    messages_json = await pipe.get(key)
+                    cash_messages = (
+                        PendingMessageContext.model_validate_json(
+                            messages_json
+                        ).chat_messages
+                        if messages_json
+                        else []
+                    )
+                    cash_messages.extend(messages)
+                    pending_messages = PendingMessageContext(
+                        base_url=base_url,
+                        message_type=message_type,
+                        chat_messages=cash_messages,
+                    )
+                    pipe.multi()
+                    pipe.set(
+                        key, pending_messages.model_dump_json(), ex=self._default_ttl
+                    )
+                    await pipe.execute()
+                    return
+                except valkey.WatchError:
+                    continue
 
     async def get_pending_messages(
         self, session_id: str
@@ -151,6 +669,32 @@ class ValkeyClient:
             return PendingMessageContext.model_validate(messages_data)
         return None
 
+    async def ack_pending_messages(self, session_id: str, count: int) -> int:
+        """Drop the first count pending messages, keeping any appended since."""
+        key = f"{self.VALKEY_KEYS['CHAT_MESSAGES']}:{session_id}"
+        async with self._valkey_client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    messages_json = await pipe.get(key)
+                    if not messages_json:
+                        await pipe.reset()
+                        return 0
+                    pending_messages = PendingMessageContext.model_validate_json(
+                        messages_json
+                    )
+                    remaining = pending_messages.chat_messages[count:]
+                    pipe.multi()
+                    if remaining:
+                        pending_messages.chat_messages = remaining
+                        pipe.set(key, pending_messages.model_dump_json(), keepttl=True)
+                    else:
+                        pipe.delete(key)
+                    await pipe.execute()
+                    return len(remaining)
+                except valkey.WatchError:
+                    continue
+
     async def delete_pending_messages(self, session_id: str) -> None:
         await self._valkey_client.delete(
             f"{self.VALKEY_KEYS['CHAT_MESSAGES']}:{session_id}"
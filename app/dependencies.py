@@ -1,9 +1,12 @@
 # Copyright (c) 0235 Inc.
 # This file is licensed under the karakuri_agent Personal Use & No Warranty License.
 # Please see the LICENSE file in the project root.
-from app.core.chat.line_chat_client import LineChatClient
+from app.core.blob_store import BlobStore
+from app.core.chat.line_client_registry import LineClientRegistry
 from app.core.chat.chat_service import ChatService
 from app.core.facade.talk_facade import TalkFacade
+from app.core.image_fetcher import ImageFetcher
+from app.core.job_queue import JobQueue
 from app.core.llm_service import LLMService
 from app.core.memory.memory_service import MemoryService
 from app.core.status_service import StatusService
@@ -42,13 +45,50 @@ def get_status_service() -> StatusService:
 
 
 @lru_cache()
-def get_line_chat_client() -> LineChatClient:
-    return LineChatClient()
+def get_line_client_registry() -> LineClientRegistry:
+    return LineClientRegistry()
+
+
+@lru_cache()
+def get_blob_store() -> BlobStore:
+    settings = get_settings()
+    return BlobStore(settings.blob_store_dir, settings.blob_store_ttl)
 
 
 @lru_cache()
 def get_chat_service() -> ChatService:
-    return ChatService()
+    return ChatService(blob_store=get_blob_store())
+
+
+@lru_cache()
+def get_image_fetcher() -> ImageFetcher:
+    settings = get_settings()
+    return ImageFetcher(
+        max_bytes=settings.image_fetch_max_bytes,
+        timeout=settings.image_fetch_timeout,
+        max_connections=settings.image_fetch_max_connections,
+        max_per_host=settings.image_fetch_max_per_host,
+        cache_ttl=settings.image_fetch_cache_ttl,
+        cache_max_size=settings.image_fetch_cache_max_size,
+        cache_max_bytes=settings.image_fetch_cache_max_bytes,
+        revalidate_max_bytes=settings.image_fetch_revalidate_max_bytes,
+    )
+
+
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    settings = get_settings()
+    return JobQueue(
+        name="default",
+        concurrency=settings.job_queue_concurrency,
+        max_retries=settings.job_queue_max_retries,
+        retry_base_delay=settings.job_queue_retry_base_delay,
+        visibility_timeout=settings.job_queue_visibility_timeout,
+        max_deliveries=settings.job_queue_max_deliveries,
+        block_timeout=settings.job_queue_block_timeout,
+        max_length=settings.job_queue_max_length,
+        shutdown_timeout=settings.job_queue_shutdown_timeout,
+    )
 
 
 def get_talk_facade() -> TalkFacade:
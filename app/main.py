@@ -9,9 +9,20 @@ from app.auth.api_key import verify_token
 from app.core.config import get_settings
 from app.core.tasks.status_check import check_conversation_timeouts
 from app.core.tasks.message_sender import send_pending_messages
+from app.core.tasks.memory_writer import write_session_memories
+from app.core.tasks.blob_cleanup import cleanup_blob_store
+from app.core.tasks.job_worker import run_job_worker
+from app.core.agent_manager import get_agent_manager
+from app.dependencies import (
+    get_image_fetcher,
+    get_line_client_registry,
+    get_memory_service,
+)
+from app.utils.metrics import get_metrics
 from contextlib import asynccontextmanager
 import asyncio
 import logging
+from typing import List
 from app.core.exceptions import KarakuriError
 from app.middleware.error_handler import karakuri_exception_handler
 from fastapi.responses import JSONResponse
@@ -26,16 +37,36 @@ settings = get_settings()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    status_check_task = asyncio.create_task(check_conversation_timeouts())
-    message_sender_task = asyncio.create_task(send_pending_messages())
+    agent_manager = get_agent_manager()
+    line_client_registry = get_line_client_registry()
+    line_client_registry.create_clients(
+        [
+            agent_manager.get_agent(agent_id)
+            for agent_id, _ in agent_manager.get_all_agents()
+        ]
+    )
+    background_tasks: List[asyncio.Task] = [
+        asyncio.create_task(check_conversation_timeouts()),
+        asyncio.create_task(send_pending_messages()),
+        asyncio.create_task(write_session_memories()),
+        asyncio.create_task(cleanup_blob_store()),
+    ]
+    if settings.job_worker_in_process:
+        background_tasks.append(asyncio.create_task(run_job_worker()))
     yield
-    status_check_task.cancel()
-    message_sender_task.cancel()
-    try:
-        await status_check_task
-        await message_sender_task
-    except asyncio.CancelledError:
-        logging.info("Background tasks were cancelled")
+    for task in background_tasks:
+        task.cancel()
+    for task in background_tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    logging.info("Background tasks were cancelled")
+    memory_service = get_memory_service()
+    await memory_service.drain_memory_queue(settings.memory_queue_drain_timeout)
+    await memory_service.close()
+    await line_client_registry.close()
+    await get_image_fetcher().close()
 
 
 app = FastAPI(
@@ -92,3 +123,8 @@ app.include_router(audio.router, prefix="/v1/utils/audio", tags=["utils/audio"])
 @app.get("/health")
 async def health_check(api_key: str = Depends(verify_token)):
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+async def metrics(api_key: str = Depends(verify_token)):
+    return await get_metrics().snapshot()
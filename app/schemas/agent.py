@@ -26,6 +26,9 @@ class AgentConfig(BaseModel):
     line_channel_access_token: str
     zep_url: str
     zep_api_secret: str
+    prompt_token_budget: int
+    memory_prefetch: bool = False
+    structured_output: bool = False
 
 
 class AgentResponse(BaseModel):
@@ -17,6 +17,7 @@ class MessageContent(BaseModel):
     type: MessageType
     text: Optional[str] = None
     image: Optional[bytes] = None
+    image_id: Optional[str] = None
 
 
 class ChatMessage(BaseModel):
@@ -0,0 +1,139 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+"""
+In-process caching utilities.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class AsyncTTLCache(Generic[K, V]):
+    """
+    LRU cache with per-entry TTL and single-flight loading.
+
+    Concurrent lookups of the same missing key share one loader call. A loader
+    result of None is cached as a negative entry using negative_ttl. Loader
+    exceptions are propagated to every waiter and are not cached.
+
+    With a weigher, the summed weight of the entries, such as their size in
+    bytes, is also kept within max_weight; a value heavier than max_weight
+    on its own is returned but not cached.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_size: int,
+        negative_ttl: Optional[float] = None,
+        weigher: Optional[Callable[[V], int]] = None,
+        max_weight: int = 0,
+    ):
+        self._ttl = ttl
+        self._negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._max_size = max_size
+        self._weigher = weigher
+        self._max_weight = max_weight
+        self._weight = 0
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self._in_flight: Dict[K, "asyncio.Task[V]"] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_load(self, key: K, loader: Callable[[], Awaitable[V]]) -> V:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self._discard(key)
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._in_flight[key] = task
+        else:
+            self.coalesced += 1
+        # Shield so that one cancelled caller does not cancel the shared load.
+        return await asyncio.shield(task)
+
+    async def _load(self, key: K, loader: Callable[[], Awaitable[V]]) -> V:
+        try:
+            value = await loader()
+        except BaseException:
+            if self._in_flight.get(key) is asyncio.current_task():
+                del self._in_flight[key]
+            raise
+        # A load that was invalidated while running must not be stored.
+        if self._in_flight.get(key) is asyncio.current_task():
+            del self._in_flight[key]
+            self.set(key, value)
+        return value
+
+    def set(self, key: K, value: V):
+        self._discard(key)
+        weight = self._weigh(value)
+        if self._weigher is not None and weight > self._max_weight:
+            return
+        ttl = self._negative_ttl if value is None else self._ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._weight += weight
+        while len(self._entries) > self._max_size or (
+            self._weigher is not None and self._weight > self._max_weight
+        ):
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._weight -= self._weigh(evicted)
+
+    def invalidate(self, key: K):
+        self._discard(key)
+        self._in_flight.pop(key, None)
+
+    def invalidate_matching(self, predicate: Callable[[K], bool]):
+        for key in [key for key in self._entries if predicate(key)]:
+            self._discard(key)
+        for key in [key for key in self._in_flight if predicate(key)]:
+            del self._in_flight[key]
+
+    def clear(self):
+        self._entries.clear()
+        self._in_flight.clear()
+        self._weight = 0
+
+    @property
+    def weight(self) -> int:
+        return self._weight
+
+    def _discard(self, key: K):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._weight -= self._weigh(entry[1])
+
+    def _weigh(self, value: V) -> int:
+        if self._weigher is None or value is None:
+            return 0
+        return self._weigher(value)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / lookups if lookups else 0.0
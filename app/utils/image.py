@@ -0,0 +1,96 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+"""
+Image normalization before images are sent to an LLM.
+"""
+
+import asyncio
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from PIL import Image, ImageOps
+
+from app.core.config import get_settings
+from app.utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+_executor = ThreadPoolExecutor(
+    max_workers=settings.image_worker_threads, thread_name_prefix="image"
+)
+_DEFAULT_MIME_TYPE = "image/jpeg"
+# Formats that LLM providers accept as they are.
+_PASSTHROUGH_MIME_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif"}
+
+
+class NormalizedImage(NamedTuple):
+    data: bytes
+    mime_type: str
+
+
+def _normalize_image(data: bytes, max_edge: int, jpeg_quality: int) -> NormalizedImage:
+    with Image.open(io.BytesIO(data)) as image:
+        mime_type = Image.MIME.get(image.format or "", _DEFAULT_MIME_TYPE)
+        has_metadata = "exif" in image.info or "icc_profile" in image.info
+        # Lets the JPEG decoder scale down while decoding.
+        image.draft("RGB", (max_edge, max_edge))
+        transposed = ImageOps.exif_transpose(image) or image
+        resized = max(transposed.size) > max_edge
+        transposed.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+        has_alpha = transposed.mode in ("RGBA", "LA", "PA") or (
+            transposed.mode == "P" and "transparency" in transposed.info
+        )
+        output = io.BytesIO()
+        if has_alpha:
+            transposed.save(output, format="PNG", optimize=True)
+            encoded = NormalizedImage(output.getvalue(), "image/png")
+        else:
+            transposed.convert("RGB").save(
+                output, format="JPEG", quality=jpeg_quality, optimize=True
+            )
+            encoded = NormalizedImage(output.getvalue(), "image/jpeg")
+
+    if (
+        not resized
+        and not has_metadata
+        and mime_type in _PASSTHROUGH_MIME_TYPES
+        and len(data) <= len(encoded.data)
+    ):
+        return NormalizedImage(data, mime_type)
+    return encoded
+
+
+async def normalize_image(data: bytes) -> NormalizedImage:
+    """Downscale, re-encode and strip metadata from an uploaded image.
+
+    Images are scaled to fit IMAGE_MAX_EDGE and re-encoded as JPEG, or PNG
+    when they have transparency. The original is kept when it is already
+    small, clean and in a format LLMs accept. Images that cannot be decoded
+    are passed through unchanged. Decoding runs in a worker thread pool.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        normalized = await loop.run_in_executor(
+            _executor,
+            _normalize_image,
+            data,
+            settings.image_max_edge,
+            settings.image_jpeg_quality,
+        )
+    except Exception as e:
+        logger.warning(f"Failed to normalize image, sending it unchanged: {e}")
+        return NormalizedImage(data, _DEFAULT_MIME_TYPE)
+
+    saved = len(data) - len(normalized.data)
+    metrics = get_metrics()
+    metrics.observe("image.bytes_saved", saved)
+    metrics.increment("image.bytes_saved_total", saved)
+    logger.info(
+        f"Normalized image: {len(data)} -> {len(normalized.data)} bytes ({normalized.mime_type})"
+    )
+    return normalized
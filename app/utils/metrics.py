@@ -0,0 +1,83 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+"""
+In-process metrics registry.
+Provides counters, sample summaries and pluggable collectors for runtime statistics.
+"""
+
+from collections import defaultdict, deque
+from functools import lru_cache
+import logging
+from typing import Any, Awaitable, Callable, Deque, Dict, List
+
+logger = logging.getLogger(__name__)
+
+Collector = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+def _percentile(sorted_samples: List[float], percentile: float) -> float:
+    index = round(percentile * (len(sorted_samples) - 1))
+    return sorted_samples[index]
+
+
+class Metrics:
+    """
+    Collects counters and recent samples for this process.
+
+    Samples keep a bounded window per name, so summaries reflect recent
+    behaviour. Collectors are async callables queried on every snapshot,
+    for values that live outside the process such as queue depths.
+    """
+
+    def __init__(self, window_size: int = 1000):
+        self._window_size = window_size
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._samples: Dict[str, Deque[float]] = {}
+        self._collectors: Dict[str, Collector] = {}
+
+    def increment(self, name: str, value: float = 1):
+        self._counters[name] += value
+
+    def counter(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def observe(self, name: str, value: float):
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = deque(maxlen=self._window_size)
+            self._samples[name] = samples
+        samples.append(value)
+
+    def register_collector(self, name: str, collector: Collector):
+        self._collectors[name] = collector
+
+    def summarize(self, name: str) -> Dict[str, float]:
+        samples = sorted(self._samples.get(name) or [])
+        if not samples:
+            return {"count": 0}
+        return {
+            "count": len(samples),
+            "p50": _percentile(samples, 0.5),
+            "p95": _percentile(samples, 0.95),
+            "max": samples[-1],
+        }
+
+    async def snapshot(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "counters": dict(self._counters),
+            "summaries": {name: self.summarize(name) for name in self._samples},
+        }
+        for name, collector in self._collectors.items():
+            try:
+                result[name] = await collector()
+            except Exception as e:
+                logger.error(f"Error collecting metrics '{name}': {e}")
+                result[name] = {"error": str(e)}
+        return result
+
+
+@lru_cache()
+def get_metrics() -> Metrics:
+    return Metrics()
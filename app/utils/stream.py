@@ -0,0 +1,52 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+"""
+Helpers for reading streamed response bodies.
+"""
+
+from typing import AsyncIterable, Optional
+
+
+class PayloadTooLargeError(ValueError):
+    """Raised when a streamed body exceeds its size cap."""
+
+
+async def read_stream(
+    chunks: AsyncIterable[bytes], max_bytes: int, size_hint: Optional[int] = None
+) -> bytes:
+    """Read a chunked body into memory, stopping once it exceeds max_bytes.
+
+    With a size_hint such as a Content-Length, the buffer is allocated once
+    and chunks are written into it in place; otherwise it grows with amortized
+    appends. The only full copy is the final conversion to bytes.
+    """
+    if size_hint is not None and size_hint > max_bytes:
+        raise PayloadTooLargeError(
+            f"Payload of {size_hint} bytes exceeds the limit of {max_bytes} bytes"
+        )
+    buffer = bytearray(size_hint or 0)
+    view = memoryview(buffer)
+    length = 0
+    try:
+        async for chunk in chunks:
+            end = length + len(chunk)
+            if end > max_bytes:
+                raise PayloadTooLargeError(
+                    f"Payload exceeds the limit of {max_bytes} bytes"
+                )
+            if end <= len(buffer):
+                view[length:end] = chunk
+            else:
+                # The body is longer than announced; a resize needs the view released.
+                view.release()
+                del buffer[length:]
+                buffer += chunk
+                view = memoryview(buffer)
+            length = end
+    finally:
+        view.release()
+    if length < len(buffer):
+        del buffer[length:]
+    return bytes(buffer)
@@ -0,0 +1,59 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+"""
+Standalone job worker.
+
+Runs the LINE event jobs outside the API server, so that slow LLM and TTS
+calls do not compete with webhook handling. Start with `python -m app.worker`
+and set JOB_WORKER_IN_PROCESS=false on the API server.
+"""
+
+import asyncio
+import logging
+import signal
+from app.core.agent_manager import get_agent_manager
+from app.core.config import get_settings
+from app.core.tasks.job_worker import run_job_worker
+from app.dependencies import get_line_client_registry, get_memory_service
+
+logging.basicConfig(
+    level=logging.INFO,
+)
+
+
+async def main():
+    settings = get_settings()
+    agent_manager = get_agent_manager()
+    line_client_registry = get_line_client_registry()
+    line_client_registry.create_clients(
+        [
+            agent_manager.get_agent(agent_id)
+            for agent_id, _ in agent_manager.get_all_agents()
+        ]
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    worker = asyncio.create_task(run_job_worker())
+    await asyncio.wait(
+        [worker, asyncio.create_task(stop.wait())],
+        return_when=asyncio.FIRST_COMPLETED,
+    )
+    worker.cancel()
+    try:
+        await worker
+    except asyncio.CancelledError:
+        pass
+    logging.info("Job worker stopped")
+    memory_service = get_memory_service()
+    await memory_service.drain_memory_queue(settings.memory_queue_drain_timeout)
+    await memory_service.close()
+    await line_client_registry.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+"""
+Benchmark of LINE webhook verification and parsing cost per event.
+
+Compares the previous handling, which built a WebhookParser and verified and
+parsed the body twice per webhook, with the current single verify-and-parse
+stage using a cached parser.
+
+Usage:
+    python -m benchmarks.line_webhook [--events 1 5 20] [--iterations 2000]
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Callable, List, Tuple
+
+from linebot.v3.webhook import WebhookParser  # type: ignore
+
+from app.core.chat.line_chat_client import LineChatClient
+
+CHANNEL_SECRET = "benchmark-channel-secret"
+
+
+def create_webhook(event_count: int) -> Tuple[str, str]:
+    events = [
+        {
+            "type": "message",
+            "mode": "active",
+            "timestamp": 1700000000000 + i,
+            "source": {"type": "user", "userId": f"U{i:032x}"},
+            "webhookEventId": f"01HBENCHMARK{i:014d}",
+            "deliveryContext": {"isRedelivery": False},
+            "replyToken": f"{i:032x}",
+            "message": {
+                "id": str(100000 + i),
+                "type": "text",
+                "quoteToken": f"q{i}",
+                "text": f"Benchmark message {i}",
+            },
+        }
+        for i in range(event_count)
+    ]
+    body = json.dumps({"destination": "Ubenchmark", "events": events})
+    digest = hmac.new(CHANNEL_SECRET.encode(), body.encode(), hashlib.sha256).digest()
+    return body, base64.b64encode(digest).decode()
+
+
+def measure(handler: Callable[[], object], iterations: int) -> float:
+    handler()
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        handler()
+    return (time.perf_counter() - started_at) / iterations
+
+
+def main(event_counts: List[int], iterations: int):
+    client = LineChatClient()
+
+    print(
+        f"{'events':>6} {'before us/event':>16} {'after us/event':>15} {'speedup':>8}"
+    )
+    for event_count in event_counts:
+        body, signature = create_webhook(event_count)
+
+        def before():
+            for _ in range(2):
+                WebhookParser(CHANNEL_SECRET).parse(body, signature)
+
+        def after():
+            client.parse_line_events(body, signature, CHANNEL_SECRET)
+
+        before_seconds = measure(before, iterations)
+        after_seconds = measure(after, iterations)
+        print(
+            f"{event_count:>6} {before_seconds / event_count * 1e6:>16.1f} "
+            f"{after_seconds / event_count * 1e6:>15.1f} "
+            f"{before_seconds / after_seconds:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.events, args.iterations)
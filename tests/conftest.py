@@ -0,0 +1,174 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+"""
+Runs the app against an in-memory Valkey.
+
+Modules create their Valkey client at import time, so valkey.asyncio is
+patched to return fakeredis clients before any app module is imported.
+"""
+
+import asyncio
+import signal
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import fakeredis
+import pytest
+import redis
+import valkey
+import valkey.asyncio
+
+_server = fakeredis.FakeServer()
+
+
+def _from_url(url, password=None, decode_responses=False, **kwargs):
+    return fakeredis.aioredis.FakeRedis(
+        server=_server, decode_responses=decode_responses
+    )
+
+
+valkey.asyncio.from_url = _from_url
+# fakeredis raises redis-py's exceptions, which the app catches as valkey's.
+valkey.ResponseError = redis.ResponseError  # type: ignore
+valkey.asyncio.ResponseError = redis.ResponseError  # type: ignore
+valkey.asyncio.WatchError = redis.WatchError  # type: ignore
+
+from tests.fakes import FakeChatClient, FakeLLM, FakeTTS  # noqa: E402
+
+
+_TEST_TIMEOUT = 30
+_VALKEY_CLIENT_MODULES = (
+    "app.core.chat.chat_service",
+    "app.core.job_queue",
+    "app.core.llm_service",
+    "app.core.memory.memory_service",
+    "app.core.status_service",
+)
+
+
+@pytest.fixture(autouse=True)
+def _timeout():
+    """Fail a test that hangs instead of stalling the whole run."""
+    if not hasattr(signal, "SIGALRM"):
+        yield
+        return
+
+    def fail(signum, frame):
+        raise TimeoutError(f"Test did not finish within {_TEST_TIMEOUT}s")
+
+    previous = signal.signal(signal.SIGALRM, fail)
+    signal.alarm(_TEST_TIMEOUT)
+    try:
+        yield
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+@pytest.fixture(autouse=True)
+def _valkey_clients(monkeypatch):
+    """
+    Give each test its own Valkey clients.
+
+    Every test runs its own event loop, and a client left from an earlier
+    loop can block on connections that belong to it.
+    """
+    import importlib
+
+    from app.core.config import get_settings
+    from app.core.valkey_client import ValkeyClient
+
+    settings = get_settings()
+    for name in _VALKEY_CLIENT_MODULES:
+        monkeypatch.setattr(
+            importlib.import_module(name),
+            "_valkey_client",
+            ValkeyClient(settings.valkey_url, settings.valkey_password),
+        )
+
+
+@pytest.fixture(autouse=True)
+def _flush_valkey():
+    yield
+
+    async def flush():
+        await fakeredis.aioredis.FakeRedis(server=_server).flushall()
+
+    asyncio.run(flush())
+
+
+class _FakeEvent:
+    """Passes webhook events through, as the fake chat client takes plain dicts."""
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> Dict[str, Any]:
+        return data
+
+
+@pytest.fixture
+def fake_audio(monkeypatch):
+    """Skip writing synthesized audio to disk."""
+    from app.core.chat import chat_client
+
+    async def upload_to_storage(*args: Any) -> str:
+        return "https://example.com/audio.wav"
+
+    monkeypatch.setattr(chat_client, "upload_to_storage", upload_to_storage)
+    monkeypatch.setattr(chat_client, "calculate_audio_duration", lambda data: 1000)
+
+
+@pytest.fixture
+def line_worker(monkeypatch, tmp_path, fake_audio):
+    """Wire the LINE events job handler to fakes and a real ChatService."""
+    from app.core.blob_store import BlobStore
+    from app.core import job_queue
+    from app.core.chat.chat_service import ChatService
+    from app.core.tasks import job_worker
+
+    client = FakeChatClient()
+    llm = FakeLLM()
+    chat_service = ChatService(BlobStore(str(tmp_path), 60))
+
+    async def is_chat_available(agent_id: str) -> bool:
+        return True
+
+    async def get_user(agent_id: str, user_id: str) -> Any:
+        return SimpleNamespace(id=user_id, first_name="Taro", last_name="Yamada")
+
+    monkeypatch.setattr(chat_service, "is_chat_available", is_chat_available)
+    monkeypatch.setattr(job_worker, "Event", _FakeEvent)
+    monkeypatch.setattr(
+        job_worker,
+        "get_agent_manager",
+        lambda: SimpleNamespace(
+            get_agent=lambda agent_id: SimpleNamespace(id=agent_id)
+        ),
+    )
+    monkeypatch.setattr(
+        job_worker, "get_memory_service", lambda: SimpleNamespace(get_user=get_user)
+    )
+    monkeypatch.setattr(
+        job_worker,
+        "get_line_client_registry",
+        lambda: SimpleNamespace(get=lambda agent_config: client),
+    )
+    monkeypatch.setattr(job_worker, "get_chat_service", lambda: chat_service)
+    monkeypatch.setattr(job_worker, "get_llm_service", lambda: llm)
+    monkeypatch.setattr(job_worker, "get_tts_service", lambda: FakeTTS())
+
+    async def run(job_id: str, events: List[Dict[str, Any]]):
+        """Run one delivery of a job, with the progress its earlier runs saved."""
+        steps = await job_queue._valkey_client.get_job_progress("line", job_id)
+        await job_worker.process_line_events(
+            {
+                "agent_id": "agent",
+                "user_id": "user",
+                "base_url": "https://example.com",
+                "events": events,
+            },
+            job_queue.JobProgress("line", job_id, steps, 60),
+        )
+
+    return SimpleNamespace(client=client, llm=llm, chat_service=chat_service, run=run)
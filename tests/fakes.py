@@ -0,0 +1,111 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+"""
+In-memory stand-ins for LINE, the LLM and TTS.
+"""
+
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.chat.chat_client import ChatClient
+from app.core.date_util import DateUtil
+from app.schemas.chat_message import ChatMessage, MessageContent, MessageType
+from app.schemas.llm import LLMResponse
+
+
+def make_message(
+    text: Optional[str] = None,
+    image: Optional[bytes] = None,
+    source: str = "U1",
+    at: float = 0.0,
+    reply_token: str = "token",
+) -> ChatMessage:
+    """A message sent at seconds after now by source."""
+    return ChatMessage(
+        reply_token=reply_token,
+        content=MessageContent(
+            type=MessageType.IMAGE if image is not None else MessageType.TEXT,
+            text=text,
+            image=image,
+        ),
+        id=source,
+        timestamp=DateUtil.now() + timedelta(seconds=at),
+    )
+
+
+class FakeChatClient(ChatClient):
+    """
+    Records what would go out to LINE.
+
+    Events are keyword arguments for make_message. The first
+    fail_push_audio audio pushes raise, like a rate-limited LINE API.
+    """
+
+    def __init__(self, fail_push_audio: int = 0):
+        self.sent: List[Tuple[str, ...]] = []
+        self.fail_push_audio = fail_push_audio
+
+    def create(self, agent_config: Any):
+        pass
+
+    async def close(self):
+        pass
+
+    async def process_message(self, events: List[Any]) -> List[ChatMessage]:
+        return [make_message(**event) for event in events]
+
+    async def reply_message(
+        self, token: str, message: str, audio_url: str, duration: int
+    ):
+        self.sent.append(("reply", token, message))
+
+    async def reply_text(self, token: str, message: str):
+        self.sent.append(("reply_text", token, message))
+
+    async def push_message(self, id: str, message: str, audio_url: str, duration: int):
+        self.sent.append(("push", id, message))
+
+    async def push_audio(self, id: str, audio_url: str, duration: int):
+        if self.fail_push_audio > 0:
+            self.fail_push_audio -= 1
+            raise RuntimeError("429 Too Many Requests")
+        self.sent.append(("push_audio", id))
+
+
+class FakeLLM:
+    """Answers every message with its own text and records the requests."""
+
+    def __init__(self):
+        self.requests: List[Tuple[Optional[str], Optional[bytes]]] = []
+
+    async def generate_response(
+        self,
+        message_type: str,
+        message: Optional[str],
+        agent_config: Any,
+        user_config: Any,
+        image: Optional[bytes] = None,
+    ) -> LLMResponse:
+        self.requests.append((message, image))
+        return LLMResponse(
+            user_message=message or "",
+            agent_message=f"re: {message}",
+            emotion="neutral",
+        )
+
+
+class FakeTTS:
+    async def generate_speech(self, text: str, agent_config: Any) -> bytes:
+        return b"RIFF"
+
+
+class FakeMessagingApi:
+    """Records push requests of the LINE messaging API."""
+
+    def __init__(self):
+        self.pushes: List[Dict[str, Any]] = []
+
+    async def push_message(self, request: Any):
+        self.pushes.append({"to": request.to, "messages": request.messages})
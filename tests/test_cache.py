@@ -0,0 +1,36 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+import asyncio
+
+from app.utils.cache import AsyncTTLCache
+
+
+def test_weighted_cache_evicts_least_recently_used_past_max_weight():
+    cache: AsyncTTLCache[str, bytes] = AsyncTTLCache(
+        ttl=60, max_size=100, weigher=len, max_weight=10
+    )
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    cache.set("c", b"1234")
+
+    async def load() -> bytes:
+        return b"loaded"
+
+    async def lookup():
+        return [await cache.get_or_load(key, load) for key in ("c", "b", "a")]
+
+    assert asyncio.run(lookup()) == [b"1234", b"1234", b"loaded"]
+    assert cache.weight == 4 + 6
+
+
+def test_weighted_cache_skips_values_heavier_than_max_weight():
+    cache: AsyncTTLCache[str, bytes] = AsyncTTLCache(
+        ttl=60, max_size=100, weigher=len, max_weight=10
+    )
+    cache.set("small", b"123")
+    cache.set("large", b"x" * 11)
+    cache.set("small", b"12345")
+
+    assert cache.weight == 5
@@ -0,0 +1,117 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+import asyncio
+
+from app.core.chat.chat_client import coalesce_messages
+from app.core.config import get_settings
+from tests.fakes import make_message
+
+
+def test_burst_from_one_source_becomes_one_turn():
+    messages = [
+        make_message("hello", at=0, reply_token="t1"),
+        make_message("are you there?", at=1, reply_token="t2"),
+    ]
+
+    turns = coalesce_messages(messages, window=5)
+
+    assert len(turns) == 1
+    assert turns[0].message.content.text == "hello\nare you there?"
+    assert turns[0].message.reply_token == "t2"
+    assert turns[0].consumed == 2
+
+
+def test_gap_longer_than_window_starts_new_turn():
+    messages = [make_message("first", at=0), make_message("second", at=10)]
+
+    turns = coalesce_messages(messages, window=5)
+
+    assert [turn.message.content.text for turn in turns] == ["first", "second"]
+    assert [turn.consumed for turn in turns] == [1, 2]
+
+
+def test_sources_are_not_merged():
+    messages = [
+        make_message("from one", source="U1"),
+        make_message("from two", source="U2"),
+    ]
+
+    turns = coalesce_messages(messages, window=5)
+
+    assert [turn.message.id for turn in turns] == ["U1", "U2"]
+
+
+def test_image_is_attached_to_next_text_of_same_source():
+    messages = [
+        make_message(image=b"png", source="U1", at=0),
+        make_message("what is this?", source="U1", at=1),
+    ]
+
+    turns = coalesce_messages(messages, window=5)
+
+    assert len(turns) == 1
+    assert turns[0].message.content.image == b"png"
+    assert turns[0].message.content.text == "what is this?"
+
+
+def test_image_without_text_is_not_a_turn():
+    assert coalesce_messages([make_message(image=b"png")], window=5) == []
+
+
+def test_burst_across_webhooks_is_answered_once(line_worker, monkeypatch):
+    monkeypatch.setattr(get_settings(), "chat_message_coalesce_window", 0.2)
+
+    async def deliver():
+        first = asyncio.create_task(
+            line_worker.run("1-0", [{"image": b"png", "reply_token": "t1"}])
+        )
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(
+            line_worker.run(
+                "2-0", [{"text": "what is this?", "at": 0.05, "reply_token": "t2"}]
+            )
+        )
+        await asyncio.sleep(0.05)
+        third = asyncio.create_task(
+            line_worker.run(
+                "3-0", [{"text": "and why?", "at": 0.1, "reply_token": "t3"}]
+            )
+        )
+        await asyncio.gather(first, second, third)
+
+    asyncio.run(deliver())
+
+    assert line_worker.llm.requests == [("what is this?\nand why?", b"png")]
+    assert line_worker.client.sent == [("reply", "t3", "re: what is this?\nand why?")]
+
+
+def test_redelivered_burst_jobs_send_nothing(line_worker, monkeypatch):
+    monkeypatch.setattr(get_settings(), "chat_message_coalesce_window", 0.05)
+
+    async def deliver():
+        await asyncio.gather(
+            line_worker.run("1-0", [{"text": "one"}]),
+            line_worker.run("2-0", [{"text": "two", "at": 0.01}]),
+        )
+        # Both jobs run again, e.g. after a worker died before acknowledging.
+        await line_worker.run("1-0", [{"text": "one"}])
+        await line_worker.run("2-0", [{"text": "two", "at": 0.01}])
+
+    asyncio.run(deliver())
+
+    assert len(line_worker.llm.requests) == 1
+    assert len(line_worker.client.sent) == 1
+
+
+def test_zero_window_answers_each_webhook(line_worker, monkeypatch):
+    monkeypatch.setattr(get_settings(), "chat_message_coalesce_window", 0)
+
+    async def deliver():
+        await line_worker.run("1-0", [{"text": "one"}])
+        await line_worker.run("2-0", [{"text": "two"}])
+
+    asyncio.run(deliver())
+
+    assert [request[0] for request in line_worker.llm.requests] == ["one", "two"]
@@ -0,0 +1,55 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+from typing import Any, List
+
+from app.core.llm.context_assembler import ContextAssembler
+
+MODEL = "gpt-4o"
+SYSTEM: Any = {"role": "system", "content": "You are a helpful agent."}
+
+
+def _tool_turn(question: str, call_id: str, output: str, answer: str) -> List[Any]:
+    return [
+        {"role": "user", "content": question},
+        {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": call_id,
+                    "type": "function",
+                    "function": {"name": "search_facts", "arguments": "{}"},
+                }
+            ],
+        },
+        {"role": "tool", "tool_call_id": call_id, "content": output},
+        {"role": "assistant", "content": answer},
+    ]
+
+
+def test_current_turn_tool_output_over_budget_is_truncated():
+    history = [
+        *_tool_turn("What do I like?", "call_1", "likes tea", "You like tea."),
+        *_tool_turn("Tell me everything.", "call_2", "fact " * 2000, "Here it is.")[:3],
+    ]
+
+    messages = ContextAssembler(tool_output_max_tokens=100).assemble(
+        MODEL, SYSTEM, history, budget=500
+    )
+
+    assert messages[1:5] == history[:4]
+    current_tool_output = messages[-1]["content"]
+    assert current_tool_output.endswith("[truncated]")
+    assert len(current_tool_output) < len(history[-1]["content"])
+
+
+def test_tool_output_within_budget_is_kept_whole():
+    history = _tool_turn("Tell me everything.", "call_1", "fact " * 200, "")[:3]
+
+    messages = ContextAssembler(tool_output_max_tokens=100).assemble(
+        MODEL, SYSTEM, history, budget=10000
+    )
+
+    assert messages == [SYSTEM, *history]
@@ -0,0 +1,222 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List
+
+import pytest
+
+from app.core import job_queue
+from app.core.chat import chat_client
+from app.core.config import get_settings
+from app.core.job_queue import JobProgress, JobQueue
+from app.utils.metrics import Metrics
+
+
+@pytest.fixture(autouse=True)
+def _polling_reads(monkeypatch, _valkey_clients):
+    # fakeredis ignores cancellation of a blocking XREADGROUP, which would
+    # keep the worker from stopping, so reads poll instead.
+    read_jobs = job_queue._valkey_client.read_jobs
+
+    async def poll_jobs(queue, group, consumer, count, block_ms):
+        jobs = await read_jobs(queue, group, consumer, count, None)  # type: ignore
+        if not jobs:
+            await asyncio.sleep(block_ms / 1000)
+        return jobs
+
+    monkeypatch.setattr(job_queue._valkey_client, "read_jobs", poll_jobs)
+
+
+def _queue(**overrides: Any) -> JobQueue:
+    options: Dict[str, Any] = {
+        "name": "test",
+        "concurrency": 2,
+        "max_retries": 2,
+        "retry_base_delay": 0.01,
+        "visibility_timeout": 0.2,
+        "max_deliveries": 3,
+        "block_timeout": 0.02,
+        "max_length": 100,
+        "shutdown_timeout": 1,
+    }
+    options.update(overrides)
+    return JobQueue(**options)
+
+
+async def _run_until(
+    queue: JobQueue, done: Callable[[], Awaitable[bool]], timeout: float = 3
+):
+    await job_queue._valkey_client.create_job_group("test", "workers")
+    worker = asyncio.create_task(queue.run("worker"))
+    try:
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not await done():
+            assert asyncio.get_running_loop().time() < deadline, "timed out"
+            await asyncio.sleep(0.02)
+    finally:
+        # Cancelling would interrupt the worker inside a fakeredis command,
+        # which fakeredis does not always give up.
+        queue.stop()
+        await asyncio.wait_for(worker, timeout)
+
+
+async def _stats(queue: JobQueue) -> Dict[str, int]:
+    return await job_queue._valkey_client.get_job_queue_stats("test", "workers")
+
+
+def test_failing_job_is_retried_until_it_succeeds():
+    queue = _queue()
+    attempts: List[Dict[str, Any]] = []
+
+    async def handler(payload: Dict[str, Any], progress: JobProgress):
+        attempts.append(payload)
+        if len(attempts) < 3:
+            raise RuntimeError("temporary failure")
+
+    queue.register("flaky", handler)
+
+    async def run():
+        await queue.enqueue("flaky", {"n": 1})
+        await _run_until(queue, lambda: _is_empty(queue))
+        return await _stats(queue)
+
+    stats = asyncio.run(run())
+
+    assert attempts == [{"n": 1}] * 3
+    assert stats == {"length": 0, "pending": 0, "dead_letters": 0}
+
+
+def test_job_failing_every_retry_is_dead_lettered():
+    queue = _queue(max_retries=1)
+
+    async def handler(payload: Dict[str, Any], progress: JobProgress):
+        raise RuntimeError("permanent failure")
+
+    queue.register("broken", handler)
+
+    async def run():
+        await queue.enqueue("broken", {})
+        await _run_until(queue, lambda: _has_dead_letters(queue))
+        return await _stats(queue)
+
+    assert asyncio.run(run()) == {"length": 0, "pending": 0, "dead_letters": 1}
+
+
+def test_reclaimed_job_resumes_from_its_progress():
+    queue = _queue()
+    seen: List[Any] = []
+
+    async def handler(payload: Dict[str, Any], progress: JobProgress):
+        seen.append(progress.get("sent"))
+        await progress.set("sent")
+
+    queue.register("send", handler)
+
+    async def run():
+        await job_queue._valkey_client.create_job_group("test", "workers")
+        job_id = await queue.enqueue("send", {})
+        # A worker takes the job, records a step and dies before acking.
+        await job_queue._valkey_client.read_jobs("test", "workers", "dead", 1, 0)
+        steps = await job_queue._valkey_client.get_job_progress("test", job_id)
+        await JobProgress("test", job_id, steps, 60).set("sent")
+        await _run_until(queue, lambda: _is_empty(queue))
+        return await job_queue._valkey_client.get_job_progress("test", job_id)
+
+    progress_after_ack = asyncio.run(run())
+
+    assert seen == ["1"]
+    assert progress_after_ack == {}
+
+
+def test_job_redelivered_too_often_is_dead_lettered():
+    queue = _queue(max_deliveries=1)
+    handled: List[Dict[str, Any]] = []
+
+    async def handler(payload: Dict[str, Any], progress: JobProgress):
+        handled.append(payload)
+
+    queue.register("send", handler)
+
+    async def run():
+        await job_queue._valkey_client.create_job_group("test", "workers")
+        await queue.enqueue("send", {})
+        await job_queue._valkey_client.read_jobs("test", "workers", "dead", 1, 0)
+        await _run_until(queue, lambda: _has_dead_letters(queue))
+
+    asyncio.run(run())
+
+    assert handled == []
+
+
+def test_line_job_retry_sends_only_what_is_missing(line_worker, monkeypatch):
+    monkeypatch.setattr(get_settings(), "chat_message_coalesce_window", 0)
+    # Speech is slower than the reply token lasts, so text goes out first.
+    metrics = Metrics()
+    metrics.observe("chat.speech_seconds", 3600)
+    monkeypatch.setattr(chat_client, "get_metrics", lambda: metrics)
+    line_worker.client.fail_push_audio = 1
+    events = [{"text": "hello", "reply_token": "t1"}]
+
+    async def deliver():
+        with pytest.raises(RuntimeError):
+            await line_worker.run("1-0", events)
+        assert line_worker.client.sent == [("reply_text", "t1", "re: hello")]
+        await line_worker.run("1-0", events)
+        await line_worker.run("1-0", events)
+
+    asyncio.run(deliver())
+
+    assert line_worker.client.sent == [
+        ("reply_text", "t1", "re: hello"),
+        ("push_audio", "U1"),
+    ]
+    assert len(line_worker.llm.requests) == 1
+
+
+def test_line_job_retry_skips_answered_turns(line_worker, monkeypatch):
+    monkeypatch.setattr(get_settings(), "chat_message_coalesce_window", 0)
+    events = [
+        {"text": "first", "source": "U1", "reply_token": "t1"},
+        {"text": "second", "source": "U2", "reply_token": "t2"},
+    ]
+    client = line_worker.client
+    reply_message = client.reply_message
+    push_message = client.push_message
+    outage = {"U2": True}
+
+    async def reply_or_fail(token: str, message: str, audio_url: str, duration: int):
+        if token == "t2" and outage["U2"]:
+            raise RuntimeError("LINE API unavailable")
+        await reply_message(token, message, audio_url, duration)
+
+    async def push_or_fail(id: str, message: str, audio_url: str, duration: int):
+        if outage.get(id, False):
+            raise RuntimeError("LINE API unavailable")
+        await push_message(id, message, audio_url, duration)
+
+    monkeypatch.setattr(client, "reply_message", reply_or_fail)
+    monkeypatch.setattr(client, "push_message", push_or_fail)
+
+    async def deliver():
+        with pytest.raises(RuntimeError):
+            await line_worker.run("1-0", events)
+        assert client.sent == [("reply", "t1", "re: first")]
+        outage["U2"] = False
+        await line_worker.run("1-0", events)
+
+    asyncio.run(deliver())
+
+    assert client.sent == [("reply", "t1", "re: first"), ("reply", "t2", "re: second")]
+    # The reply to the failed turn was kept, so the LLM answered each turn once.
+    assert [request[0] for request in line_worker.llm.requests] == ["first", "second"]
+
+
+async def _is_empty(queue: JobQueue) -> bool:
+    stats = await _stats(queue)
+    return stats["length"] == 0 and stats["pending"] == 0
+
+
+async def _has_dead_letters(queue: JobQueue) -> bool:
+    return (await _stats(queue))["dead_letters"] > 0
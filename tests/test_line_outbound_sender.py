@@ -0,0 +1,52 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+import asyncio
+import time
+
+from linebot.v3.messaging.models import TextMessage  # type: ignore
+
+from app.core.chat.line_outbound_sender import LineOutboundSender
+from app.utils.rate_limit import TokenBucket
+from tests.fakes import FakeMessagingApi
+
+
+def test_every_push_is_sent_to_its_recipient():
+    api = FakeMessagingApi()
+
+    async def send():
+        sender = LineOutboundSender(api, push_rate=1000)  # type: ignore
+        await asyncio.gather(
+            *(sender.push(to, [TextMessage(text="hi")]) for to in ("U1", "C1", "R1"))  # type: ignore
+        )
+
+    asyncio.run(send())
+
+    assert sorted(push["to"] for push in api.pushes) == ["C1", "R1", "U1"]
+
+
+def test_pushes_beyond_the_rate_wait_for_tokens():
+    api = FakeMessagingApi()
+
+    async def send():
+        sender = LineOutboundSender(api, push_rate=20)  # type: ignore
+        started_at = time.monotonic()
+        await asyncio.gather(
+            *(sender.push(f"U{i}", [TextMessage(text="hi")]) for i in range(22))  # type: ignore
+        )
+        return time.monotonic() - started_at
+
+    assert asyncio.run(send()) >= 0.09
+    assert len(api.pushes) == 22
+
+
+def test_token_bucket_spreads_calls_over_time():
+    async def acquire_all():
+        bucket = TokenBucket(rate=20, capacity=1)
+        started_at = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        return time.monotonic() - started_at
+
+    assert asyncio.run(acquire_all()) >= 0.09
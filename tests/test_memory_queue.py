@@ -0,0 +1,182 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+import asyncio
+import json
+from typing import Any, List
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.memory import memory_service
+from app.core.memory.memory_service import MemoryService
+
+_valkey_client = memory_service._valkey_client
+
+
+@pytest.fixture
+def service(monkeypatch) -> MemoryService:
+    monkeypatch.setattr(get_settings(), "memory_queue_max_attempts", 3)
+    monkeypatch.setattr(get_settings(), "memory_queue_retry_base_delay", 0)
+    return MemoryService()
+
+
+class _FlakyZep:
+    """Fails the writes listed as False in outcomes, in order."""
+
+    def __init__(self, *outcomes: bool):
+        self.outcomes = list(outcomes)
+        self.written: List[Any] = []
+
+    async def __call__(
+        self, agent_id: str, user_id: str, session_id: str, messages: List[Any]
+    ):
+        if not self.outcomes.pop(0):
+            raise RuntimeError("400 Bad Request")
+        self.written.append(messages)
+
+
+async def _enqueue(session_id: str, text: str):
+    entry = {
+        "agent_id": "agent",
+        "user_id": "user",
+        "messages": [{"role": "user", "content": text}],
+        "enqueued_at": 0,
+    }
+    await _valkey_client.enqueue_memory(session_id, json.dumps(entry), 0)
+
+
+async def _flush(service: MemoryService, times: int):
+    for _ in range(times):
+        await service.flush_memory_queue(drain=True)
+
+
+def test_write_failing_every_attempt_is_dead_lettered(service, monkeypatch):
+    zep = _FlakyZep(False, False, False)
+    monkeypatch.setattr(service, "_write_session_memory", zep)
+
+    async def run():
+        await _enqueue("session", "poison")
+        await _flush(service, 5)
+        return (
+            await _valkey_client.get_queued_memory("session", 10),
+            await _valkey_client.count_memory_sessions(),
+            await _valkey_client.count_memory_dead_letters(),
+        )
+
+    queued, sessions, dead_letters = asyncio.run(run())
+
+    assert zep.outcomes == []
+    assert (queued, sessions, dead_letters) == ([], 0, 1)
+
+
+def test_successful_write_resets_the_attempt_count(service, monkeypatch):
+    zep = _FlakyZep(False, False, True, False, False)
+    monkeypatch.setattr(service, "_write_session_memory", zep)
+    monkeypatch.setattr(service, "_refresh_memory_context", _no_refresh)
+
+    async def run():
+        await _enqueue("session", "first")
+        await _flush(service, 3)
+        await _enqueue("session", "second")
+        await _flush(service, 2)
+        return (
+            await _valkey_client.get_queued_memory("session", 10),
+            await _valkey_client.count_memory_dead_letters(),
+        )
+
+    queued, dead_letters = asyncio.run(run())
+
+    assert len(zep.written) == 1
+    assert len(queued) == 1
+    assert dead_letters == 0
+
+
+def test_session_locked_by_another_worker_is_skipped(service, monkeypatch):
+    zep = _FlakyZep(True)
+    monkeypatch.setattr(service, "_write_session_memory", zep)
+    monkeypatch.setattr(service, "_refresh_memory_context", _no_refresh)
+
+    async def run():
+        await _enqueue("session", "hello")
+        token = await _valkey_client.acquire_memory_queue_lock("session", 60)
+        skipped = await service.flush_memory_queue(drain=True)
+        assert token is not None
+        await _valkey_client.release_memory_queue_lock("session", token)
+        flushed = await service.flush_memory_queue(drain=True)
+        return skipped, flushed
+
+    assert asyncio.run(run()) == (0, 1)
+    assert len(zep.written) == 1
+
+
+def test_lock_is_only_released_by_its_holder():
+    async def run():
+        token = await _valkey_client.acquire_memory_queue_lock("session", 60)
+        assert token is not None
+        released_by_other = await _valkey_client.release_memory_queue_lock(
+            "session", "expired-holder"
+        )
+        still_held = (
+            await _valkey_client.acquire_memory_queue_lock("session", 60) is None
+        )
+        released_by_holder = await _valkey_client.release_memory_queue_lock(
+            "session", token
+        )
+        return released_by_other, still_held, released_by_holder
+
+    assert asyncio.run(run()) == (False, True, True)
+
+
+def test_memory_written_by_another_process_refreshes_tool_results(service, monkeypatch):
+    api_process = MemoryService()
+    searches: List[str] = []
+
+    async def search_facts(agent_id: str, user_id: str, query: str) -> List[str]:
+        searches.append(query)
+        return [f"fact {len(searches)}"]
+
+    monkeypatch.setattr(api_process, "search_facts", search_facts)
+    monkeypatch.setattr(service, "_write_session_memory", _FlakyZep(True))
+    monkeypatch.setattr(service, "_refresh_memory_context", _no_refresh)
+
+    async def run():
+        results = [
+            await api_process.tool_call("agent", "user", "search_facts", "hobby"),
+            await api_process.tool_call("agent", "user", "search_facts", "Hobby "),
+        ]
+        await _enqueue("session", "I took up fishing")
+        await _flush(service, 1)
+        results.append(
+            await api_process.tool_call("agent", "user", "search_facts", "hobby")
+        )
+        return results
+
+    assert asyncio.run(run()) == ["fact 1", "fact 1", "fact 2"]
+
+
+def test_user_deleted_by_another_process_is_not_served_from_cache(service, monkeypatch):
+    api_process = MemoryService()
+    users = {"user": "registered"}
+
+    class _Zep:
+        async def get_user(self, user_id: str):
+            return users.get(user_id)
+
+        async def delete_user(self, user_id: str):
+            users.pop(user_id, None)
+
+    for process in (api_process, service):
+        monkeypatch.setattr(process, "_get_zep_client", lambda agent_id: _Zep())
+
+    async def run():
+        before = await api_process.get_user("agent", "user")
+        await service.delete_user("agent", "user")
+        return before, await api_process.get_user("agent", "user")
+
+    assert asyncio.run(run()) == ("registered", None)
+
+
+async def _no_refresh(agent_id: str, user_id: str, session_id: str):
+    pass
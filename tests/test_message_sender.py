@@ -0,0 +1,193 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any, List
+
+import pytest
+
+from app.core.blob_store import BlobStore
+from app.core.chat.chat_service import ChatService
+from app.core.config import get_settings
+from app.core.tasks.message_sender import PendingMessageDispatcher
+from app.core.valkey_client import ValkeyClient
+from tests.fakes import FakeChatClient, FakeLLM, FakeTTS, make_message
+
+AGENT = SimpleNamespace(id="agent")
+USER = SimpleNamespace(id="user")
+
+
+@pytest.fixture
+def chat_service(monkeypatch, tmp_path, fake_audio) -> ChatService:
+    chat_service = ChatService(BlobStore(str(tmp_path), 60))
+
+    async def is_chat_available(agent_id: str) -> bool:
+        return True
+
+    monkeypatch.setattr(chat_service, "is_chat_available", is_chat_available)
+    return chat_service
+
+
+def _dispatcher(
+    chat_service: ChatService, client: FakeChatClient, llm: FakeLLM
+) -> PendingMessageDispatcher:
+    return PendingMessageDispatcher(
+        llm_service=llm,  # type: ignore
+        tts_service=FakeTTS(),  # type: ignore
+        chat_service=chat_service,
+        line_client_registry=SimpleNamespace(get=lambda agent_config: client),  # type: ignore
+        max_concurrency=4,
+        max_concurrency_per_agent=2,
+        max_retries=2,
+        retry_base_delay=0.01,
+    )
+
+
+async def _save_pending(chat_service: ChatService, texts_by_source: List[Any]):
+    await chat_service.update_pending_messages(
+        "agent",
+        "chat-line",
+        "user",
+        "https://example.com",
+        [make_message(text, source=source) for source, text in texts_by_source],
+    )
+
+
+async def _pending_texts(chat_service: ChatService) -> List[Any]:
+    pending = await chat_service.get_pending_messages("agent", "user")
+    if pending is None:
+        return []
+    return [message.content.text for message in pending.chat_messages]
+
+
+async def _dispatch(dispatcher: PendingMessageDispatcher):
+    dispatcher.submit(AGENT, USER)  # type: ignore
+    await dispatcher.join()
+
+
+def test_sent_turns_are_removed_from_pending(chat_service):
+    client = FakeChatClient()
+    llm = FakeLLM()
+
+    async def run():
+        await _save_pending(chat_service, [("U1", "hi"), ("U1", "there"), ("U2", "yo")])
+        await _dispatch(_dispatcher(chat_service, client, llm))
+        return await _pending_texts(chat_service)
+
+    assert asyncio.run(run()) == []
+    assert client.sent == [("push", "U1", "re: hi\nthere"), ("push", "U2", "re: yo")]
+
+
+def test_failed_turn_stays_pending_without_repeating_sent_ones(
+    chat_service, monkeypatch
+):
+    client = FakeChatClient()
+    llm = FakeLLM()
+    push_message = client.push_message
+
+    async def push_or_fail(id: str, message: str, audio_url: str, duration: int):
+        if id == "U2":
+            raise RuntimeError("LINE API unavailable")
+        await push_message(id, message, audio_url, duration)
+
+    monkeypatch.setattr(client, "push_message", push_or_fail)
+
+    async def run():
+        await _save_pending(chat_service, [("U1", "first"), ("U2", "second")])
+        await _dispatch(_dispatcher(chat_service, client, llm))
+        after_failure = await _pending_texts(chat_service)
+        monkeypatch.setattr(client, "push_message", push_message)
+        await _dispatch(_dispatcher(chat_service, client, llm))
+        return after_failure, await _pending_texts(chat_service)
+
+    after_failure, after_recovery = asyncio.run(run())
+
+    assert after_failure == ["second"]
+    assert after_recovery == []
+    assert client.sent == [("push", "U1", "re: first"), ("push", "U2", "re: second")]
+
+
+def test_retried_turn_reuses_its_generated_reply(chat_service, monkeypatch):
+    client = FakeChatClient()
+    llm = FakeLLM()
+    push_message = client.push_message
+    failures = {"left": 2}
+
+    async def flaky_push(id: str, message: str, audio_url: str, duration: int):
+        if failures["left"] > 0:
+            failures["left"] -= 1
+            raise RuntimeError("429 Too Many Requests")
+        await push_message(id, message, audio_url, duration)
+
+    monkeypatch.setattr(client, "push_message", flaky_push)
+
+    async def run():
+        await _save_pending(chat_service, [("U1", "hello")])
+        await _dispatch(_dispatcher(chat_service, client, llm))
+        return await _pending_texts(chat_service)
+
+    assert asyncio.run(run()) == []
+    assert client.sent == [("push", "U1", "re: hello")]
+    assert llm.requests == [("hello", None)]
+
+
+def test_messages_saved_during_dispatch_stay_pending(chat_service, monkeypatch):
+    client = FakeChatClient()
+    llm = FakeLLM()
+    generate_response = llm.generate_response
+
+    async def generate_while_user_writes(*args: Any, **kwargs: Any):
+        # A webhook saves a new message while the backlog is being answered.
+        await _save_pending(chat_service, [("U1", "one more thing")])
+        return await generate_response(*args, **kwargs)
+
+    monkeypatch.setattr(llm, "generate_response", generate_while_user_writes)
+
+    async def run():
+        await _save_pending(chat_service, [("U1", "hello")])
+        await _dispatch(_dispatcher(chat_service, client, llm))
+        return await _pending_texts(chat_service)
+
+    assert asyncio.run(run()) == ["one more thing"]
+
+
+def test_message_saved_while_an_ack_runs_does_not_restore_acked_ones(monkeypatch):
+    settings = get_settings()
+    webhook = ValkeyClient(settings.valkey_url, settings.valkey_password)
+    dispatcher = ValkeyClient(settings.valkey_url, settings.valkey_password)
+    pipeline = webhook._valkey_client.pipeline
+
+    def pipeline_acked_after_read(*args: Any, **kwargs: Any):
+        # The dispatcher acks the sent turns between the webhook's read and write.
+        pipe = pipeline(*args, **kwargs)
+        get = pipe.get
+
+        async def get_then_ack(key: str):
+            value = await get(key)
+            monkeypatch.setattr(webhook._valkey_client, "pipeline", pipeline)
+            await dispatcher.ack_pending_messages("session", 2)
+            return value
+
+        pipe.get = get_then_ack
+        return pipe
+
+    async def save(*texts: str):
+        await webhook.update_pending_messages(
+            "session",
+            "chat-line",
+            "https://example.com",
+            [make_message(text) for text in texts],
+        )
+
+    async def run():
+        await save("hi", "there")
+        monkeypatch.setattr(
+            webhook._valkey_client, "pipeline", pipeline_acked_after_read
+        )
+        await save("one more thing")
+        pending = await webhook.get_pending_messages("session")
+        return [message.content.text for message in pending.chat_messages]  # type: ignore
+
+    assert asyncio.run(run()) == ["one more thing"]
@@ -0,0 +1,46 @@
+# Copyright (c) 0235 Inc.
+# This file is licensed under the karakuri_agent Personal Use & No Warranty License.
+# Please see the LICENSE file in the project root.
+
+import asyncio
+import time
+
+from app.core import status_service
+from app.core.status_service import StatusService
+from app.schemas.status import RestingStatusData, TalkingStatusData
+
+
+def test_failed_timeout_check_is_retried(monkeypatch):
+    service = StatusService()
+    check_conversation_timeout = service.check_conversation_timeout
+    failures = {"left": 1}
+
+    async def flaky_check(agent_id: str):
+        if failures["left"] > 0:
+            failures["left"] -= 1
+            raise RuntimeError("Valkey unavailable")
+        await check_conversation_timeout(agent_id)
+
+    monkeypatch.setattr(service, "check_conversation_timeout", flaky_check)
+    monkeypatch.setattr(status_service, "_CONVERSATION_TIMEOUT_RETRY_DELAY", 0)
+
+    async def run():
+        valkey_client = status_service._valkey_client
+        await service.start_conversation("agent", "user", "Doe", "Jane")
+        talking = await service.get_current_status("agent")
+        assert talking.last_conversation_time is not None
+        talking.last_conversation_time -= status_service.CONVERSATION_TIMEOUT
+        await service.update_current_status("agent", talking)
+        await valkey_client.set_status_deadline("agent", time.time())
+
+        await service.process_due_conversation_timeouts()
+        after_failure = await service.get_current_status("agent")
+        retry = await valkey_client.get_next_status_deadline()
+        await service.process_due_conversation_timeouts()
+        return after_failure, retry, await service.get_current_status("agent")
+
+    after_failure, retry, after_retry = asyncio.run(run())
+
+    assert isinstance(after_failure, TalkingStatusData)
+    assert retry is not None and retry[0] == "agent"
+    assert isinstance(after_retry, RestingStatusData)